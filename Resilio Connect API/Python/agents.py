@@ -2,7 +2,16 @@ import sys
 import json
 
 sys.path.append("./")
-from communication import getAPIRequest
+from communication import iterAPIRequest, mcAPIError
+
+def iterAgents():
+    # yields agents one by one while the listing downloads; use this for consoles with many agents
+    return iterAPIRequest("/api/v2/agents")
 
 def getAgentList() -> json:
-    return getAPIRequest("/api/v2/agents")
\ No newline at end of file
+    # the whole listing as one list, as before; loop over iterAgents() instead to keep memory flat
+    try:
+        return list(iterAgents())
+    except mcAPIError as e:
+        # same as before: the console's error body is returned as is
+        return e.body
@@ -4,7 +4,7 @@ import os
 
 sys.path.append("./")
 from communication import initializeMCParams, getAPIRequest
-from agents import getAgentList
+from agents import iterAgents
 from jobs import appendToJobAgentList, addJob, startJob, monitorJob
 
 def doSomethingWhenJobIsDone(jobID):
@@ -16,9 +16,12 @@ initializeMCParams(os.getenv('RESILIO_MC_URL'), 8443, os.getenv('RESILIO_AUTH_TO
 # quick test that we can actually connect to this Management Console
 print(getAPIRequest("/api/v2/info"))
 
-# get the list of agents
-agents = getAgentList()
-print(agents)
+# go through the agents as the listing streams in (it can be large); keep the first 2 for the job
+agents = []
+for agent in iterAgents():
+    print(agent)
+    if len(agents) < 2:
+        agents.append(agent)
 
 # create a list of agents that will be added to the job
 jobAgentList = []
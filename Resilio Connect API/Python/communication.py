@@ -1,30 +1,150 @@
 import json
+import threading
 import requests
+from requests.adapters import HTTPAdapter
 
 mcURL = ""
 mcPort = -1
 mcToken = ""
 
-def initializeMCParams(url, port, token):
+# seconds; (connect, read) for every request made through mcClient
+connectTimeout = 5
+readTimeout = 60
+
+class mcAPIError(Exception):
+    # the console answered a listing with something other than a list (e.g. {"code": 404, ...})
+    def __init__(self, body):
+        super().__init__(str(body))
+        self.body = body
+
+def iterJSONArray(chunks):
+    # yields the items of a top-level JSON array from an iterable of text chunks, one at a time,
+    # so a large listing is never held as one string; an object body is raised as mcAPIError
+    # (or, if it wraps the list as {"data": [...]}, its items are yielded)
+    decoder = json.JSONDecoder()
+    chunks = iter(chunks)
+    buf = ""
+    pos = 0
+    exhausted = False
+
+    def more():
+        nonlocal buf, pos, exhausted
+        chunk = next(chunks, None)
+        if chunk is None:
+            exhausted = True
+            return False
+        if pos > 65536:
+            buf, pos = buf[pos:], 0
+        buf += chunk
+        return True
+
+    def skip(chars):
+        nonlocal pos
+        while True:
+            while pos < len(buf) and buf[pos] in chars:
+                pos += 1
+            if pos < len(buf) or not more():
+                return
+
+    skip(" \t\r\n")
+    if pos >= len(buf):
+        raise ValueError("empty response")
+    if buf[pos] != "[":
+        while more():
+            pass
+        body = json.loads(buf[pos:])
+        if isinstance(body, dict) and isinstance(body.get("data"), list):
+            yield from body["data"]
+            return
+        raise mcAPIError(body)
+    pos += 1
+
+    while True:
+        skip(" \t\r\n,")
+        if pos >= len(buf):
+            raise ValueError("truncated JSON array")
+        if buf[pos] == "]":
+            return
+        while True:
+            try:
+                item, end = decoder.raw_decode(buf, pos)
+                # a number cut at the end of the buffer (e.g. "7." of "7.5") continues in the next chunk
+                if (end < len(buf) and buf[end] in " \t\r\n,]") or exhausted:
+                    break
+            except ValueError:
+                if exhausted:
+                    raise
+            more()
+        pos = end
+        yield item
+
+class mcClient:
+    """
+    One Management Console connection: a requests Session keeps TCP/TLS
+    connections alive between calls (pooled, so several threads can share
+    it), asks for gzip responses and applies timeouts to every request.
+    """
+    def __init__(self, url, port, token, verify=True, poolSize=10,
+                 connectTimeout=connectTimeout, readTimeout=readTimeout):
+        self.baseURL = url + ":" + str(port)
+        self.timeout = (connectTimeout, readTimeout)
+        self.session = requests.Session()
+        self.session.verify = verify
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=poolSize)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({
+            "Authorization": "Token " + token,
+            "Accept": "application/json",
+            "Accept-Encoding": "gzip, deflate"
+        })
+
+    def get(self, APIReq) -> json:
+        req = self.session.get(self.baseURL + APIReq, timeout=self.timeout)
+        return req.json()
+
+    def post(self, APIReq, bodyData) -> json:
+        req = self.session.post(self.baseURL + APIReq, json=bodyData, timeout=self.timeout)
+        return req.json()
+
+    def iterGet(self, APIReq, chunkSize=65536):
+        # streams a listing: yields one decoded item at a time while the (gzipped) body downloads
+        with self.session.get(self.baseURL + APIReq, timeout=self.timeout, stream=True) as req:
+            if req.encoding is None:
+                req.encoding = "utf-8"
+            yield from iterJSONArray(req.iter_content(chunk_size=chunkSize, decode_unicode=True))
+
+    def close(self):
+        self.session.close()
+
+defaultClient = None
+defaultClientLock = threading.Lock()
+
+def initializeMCParams(url, port, token, verify=True):
   global mcURL
   global mcPort
   global mcToken
+  global defaultClient
   mcURL = url
   mcPort = port
   mcToken = "Token " + token
+  with defaultClientLock:
+      if defaultClient is not None:
+          defaultClient.close()
+      defaultClient = mcClient(url, port, token, verify)
+
+def getClient() -> mcClient:
+    if defaultClient is None:
+        raise RuntimeError("call initializeMCParams(url, port, token) first")
+    return defaultClient
+
+# the functions below are kept so existing scripts work unchanged; they all share defaultClient
 
 def getAPIRequest(APIReq) -> json:
-    URL = mcURL + ":" + str(mcPort) + APIReq
-    req = requests.get(URL, headers={"Authorization": mcToken})
-    return json.loads(req.content)
+    return getClient().get(APIReq)
 
 def postAPIRequest(APIReq, bodyData) -> json:
-    URL = mcURL + ":" + str(mcPort) + APIReq
-    bodyData = json.dumps(bodyData)
-    headersData = {
-        "Authorization": mcToken,
-        "Content-Type": "application/json",
-        "Content-Length": str(len(bodyData))
-    }
-    req = requests.post(URL, headers=headersData, data=bodyData)
-    return json.loads(req.content)
+    return getClient().post(APIReq, bodyData)
+
+def iterAPIRequest(APIReq):
+    return getClient().iterGet(APIReq)
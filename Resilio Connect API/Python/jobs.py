@@ -1,9 +1,16 @@
 import sys
 import json
 import time
+import threading
+from urllib.parse import urlencode
 
 sys.path.append("./")
 from communication import getAPIRequest, postAPIRequest
+from polling import AdaptivePollPolicy, run_progress
+
+# Run statuses after which a run no longer changes
+FINISHED_RUN_STATUSES = ("finished",)
+FAILED_RUN_STATUSES = ("failed", "aborted", "stopped", "error")
 
 def appendToJobAgentList(list, id, permission, path) -> json:
     list.append({
@@ -31,41 +38,237 @@ def startJob(jobID) -> json:
 def getJobRunStatus(runID) -> json:
     return getAPIRequest("/api/v2/runs/" + str(runID))
 
+def getJobRuns(params=None) -> json:
+    # one listing of many runs; params are passed as query string (e.g. {"limit": 1000})
+    query = ("?" + urlencode(params)) if params else ""
+    return getAPIRequest("/api/v2/runs" + query)
+
 class jobMonitor:
-    def __init__(self, runID, finishedCallbackFunction):
+    def __init__(self, runID, finishedCallbackFunction, errorCallbackFunction=None, pollPolicy=None):
         self.monitorJobID = 0
         self.monitoredRunID = runID
         self.monitorJobStatus = ""
         self.monitorErrCode = 200
         self.monitorCallback = finishedCallbackFunction
+        self.monitorErrorCallback = errorCallbackFunction
+        self.monitorMissedListings = 0
+        self.monitorPollPolicy = pollPolicy or AdaptivePollPolicy()
+        self.monitorLastPoll = 0.0
+        self.monitorNextPoll = 0.0  # time.monotonic() when the run is due again
 
     def getJobStatus(self) -> str:
         return self.monitorJobStatus
-    
+
     def getErrCode(self) -> int:
         return self.monitorErrCode
 
-    def updateJobRunStatus(self):
-        runStatus = getJobRunStatus(self.monitoredRunID)
-        self.monitorJobID = runStatus["job_id"]
-        self.monitorJobStatus = runStatus["status"]
+    def isDone(self) -> bool:
+        return (self.monitorJobStatus in FINISHED_RUN_STATUSES or
+                self.monitorJobStatus in FAILED_RUN_STATUSES or
+                self.monitorErrCode == 404)
+
+    def applyRunStatus(self, runStatus):
+        # runStatus is one run as returned by /api/v2/runs or /api/v2/runs/<id>;
+        # fires the callbacks once when the run reaches a final state
+        wasDone = self.isDone()
+        self.monitorJobID = runStatus.get("job_id", self.monitorJobID)
+        self.monitorJobStatus = runStatus.get("status", self.monitorJobStatus)
         try:
             self.monitorErrCode = runStatus["code"]
         except:
             self.monitorErrCode = 0
-        if (self.monitorJobStatus == "finished"):
+        if wasDone:
+            return
+        if (self.monitorJobStatus in FINISHED_RUN_STATUSES):
             self.monitorCallback(self.monitorJobID)
+        elif self.isDone() and self.monitorErrorCallback:
+            reason = runStatus.get("message") or self.monitorJobStatus or "error " + str(self.monitorErrCode)
+            self.monitorErrorCallback(self.monitoredRunID, reason)
+
+    def scheduleNextPoll(self, runStatus, now):
+        # the policy backs off while the status holds and tightens near the predicted finish
+        progress, eta = run_progress(runStatus)
+        delay = self.monitorPollPolicy.next_delay(runStatus.get("status"), progress, eta)
+        self.monitorLastPoll = now
+        self.monitorNextPoll = now + delay
+
+    def scheduleRetry(self, now):
+        # the poll failed or the run was not in the listing: back off, keep what was seen
+        self.monitorLastPoll = now
+        self.monitorNextPoll = now + self.monitorPollPolicy.after_error()
+
+    def isDue(self, now, earlyFraction=0.0) -> bool:
+        # with earlyFraction, a run close to due rides along on a listing made for another run
+        early = earlyFraction * (self.monitorNextPoll - self.monitorLastPoll)
+        return now >= self.monitorNextPoll - early
+
+    def updateJobRunStatus(self):
+        self.applyRunStatus(getJobRunStatus(self.monitoredRunID))
 
 jobRuns = {}
 
-def monitorJob(runID, finishedCallbackFunction, monitorInterval):
-    if (not runID in jobRuns):
-        # new job run to monitor
-        jobRuns[runID] = jobMonitor(runID, finishedCallbackFunction)
-
-    while ((jobRuns[runID].getJobStatus() != "finished") and (jobRuns[runID].getErrCode != 404)):
-        # this should become multi-threaded to monitor several jobs
-        time.sleep(monitorInterval)
-        jobRuns[runID].updateJobRunStatus()
-    # remove from the jobRuns dict
-    jobRuns.pop(runID, None)
+class runMonitor:
+    """
+    Watches many job runs from one scheduler thread. Each run has its own
+    adaptive poll schedule (see polling.py): polled often right after it
+    starts or changes status, less and less while it stays the same, and
+    again often near its predicted finish. A tick happens when any run is
+    due and makes a single /api/v2/runs listing: due runs are updated from
+    it, the others only if their status changed (which also re-tightens
+    their schedule). A due run missing from the listing for
+    `missedListingsBeforeGet` ticks (e.g. beyond the listing's page) is
+    fetched on its own, which is also how deleted runs (404) are noticed.
+
+    A run within `earlyFraction` of its current delay from being due is
+    polled along with the run that triggered the tick, so many runs share
+    listings instead of each pulling its own. Listings are at least
+    `minListingGap` seconds apart; by default that is the fastest the
+    default policy polls (pollInterval / 5), so it never holds a run back.
+
+    pollInterval is the interval a fixed-rate poller would have used; the
+    default policy starts 5x faster and backs off to 6x slower while it can
+    predict the finish from progress, otherwise to pollInterval. Pass
+    pollPolicy (a function returning a new policy per run) to change that.
+
+    Callbacks run on the scheduler thread:
+      finishedCallback(jobID)          when a run is "finished"
+      errorCallback(runID, reason)     when a run fails, is aborted or is gone
+    """
+    def __init__(self, pollInterval=5, listParams=None, missedListingsBeforeGet=2, runs=None, pollPolicy=None,
+                 earlyFraction=0.5, minListingGap=None):
+        self.pollInterval = pollInterval
+        self.pollPolicy = pollPolicy or (lambda: AdaptivePollPolicy.for_interval(pollInterval))
+        self.listParams = listParams
+        self.missedListingsBeforeGet = missedListingsBeforeGet
+        self.earlyFraction = earlyFraction
+        self.minListingGap = pollInterval / 5.0 if minListingGap is None else minListingGap
+        self.lastListing = 0.0
+        self.runs = {} if runs is None else runs
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.stopped = threading.Event()
+        self.idle = threading.Condition(self.lock)
+        self.thread = None
+
+    def watch(self, runID, finishedCallback, errorCallback=None, pollPolicy=None):
+        # pollPolicy: policy for this run only, instead of a new one from the monitor's pollPolicy
+        with self.lock:
+            if runID not in self.runs:
+                self.runs[runID] = jobMonitor(runID, finishedCallback, errorCallback, pollPolicy or self.pollPolicy())
+        self.start()
+        self.wakeup.set()
+
+    def unwatch(self, runID):
+        with self.lock:
+            self.runs.pop(runID, None)
+            self.idle.notify_all()
+
+    def watching(self) -> int:
+        with self.lock:
+            return len(self.runs)
+
+    def start(self):
+        if self.thread is None or not self.thread.is_alive():
+            self.stopped.clear()
+            self.thread = threading.Thread(target=self._loop, name="run-monitor", daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        self.wakeup.set()
+        if self.thread is not None:
+            self.thread.join()
+
+    def wait(self, timeout=None, runID=None) -> bool:
+        # block until runID (or every watched run) is done; returns False on timeout
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.lock:
+            while (runID in self.runs) if runID is not None else self.runs:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self.idle.wait(remaining)
+        return True
+
+    def nextDue(self):
+        # seconds until the earliest watched run is due, None when nothing is watched
+        with self.lock:
+            if not self.runs:
+                return None
+            due = max(min(m.monitorNextPoll for m in self.runs.values()), self.lastListing + self.minListingGap)
+            return max(0.0, due - time.monotonic())
+
+    def poll(self):
+        # one tick: one listing for all runs if any is due, single GETs only for due runs it missed
+        now = time.monotonic()
+        with self.lock:
+            monitors = list(self.runs.values())
+        if not any(m.isDue(now) for m in monitors) or now < self.lastListing + self.minListingGap:
+            return
+        self.lastListing = now
+        due = {m.monitoredRunID for m in monitors if m.isDue(now, self.earlyFraction)}
+        try:
+            listing = getJobRuns(self.listParams)
+        except Exception as e:
+            print("run listing failed, retrying next tick: " + str(e))
+            for monitor in monitors:
+                if monitor.monitoredRunID in due:
+                    monitor.scheduleRetry(now)
+            return
+        if isinstance(listing, dict):
+            listing = listing.get("data") or listing.get("runs") or []
+        byID = {run.get("id"): run for run in listing if isinstance(run, dict)}
+
+        for monitor in monitors:
+            runStatus = byID.get(monitor.monitoredRunID)
+            if monitor.monitoredRunID not in due:
+                # not due: the listing is free information, act on it only if something changed
+                if runStatus is None or runStatus.get("status", monitor.monitorJobStatus) == monitor.monitorJobStatus:
+                    continue
+            elif runStatus is not None:
+                monitor.monitorMissedListings = 0
+            else:
+                monitor.monitorMissedListings += 1
+                if monitor.monitorMissedListings < self.missedListingsBeforeGet:
+                    monitor.scheduleRetry(now)
+                    continue
+                try:
+                    runStatus = getJobRunStatus(monitor.monitoredRunID)
+                except Exception as e:
+                    print("status of run " + str(monitor.monitoredRunID) + " failed: " + str(e))
+                    monitor.scheduleRetry(now)
+                    continue
+            try:
+                monitor.applyRunStatus(runStatus)
+            except Exception as e:
+                print("callback for run " + str(monitor.monitoredRunID) + " failed: " + str(e))
+            if monitor.isDone():
+                self.unwatch(monitor.monitoredRunID)
+            else:
+                monitor.scheduleNextPoll(runStatus, now)
+
+    def _loop(self):
+        while not self.stopped.is_set():
+            self.poll()
+            self.wakeup.wait(self.nextDue())
+            self.wakeup.clear()
+
+defaultMonitor = None
+defaultMonitorLock = threading.Lock()
+
+def getDefaultMonitor(monitorInterval=5) -> runMonitor:
+    # shared by every monitorJob call, so concurrent callers still cost one listing per tick.
+    # Each monitorJob call brings its own interval, so listings are spaced only by the runs' schedules
+    global defaultMonitor
+    with defaultMonitorLock:
+        if defaultMonitor is None:
+            defaultMonitor = runMonitor(monitorInterval, runs=jobRuns, minListingGap=0)
+    return defaultMonitor
+
+def monitorJob(runID, finishedCallbackFunction, monitorInterval, errorCallbackFunction=None):
+    # blocks until the run is finished (or failed / gone); use runMonitor directly to watch many runs.
+    # monitorInterval is the interval a fixed poller would have used for this run (see runMonitor)
+    monitor = getDefaultMonitor(monitorInterval)
+    monitor.watch(runID, finishedCallbackFunction, errorCallbackFunction,
+                  AdaptivePollPolicy.for_interval(monitorInterval))
+    monitor.wait(runID=runID)
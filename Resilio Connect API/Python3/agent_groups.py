@@ -0,0 +1,117 @@
+"""
+One reusable group per agent, for jobs that are made of single agents.
+
+Creating a fresh pair of groups for every sync job costs two extra POSTs per
+job and leaves thousands of one-agent groups behind, which slows down every
+group and job listing. `AgentGroupPool` keeps one canonical group per agent,
+named "<prefix><agent id>" and holding just that agent, and hands out its
+id to every job that needs the agent.
+
+Group ids are cached on disk (same format as AgentIdCache, keyed by the
+console address). A cached id is checked against the console once per
+process - one GET of the group - and dropped if the group is gone, renamed
+or no longer holds exactly that agent. Agents that are not cached are
+looked up by name in a single group listing, shared by all lookups of the
+pool; only agents without a group cost a POST.
+"""
+import os
+import threading
+
+from errors import ApiError
+from local_agent import AgentIdCache
+from logger import logger
+
+POOL_GROUP_PREFIX = "AGENT_"
+
+# Per-job groups of sync jobs created before the pool; see compact_temp_groups.py
+TEMP_GROUP_PREFIX = "TEMP_"
+
+DEFAULT_GROUP_CACHE_PATH = os.getenv(
+    "RESILIO_GROUP_POOL_CACHE",
+    os.path.join(os.path.expanduser("~"), ".cache", "resilio-connect", "agent_groups.json"))
+
+
+class AgentGroupPool:
+    def __init__(self, api, cache_path=DEFAULT_GROUP_CACHE_PATH, prefix=POOL_GROUP_PREFIX):
+        """
+        :param api: ApiBaseCommands instance
+        :param cache_path: file with the group ids, None to keep them in memory only
+        :param prefix: name prefix of the pool's groups
+        """
+        self.api = api
+        self.prefix = prefix
+        self.created = 0
+        self._cache = AgentIdCache(cache_path)
+        self._lock = threading.Lock()
+        self._agent_locks = {}
+        self._validated = {}  # agent id -> group id, checked against the console by this process
+        self._groups_by_name = None
+
+    def group_name(self, agent_id):
+        return "{}{}".format(self.prefix, agent_id)
+
+    def _agent_lock(self, agent_id):
+        with self._lock:
+            return self._agent_locks.setdefault(agent_id, threading.Lock())
+
+    def _is_canonical(self, group, agent_id):
+        agents = {a.get("id") for a in group.get("agents", [])}
+        return group.get("name") == self.group_name(agent_id) and agents == {agent_id}
+
+    def _find(self, agent_id):
+        """The group named after the agent from the (one) group listing, or None"""
+        with self._lock:
+            if self._groups_by_name is None:
+                self._groups_by_name = {}
+                for group in sorted(self.api._get_groups(), key=lambda g: g["id"]):
+                    self._groups_by_name.setdefault(group.get("name"), group)
+            return self._groups_by_name.get(self.group_name(agent_id))
+
+    def group_id(self, agent_id):
+        """
+        Id of the agent's canonical group; finds, repairs or creates it as needed
+
+        :param agent_id: MC agent id
+        :return: group id
+        :raises ApiError: if the group can't be looked up or created
+        """
+        agent_id = int(agent_id)
+        key = str(agent_id)
+        with self._agent_lock(agent_id):
+            if agent_id in self._validated:
+                return self._validated[agent_id]
+
+            group_id = self._cache.get(self.api._address, key)
+            if group_id is not None:
+                try:
+                    if self._is_canonical(self.api._get_group(group_id), agent_id):
+                        return self._resolve(agent_id, group_id)
+                except ApiError as e:
+                    logger.info("Cached group %s of agent %s not usable: %s", group_id, agent_id, e)
+                self._cache.forget(self.api._address, key)
+
+            group = self._find(agent_id)
+            if group is not None:
+                if not self._is_canonical(group, agent_id):
+                    logger.warning("Group %s (%s) does not hold just agent %s, resetting its members",
+                                   group["id"], group.get("name"), agent_id)
+                    self.api._update_group(group["id"], {'agents': [{'id': agent_id}]})
+                return self._resolve(agent_id, group["id"])
+
+            group_id = self.api._create_group({
+                'name': self.group_name(agent_id),
+                'description': 'Agent {} (shared by sync jobs, do not edit)'.format(agent_id),
+                'agents': [{'id': agent_id}]
+            })
+            self.created += 1
+            with self._lock:
+                self._groups_by_name[self.group_name(agent_id)] = {
+                    "id": group_id, "name": self.group_name(agent_id), "agents": [{"id": agent_id}]}
+            logger.info("Created group %s for agent %s", group_id, agent_id)
+            return self._resolve(agent_id, group_id)
+
+    def _resolve(self, agent_id, group_id):
+        with self._lock:
+            self._validated[agent_id] = group_id
+        self._cache.put(self.api._address, str(agent_id), group_id)
+        return group_id
@@ -3,7 +3,7 @@ from functools import wraps
 from json import JSONDecodeError
 import requests
 
-from errors import ApiConnectionError, ApiUnauthorizedError, ApiError
+from errors import ApiConnectionError, ApiNotFoundError, ApiUnauthorizedError, ApiError
 from logger import logger
 
 BASE_API_URL = '/api/v2'
@@ -33,6 +33,8 @@ def authorized_api_request(func):
 
             if response.status_code == 401:
                 raise ApiUnauthorizedError(message)
+            if response.status_code == 404:
+                raise ApiNotFoundError(message)
 
             raise ApiError(message)
 
@@ -0,0 +1,156 @@
+"""
+Move sync jobs off their TEMP_ groups and delete those groups.
+
+Older versions of test_app.py created a TEMP_SRC_/TEMP_DST_ group pair for
+every sync job and never deleted them. This one-off tool:
+
+- reads all jobs and all groups once
+- points every job that uses a TEMP_ group at the shared group of the same
+  agent from AgentGroupPool instead (paths and permissions stay as they
+  are), `max_workers` jobs at a time
+- deletes, also in parallel, every TEMP_ group no job uses any more,
+  including the ones left behind by failed job creations
+
+A TEMP_ group holding anything other than exactly one agent is left alone,
+together with the jobs that use it. Run with --dry-run first:
+
+    python3 compact_temp_groups.py --address https://mc.example.com:8443 --token <token> --dry-run
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from agent_groups import TEMP_GROUP_PREFIX, AgentGroupPool
+from errors import ApiError
+from logger import logger
+
+
+class TempGroupCompactor:
+    def __init__(self, api, pool=None, max_workers=8):
+        """
+        :param api: ApiBaseCommands instance
+        :param pool: AgentGroupPool to take the shared groups from, optional
+        :param max_workers: jobs updated / groups deleted in parallel
+        """
+        self.api = api
+        self.pool = pool if pool is not None else AgentGroupPool(api)
+        self.max_workers = max_workers
+
+    def plan(self):
+        """
+        Work out what to change, without changing anything
+
+        :return: dict:
+        {
+            "jobs": [(job, [<TEMP_ group id>, ...]), ...]  # jobs to move
+            "temp_groups": {<group id>: <group>},          # all TEMP_ groups
+            "skipped": {<group id>: <reason>}              # TEMP_ groups that stay
+        }
+        """
+        temp_groups = {g["id"]: g for g in self.api._get_groups()
+                       if g.get("name", "").startswith(TEMP_GROUP_PREFIX)}
+        skipped = {group_id: "holds {} agents".format(len(g.get("agents", [])))
+                   for group_id, g in temp_groups.items() if len(g.get("agents", [])) != 1}
+
+        jobs = []
+        for job in self.api._get_jobs():
+            if "groups" not in job:
+                job = dict(job, groups=self.api._get_job_groups(job["id"]))
+            used = [entry["id"] for entry in job["groups"] if entry.get("id") in temp_groups]
+            if used:
+                jobs.append((job, used))
+        return {"jobs": jobs, "temp_groups": temp_groups, "skipped": skipped}
+
+    def _move_job(self, job, temp_groups):
+        """Point the job's TEMP_ groups at shared groups; returns an error message or None"""
+        try:
+            groups = []
+            for entry in job["groups"]:
+                if entry.get("id") in temp_groups:
+                    agent_id = temp_groups[entry["id"]]["agents"][0]["id"]
+                    entry = dict(entry, id=self.pool.group_id(agent_id))
+                groups.append(entry)
+            self.api._update_job(job["id"], {'groups': groups})
+        except ApiError as e:
+            logger.error("Failed to move job %s (%s) to shared groups: %s", job["id"], job.get("name"), e)
+            return str(e)
+        return None
+
+    def _delete_group(self, group_id):
+        try:
+            self.api._delete_group(group_id)
+        except ApiError as e:
+            logger.error("Failed to delete group %s: %s", group_id, e)
+            return str(e)
+        return None
+
+    def compact(self, dry_run=False):
+        """
+        Move the jobs and delete the TEMP_ groups
+
+        :return: dict with counts:
+        {
+            "jobs_moved", "jobs_failed", "groups_deleted", "groups_failed", "groups_kept",
+            "groups_created": <shared groups the pool had to create>
+        }
+        """
+        started = time.monotonic()
+        plan = self.plan()
+        temp_groups, skipped = plan["temp_groups"], plan["skipped"]
+        movable = [(job, used) for job, used in plan["jobs"] if not any(g in skipped for g in used)]
+        kept = set(skipped)
+        for job, used in plan["jobs"]:
+            if any(g in skipped for g in used):
+                logger.warning("Leaving job %s (%s) on its TEMP_ groups: %s", job["id"], job.get("name"),
+                               "; ".join("group {} {}".format(g, skipped[g]) for g in used if g in skipped))
+                kept.update(used)
+
+        result = {"jobs_moved": 0, "jobs_failed": 0, "groups_deleted": 0, "groups_failed": 0,
+                  "groups_kept": 0, "groups_created": 0}
+        if dry_run:
+            result["jobs_moved"] = len(movable)
+            result["groups_deleted"] = len(set(temp_groups) - kept)
+            result["groups_kept"] = len(kept)
+            return result
+
+        created_before = self.pool.created
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            errors = list(pool.map(lambda item: self._move_job(item[0], temp_groups), movable))
+        for (job, used), error in zip(movable, errors):
+            if error:
+                result["jobs_failed"] += 1
+                kept.update(used)
+            else:
+                result["jobs_moved"] += 1
+        result["groups_created"] = self.pool.created - created_before
+
+        to_delete = sorted(set(temp_groups) - kept)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            errors = list(pool.map(self._delete_group, to_delete))
+        result["groups_failed"] = sum(1 for error in errors if error)
+        result["groups_deleted"] = len(to_delete) - result["groups_failed"]
+        result["groups_kept"] = len(kept)
+        logger.info("Compacted TEMP_ groups in %.1fs: %s", time.monotonic() - started, result)
+        return result
+
+
+def main():
+    import argparse
+    import json
+    import os
+    from examples import ConnectApiExample
+
+    p = argparse.ArgumentParser(description="Move sync jobs off TEMP_ groups and delete those groups")
+    p.add_argument("--address", default=os.getenv("RESILIO_MC_URL"), help="https://mc.example.com:8443")
+    p.add_argument("--token", default=os.getenv("RESILIO_AUTH_TOKEN"))
+    p.add_argument("--workers", type=int, default=8)
+    p.add_argument("--dry-run", action="store_true", help="Only count what would be moved and deleted")
+    args = p.parse_args()
+    if not args.address or not args.token:
+        p.error("--address and --token (or RESILIO_MC_URL / RESILIO_AUTH_TOKEN) are required")
+
+    compactor = TempGroupCompactor(ConnectApiExample(args.address, args.token), max_workers=args.workers)
+    print(json.dumps(compactor.compact(args.dry_run), sort_keys=True))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+"""
+Distribute one folder to many destination groups and wait for all of it.
+
+`DistributionOrchestrator.distribute` creates one distribution job per
+destination group (source group + that destination) and starts its run,
+`max_workers` at a time. `track` then follows every run from a single
+poller: one `/runs` listing per tick serves all of them, runs missing from
+the listing are fetched on their own, and the tick rate follows an
+AdaptivePollPolicy aimed at the next predicted finish. The result is one
+`Destination` per group with its completion time and throughput.
+
+Try it against the stub console:
+
+    python3 stub_console.py --port 8443 &
+    python3 distribution.py --address http://127.0.0.1:8443 --token x --src 1 --dst 2 3 4 5 6 7 8 --path /tmp/test
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from errors import ApiError
+from examples import FINAL_JOB_RUN_STATUSES
+from logger import logger
+from polling import AdaptivePollPolicy
+from progress import TransferSeries
+
+
+class Destination:
+    def __init__(self, group_data):
+        self.group_data = group_data
+        self.group_id = group_data["id"]
+        self.job_id = None
+        self.job_run_id = None
+        self.started_at = None  # time.monotonic() when the run was created
+        self.finished_at = None  # when the poller first saw a final status
+        self.status = None
+        self.error = None
+        self.series = TransferSeries()
+        self.missed_listings = 0
+
+    @property
+    def done(self):
+        return self.error is not None or self.status in FINAL_JOB_RUN_STATUSES
+
+    @property
+    def duration_s(self):
+        if self.started_at is None or self.finished_at is None:
+            return None
+        return self.finished_at - self.started_at
+
+    def to_dict(self):
+        """
+        {
+            "group_id", "job_id", "job_run_id", "status", "error",
+            "duration_s": <start to detected finish>, "bytes": <size_total>,
+            "bytes_per_s": <bytes / duration, or current throughput while running>
+        }
+        """
+        bytes_total = self.series.bytes_total
+        if self.duration_s and bytes_total:
+            bytes_per_s = bytes_total / self.duration_s
+        else:
+            bytes_per_s = self.series.rates()[0]
+        return {
+            "group_id": self.group_id,
+            "job_id": self.job_id,
+            "job_run_id": self.job_run_id,
+            "status": self.status,
+            "error": self.error,
+            "duration_s": self.duration_s,
+            "bytes": bytes_total,
+            "bytes_per_s": bytes_per_s,
+        }
+
+
+class DistributionOrchestrator:
+    def __init__(self, api, max_workers=8, poll_interval=5.0, missed_listings_before_get=2, listing_params=None):
+        """
+        :param api: ConnectApiExample instance
+        :param max_workers: jobs created and started in parallel
+        :param poll_interval: interval a fixed-rate poller would use (see AdaptivePollPolicy.for_interval)
+        :param missed_listings_before_get: a run missing from this many listings is fetched on its own
+        :param listing_params: query parameters for the /runs listing, optional
+        """
+        self.api = api
+        self.max_workers = max_workers
+        self.poll_interval = poll_interval
+        self.missed_listings_before_get = missed_listings_before_get
+        self.listing_params = listing_params
+
+    def distribute(self, job_name, src_group_data, dst_groups_data, description=""):
+        """
+        Create and start one distribution job per destination group
+
+        :param job_name: prefix of the job names; each job is "<job_name> -> <group id>"
+        :param src_group_data: src group data as dict (see ConnectApiExample.distribute_folder)
+        :param dst_groups_data: iterable object with dst group dicts
+        :return: list of Destination, with `error` set where creating or starting failed
+        """
+        destinations = [Destination(group_data) for group_data in dst_groups_data]
+        if not destinations:
+            return []
+
+        def start(destination):
+            name = "{} -> {}".format(job_name, destination.group_id)
+            try:
+                destination.job_id = self.api._create_job({
+                    'name': name,
+                    'type': "distribution",
+                    'description': description,
+                    'groups': [src_group_data, destination.group_data]
+                })
+                destination.job_run_id = self.api._create_job_run({"job_id": destination.job_id})
+                destination.started_at = time.monotonic()
+            except ApiError as e:
+                logger.error("Failed to start distribution %s: %s", name, e)
+                destination.error = str(e)
+            return destination
+
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(destinations))) as pool:
+            list(pool.map(start, destinations))
+        logger.info("Started %s of %s distribution jobs in %.1fs",
+                    sum(1 for d in destinations if d.job_run_id), len(destinations), time.monotonic() - started)
+        return destinations
+
+    def track(self, destinations, timeout=None, on_done=None):
+        """
+        Poll all runs from one loop until every destination is done
+
+        :param destinations: list of Destination from distribute()
+        :param timeout: seconds to wait at most, None to wait forever
+        :param on_done: called with each Destination as it finishes
+        :return: True if all finished in time, False on timeout
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        policy = AdaptivePollPolicy.for_interval(self.poll_interval)
+        pending = {d.job_run_id: d for d in destinations if d.job_run_id is not None and not d.done}
+
+        while pending:
+            try:
+                listing = self.api._get_job_runs(self.listing_params)
+            except ApiError as e:
+                logger.warning("Run listing failed, retrying: %s", e)
+                delay = policy.after_error()
+            else:
+                if isinstance(listing, dict):
+                    listing = listing.get("data") or []
+                by_id = {run.get("id"): run for run in listing}
+                now = time.monotonic()
+                for job_run_id, destination in list(pending.items()):
+                    job_run = by_id.get(job_run_id)
+                    if job_run is None:
+                        destination.missed_listings += 1
+                        if destination.missed_listings < self.missed_listings_before_get:
+                            continue
+                        try:
+                            job_run = self.api._get_job_run(job_run_id)
+                        except ApiError as e:
+                            logger.warning("Failed to fetch job run %s: %s", job_run_id, e)
+                            continue
+                    destination.missed_listings = 0
+                    destination.series.add(now, job_run)
+                    destination.status = job_run.get("status")
+                    if destination.done:
+                        destination.finished_at = now
+                        del pending[job_run_id]
+                        logger.info("Distribution to group %s %s after %.1fs",
+                                    destination.group_id, destination.status, destination.duration_s)
+                        if on_done:
+                            on_done(destination)
+
+                # Poll again around the earliest predicted finish
+                statuses = tuple(sorted(d.status or "" for d in pending.values()))
+                etas = [d.series.eta() for d in pending.values()]
+                etas = [eta for eta in etas if eta is not None]
+                delay = policy.next_delay(statuses, eta=min(etas) if etas else None)
+
+            if not pending:
+                break
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    logger.warning("Gave up waiting for %s distribution runs", len(pending))
+                    return False
+                delay = min(delay, remaining)
+            time.sleep(delay)
+        return True
+
+    def run(self, job_name, src_group_data, dst_groups_data, description="", timeout=None):
+        """distribute() then track(); returns the list of Destination.to_dict()"""
+        destinations = self.distribute(job_name, src_group_data, dst_groups_data, description)
+        self.track(destinations, timeout)
+        return [destination.to_dict() for destination in destinations]
+
+
+def render(report):
+    """Table of Destination.to_dict() items"""
+    lines = ["%-8s %-8s %-8s %-10s %9s %12s  %s" % ("GROUP", "JOB", "RUN", "STATUS", "TIME", "SPEED", "ERROR")]
+    for row in report:
+        lines.append("%-8s %-8s %-8s %-10s %9s %12s  %s" % (
+            row["group_id"], row["job_id"] or "-", row["job_run_id"] or "-", row["status"] or "-",
+            "-" if row["duration_s"] is None else "%.1fs" % row["duration_s"],
+            "-" if not row["bytes_per_s"] else "%.1f MB/s" % (row["bytes_per_s"] / 2 ** 20),
+            row["error"] or ""))
+    return "\n".join(lines)
+
+
+def main():
+    import argparse
+    import os
+    from examples import ConnectApiExample
+
+    p = argparse.ArgumentParser(description="Distribute a folder from one group to many groups and wait")
+    p.add_argument("--address", default=os.getenv("RESILIO_MC_URL"), help="https://mc.example.com:8443")
+    p.add_argument("--token", default=os.getenv("RESILIO_AUTH_TOKEN"))
+    p.add_argument("--src", type=int, required=True, help="Source group id")
+    p.add_argument("--dst", type=int, nargs="+", required=True, help="Destination group ids")
+    p.add_argument("--path", required=True, help="Folder path, the same on every OS")
+    p.add_argument("--name", default="Distribution {}".format(time.strftime("%Y-%m-%d %H:%M:%S")))
+    p.add_argument("--workers", type=int, default=8)
+    p.add_argument("--interval", type=float, default=5.0)
+    p.add_argument("--timeout", type=float)
+    args = p.parse_args()
+    if not args.address or not args.token:
+        p.error("--address and --token (or RESILIO_MC_URL / RESILIO_AUTH_TOKEN) are required")
+
+    path = {'linux': args.path, 'win': args.path, 'osx': args.path}
+    src = {'id': args.src, 'path': path, 'permission': "rw"}
+    dsts = [{'id': group_id, 'path': path, 'permission': "ro"} for group_id in args.dst]
+
+    orchestrator = DistributionOrchestrator(ConnectApiExample(args.address, args.token), args.workers, args.interval)
+    print(render(orchestrator.run(args.name, src, dsts, timeout=args.timeout)))
+
+
+if __name__ == "__main__":
+    main()
@@ -8,3 +8,7 @@ class ApiConnectionError(ApiError):
 
 class ApiUnauthorizedError(ApiError):
     pass
+
+
+class ApiNotFoundError(ApiError):
+    pass
@@ -1,19 +1,34 @@
 import json
 import time
-from json import JSONDecodeError
 import requests
 
 from api import ApiBaseCommands
-from errors import ApiError
+from errors import ApiError, ApiNotFoundError, ApiUnauthorizedError
+from group_manager import GroupEdit, GroupManager
+from local_agent import AGENT_API_PORT, AgentIdCache, LocalAgentClient
 from logger import logger
+from polling import AdaptivePollPolicy, run_progress
+from run_status import iter_job_run_agents, summarize_job_run
 
 
-AGENT_API_PORT = 3840
+# Job run statuses after which a run no longer changes
+FINAL_JOB_RUN_STATUSES = ("finished", "failed", "aborted", "stopped", "error")
+
+# check_transfer_status_of_local_agent() result when the local agent is not part of the run
+NOT_IN_RUN = "not in run"
+
+# Seconds between two listings of all agents to re-resolve a stale local agent id
+AGENT_ID_REFRESH_TTL = 300.0
 
 
 class ConnectApiExample(ApiBaseCommands):
-    def __init__(self, address, token, verify=False):
+    def __init__(self, address, token, verify=False, agent_id_cache=None, local_agent=None):
         super(ConnectApiExample, self).__init__(address, token, verify)
+        # peer id -> agent id of the local agent, kept on disk (see local_agent.py)
+        self._agent_id_cache = agent_id_cache if agent_id_cache is not None else AgentIdCache()
+        # the agent's own API on this machine, asked before the console for local status
+        self._local_agent = local_agent if local_agent is not None else LocalAgentClient(port=AGENT_API_PORT)
+        self._agent_id_listed_at = None  # time.monotonic() of the last listing of all agents
 
         if not verify:
             from requests.packages.urllib3.exceptions import InsecureRequestWarning
@@ -35,7 +50,7 @@ class ConnectApiExample(ApiBaseCommands):
         try:
             agents = self._get_agents()
         except ApiError as e:
-            logger.error("Failed to fetch list of agents {}".format(e))
+            logger.error("Failed to fetch list of agents %s", e)
             return None
         else:
             logger.info("Successfully fetched list of agents")
@@ -62,7 +77,7 @@ class ConnectApiExample(ApiBaseCommands):
             'name': name,
             'description': description,
             'agents': [
-                {'id': agent_id} for agent_id in agents_ids
+                {'id': agent_id} for agent_id in dict.fromkeys(agents_ids)
             ]
         }
 
@@ -71,12 +86,12 @@ class ConnectApiExample(ApiBaseCommands):
 
         try:
             group_id = self._create_group(attrs)
-            logger.debug("Created group with ID {}".format(group_id))
+            logger.debug("Created group with ID %s", group_id)
         except ApiError as e:
-            logger.error("Failed to create group: {}".format(e))
+            logger.error("Failed to create group: %s", e)
             return None
         else:
-            logger.info("Successfully created group {}".format(attrs['name']))
+            logger.info("Successfully created group %s", attrs['name'])
             return group_id
 
     def delete_group(self, group_id):
@@ -89,40 +104,60 @@ class ConnectApiExample(ApiBaseCommands):
 
         try:
             self._delete_group(group_id)
-            logger.debug("Deleted group with id {}".format(group_id))
+            logger.debug("Deleted group with id %s", group_id)
         except ApiError as e:
-            logger.error("Failed to delete group {}".format(e))
+            logger.error("Failed to delete group %s", e)
             return False
         else:
-            logger.info("Successfully deleted group {}".format(group_id))
+            logger.info("Successfully deleted group %s", group_id)
             return True
 
     def add_agents_to_group(self, group_id, agents_ids):
         """
         Add new agents to existed group
 
+        Only agents not in the group yet are sent, on top of its current
+        members (see group_manager.py).
+
         :param group_id: Group ID
         :param agents_ids: Agent IDs iterable object
         :return: True if operation was successful, otherwise False
         """
 
-        attrs = {
-            'agents': [
-                {'id': agent_id} for agent_id in agents_ids
-            ]
-        }
+        return self._edit_group(GroupEdit(group_id, add=agents_ids), "add agents to")
 
+    def remove_agents_from_group(self, group_id, agents_ids):
+        """
+        Remove agents from existed group
+
+        :param group_id: Group ID
+        :param agents_ids: Agent IDs iterable object
+        :return: True if operation was successful, otherwise False
+        """
+
+        return self._edit_group(GroupEdit(group_id, remove=agents_ids), "remove agents from")
+
+    def set_group_agents(self, group_id, agents_ids):
+        """
+        Make the group hold exactly these agents
+
+        :param group_id: Group ID
+        :param agents_ids: Agent IDs iterable object
+        :return: True if operation was successful, otherwise False
+        """
+
+        return self._edit_group(GroupEdit(group_id, members=agents_ids), "set agents of")
+
+    def _edit_group(self, edit, action):
         # all acceptable params for attr dict here:
         # https://connect-download-2-12-pr.resilio.com/#api-Groups-UpdateGroup
-
-        try:
-            self._update_group(group_id, attrs)
-        except ApiError as e:
-            logger.error("Failed to add agents to group {}, {}".format(group_id, e))
+        result = GroupManager(self).apply(edit)
+        if result["error"]:
+            logger.error("Failed to %s group %s, %s", action, edit.group_id, result["error"])
             return False
-        else:
-            logger.info("Successfully added agents to group {}".format(group_id))
-            return True
+        logger.info("Successfully edited group %s: %s added, %s removed",
+                    edit.group_id, result["added"], result["removed"])
+        return True
 
     def get_group_agents(self, group_id):
         """
@@ -136,7 +171,7 @@ class ConnectApiExample(ApiBaseCommands):
             response = self._get_group(group_id)
             agents_ids = tuple(d["id"] for d in response["agents"])
         except ApiError as e:
-            logger.error("Failed to get group agents {}".format(e))
+            logger.error("Failed to get group agents %s", e)
             return None
         else:
             logger.info("Successfully fetched group agents")
@@ -180,9 +215,9 @@ class ConnectApiExample(ApiBaseCommands):
 
         try:
             job_id = self._create_job(attrs)
-            logger.debug("Created job with ID {}".format(job_id))
+            logger.debug("Created job with ID %s", job_id)
         except ApiError as e:
-            logger.error("Failed to create job {}".format(e))
+            logger.error("Failed to create job %s", e)
             return None
         else:
             logger.info("Successfully created job")
@@ -202,12 +237,12 @@ class ConnectApiExample(ApiBaseCommands):
 
         try:
             job_run_id = self._create_job_run(attrs)
-            logger.debug("Created job run {}".format(job_run_id))
+            logger.debug("Created job run %s", job_run_id)
         except ApiError as e:
-            logger.error("Failed to create job run {}".format(e))
+            logger.error("Failed to create job run %s", e)
             return None
         else:
-            logger.info("Successfully created job run {}".format(job_run_id))
+            logger.info("Successfully created job run %s", job_run_id)
             return job_run_id
 
     def assign_jobs_to_group(self, group_id, jobs_data):
@@ -235,7 +270,7 @@ class ConnectApiExample(ApiBaseCommands):
         try:
             self._update_group(group_id, attrs)
         except ApiError as e:
-            logger.error("Failed to assign jobs to group {}".format(e))
+            logger.error("Failed to assign jobs to group %s", e)
             return False
         else:
             logger.info("Successfully assigned jobs to group")
@@ -288,6 +323,10 @@ class ConnectApiExample(ApiBaseCommands):
         """
         Check job run status on a list of machines
 
+        Pages through the run's agents, so runs with thousands of agents are
+        not downloaded in one response; a few `agents_ids` are looked up
+        directly.
+
         :param job_run_id: Job Run ID
         :param agents_ids: iterable object with agents ids, optional
         :return: tuple with dict items:
@@ -298,62 +337,101 @@ class ConnectApiExample(ApiBaseCommands):
         """
 
         try:
-            job_run_agents = self._get_job_run_agents(job_run_id)
-            logger.debug("Job run agents: {}".format(job_run_agents))
+            job_run_status = tuple(
+                {
+                    "agent_id": item["agent_id"],
+                    "job_run_status": item["status"]
+                } for item in iter_job_run_agents(self, job_run_id, agents_ids)
+            )
         except ApiError as e:
-            logger.error("Failed to get agents info for job run {}".format(e))
+            logger.error("Failed to get agents info for job run %s", e)
             return None
         else:
-            logger.info("Successfully get agents info for job run {}".format(job_run_id))
+            logger.info("Successfully get agents info for job run %s", job_run_id)
+            return job_run_status
 
-            if agents_ids is None:
-                return tuple(
-                    {
-                        "agent_id": item["agent_id"],
-                        "job_run_status": item["status"]
-                    } for item in job_run_agents["data"]
-                )
+    def summarize_transfer(self, job_run_id, agents_ids=None, statuses=None):
+        """
+        Status counts, grouped errors and byte totals of a job run, in one pass
 
-            return tuple(
-                {
-                    "agent_id": item["agent_id"],
-                    "job_run_status": item["status"]
-                } for item in job_run_agents["data"] if item["agent_id"] in agents_ids
-            )
+        :param job_run_id: Job Run ID
+        :param agents_ids: iterable object with agents ids, optional
+        :param statuses: iterable object with statuses, optional
+        :return: dict (see run_status.RunStatusSummary.to_dict) or None in case of error
+        """
 
-    def _get_local_agent_id(self):
+        try:
+            summary = summarize_job_run(self, job_run_id, agents_ids, statuses)
+        except ApiError as e:
+            logger.error("Failed to summarize job run %s", e)
+            return None
+        else:
+            logger.info("Successfully summarized job run %s: %s agents", job_run_id, summary["agents"])
+            return summary
+
+    def _get_local_agent_id(self, refresh=False):
         """
         Get local agent ID
 
+        The peer id -> agent id mapping is cached on disk, so this is one
+        request to the local agent; all agents are listed only on a cache
+        miss or with `refresh`, and at most once per AGENT_ID_REFRESH_TTL
+        seconds.
+
+        :param refresh: ignore the cached mapping
         :return: local agent ID or None in case of error
         """
-        try:
-            # send request to local agent's api endpoint
-            r = requests.get('http://127.0.0.1:{}/api/v2/client'.format(AGENT_API_PORT), timeout=3)
-            local_device_id = r.json()['data']['peerid']
-        except (requests.RequestException, JSONDecodeError, KeyError) as e:
-            logger.error(e)
+        # send request to local agent's api endpoint
+        local_device_id = self._local_agent.peer_id()
+        if local_device_id is None:
             return None
 
+        agent_id = self._agent_id_cache.get(self._address, local_device_id)
+        if agent_id is not None and not refresh:
+            logger.debug("Local agent %s is agent %s (cached)", local_device_id, agent_id)
+            return agent_id
+
+        listed_at = self._agent_id_listed_at
+        if listed_at is not None and time.monotonic() - listed_at < AGENT_ID_REFRESH_TTL:
+            logger.debug("Agents listed %.0fs ago, not listing them again", time.monotonic() - listed_at)
+            return agent_id
+
+        self._agent_id_listed_at = time.monotonic()
         all_agents = self._get_agents()
-        logger.debug("All agents: {}".format(all_agents))
+        logger.debug("All agents: %s", all_agents)
 
         for a in all_agents:
             if a["deviceid"] == local_device_id:
+                self._agent_id_cache.put(self._address, local_device_id, a["id"])
                 return a["id"]
 
+        self._agent_id_cache.forget(self._address, local_device_id)
         return None
 
-    def check_transfer_status_of_local_agent(self, job_run_id):
+    def check_transfer_status_of_local_agent(self, job_run_id, local_first=False):
         """
         Check job run status on the local agent
 
+        With `local_first`, asks the agent itself first (see local_agent.py)
+        and only falls back to the Management Console when the agent can't
+        tell. Off by default: the folder fields it matches runs on have not
+        been checked against a real agent's API yet.
+
         !!! IMPORTANT: Agent's API v2 must be enabled in MC agent profile via 'client_api_enabled=true'
 
         :param job_run_id: Job Run ID
-        :return: transfer status on the local agent
+        :param local_first: read the status from the local agent's API when it has it (unverified, see
+            LocalAgentClient.RUN_ID_FIELDS)
+        :return: transfer status on the local agent, NOT_IN_RUN if the agent is not part of the job run,
+            None in case of error
         """
 
+        if local_first:
+            status = self._local_agent.job_run_status(job_run_id)
+            if status is not None:
+                logger.debug("Job run %s status %s read from the local agent", job_run_id, status)
+                return status
+
         local_agent_id = self._get_local_agent_id()
 
         if local_agent_id is None:
@@ -362,12 +440,53 @@ class ConnectApiExample(ApiBaseCommands):
 
         try:
             job_run_local_agent = self._get_job_run_agent(job_run_id, local_agent_id)
+        except ApiNotFoundError:
+            if not self._is_unknown_agent(local_agent_id):
+                logger.info("Local agent %s is not in job run %s", local_agent_id, job_run_id)
+                return NOT_IN_RUN
+            # The cached id is stale (agent removed and re-added to the MC): look it up once more
+            fresh_agent_id = self._get_local_agent_id(refresh=True)
+            if fresh_agent_id is None or fresh_agent_id == local_agent_id:
+                logger.error("Local agent id %s is unknown to the Management Console", local_agent_id)
+                return None
+            try:
+                job_run_local_agent = self._get_job_run_agent(job_run_id, fresh_agent_id)
+            except ApiNotFoundError:
+                logger.info("Local agent %s is not in job run %s", fresh_agent_id, job_run_id)
+                return NOT_IN_RUN
+            except ApiError as e:
+                logger.error("Failed to fetch job run for local agent %s", e)
+                return None
         except ApiError as e:
-            logger.error("Failed to fetch job run for local agent {}".format(e))
+            logger.error("Failed to fetch job run for local agent %s", e)
             return None
-        else:
-            logger.info("Successfully fetched job run for local agent")
-            return job_run_local_agent["status"]
+
+        logger.info("Successfully fetched job run for local agent")
+        return job_run_local_agent["status"]
+
+    def _is_unknown_agent(self, agent_id):
+        """True if the Management Console has no agent with this id (one GET)"""
+        try:
+            self._get_agent(agent_id)
+        except ApiNotFoundError:
+            return True
+        except ApiError as e:
+            logger.warning("Failed to look up agent %s: %s", agent_id, e)
+        return False
+
+    def get_local_folder_status(self, job_id=None, path=None):
+        """
+        Folder status straight from the local agent
+
+        :param job_id: Job ID of the folder
+        :param path: local path of the folder
+        :return: folder dict as reported by the agent or None if not found
+        """
+
+        folder = self._local_agent.folder(job_id=job_id, path=path)
+        if folder is None:
+            logger.warning("Folder of job %s / path %s not found on the local agent", job_id, path)
+        return folder
 
     def get_job_run_agents(self, job_run_id):
         """
@@ -378,14 +497,64 @@ class ConnectApiExample(ApiBaseCommands):
         """
 
         try:
-            job_run_agents = self._get_job_run_agents(job_run_id)
+            job_run_agents = tuple(agent['agent_id'] for agent in iter_job_run_agents(self, job_run_id))
         except ApiError as e:
-            logger.error("Failed to get agents info for job run {}".format(e))
+            logger.error("Failed to get agents info for job run %s", e)
             return None
         else:
-            logger.info("Successfully get agents info for job run {}".format(job_run_id))
+            logger.info("Successfully get agents info for job run %s", job_run_id)
 
-        return tuple(agent['agent_id'] for agent in job_run_agents["data"])
+        return job_run_agents
+
+    def wait_for_run(self, job_run_id, timeout=None, policy=None, on_change=None):
+        """
+        Wait until the job run reaches a final status
+
+        Polls with an adaptive policy (see polling.py): often right after the
+        run starts or changes status, less often while it stays the same, and
+        tightly again around the finish predicted from its progress.
+
+        :param job_run_id: Job Run ID
+        :param timeout: seconds to wait at most, None to wait forever
+        :param policy: poll policy, AdaptivePollPolicy() by default
+        :param on_change: called with the run dict every time its status changes
+        :return: the final job run dict or None on timeout or error
+        """
+
+        policy = policy or AdaptivePollPolicy()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        status = None
+        polls = 0
+
+        while True:
+            polls += 1
+            try:
+                job_run = self._get_job_run(job_run_id)
+            except ApiUnauthorizedError as e:
+                logger.error("Failed to fetch job run %s", e)
+                return None
+            except ApiError as e:
+                logger.warning("Failed to fetch job run %s, retrying: %s", job_run_id, e)
+                delay = policy.after_error()
+            else:
+                if job_run.get("status") != status:
+                    status = job_run.get("status")
+                    logger.debug("Job run %s is %s", job_run_id, status)
+                    if on_change:
+                        on_change(job_run)
+                if status in FINAL_JOB_RUN_STATUSES:
+                    logger.info("Job run %s is %s after %s polls", job_run_id, status, polls)
+                    return job_run
+                progress, eta = run_progress(job_run)
+                delay = policy.next_delay(status, progress, eta)
+
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    logger.warning("Gave up waiting for job run %s, last status %s", job_run_id, status)
+                    return None
+                delay = min(delay, remaining)
+            time.sleep(delay)
 
 
 if __name__ == "__main__":
@@ -453,6 +622,10 @@ if __name__ == "__main__":
     ]
     job_run_id = connect_api.distribute_folder("Distro job {}".format(time.time()), "Some desc", src_group, dst_groups)
 
+    # wait (at most an hour) for the job run to finish
+    job_run = connect_api.wait_for_run(job_run_id, timeout=3600)
+    print(job_run and job_run["status"])
+
     # check job run status
     job_run_status = connect_api.check_transfer_status(job_run_id)
     print(json.dumps(job_run_status, indent=4, sort_keys=True))
@@ -461,6 +634,10 @@ if __name__ == "__main__":
     job_run_status_ = connect_api.check_transfer_status(job_run_id, agents_ids=(1, 149))
     print(json.dumps(job_run_status_, indent=4, sort_keys=True))
 
+    # status counts, errors and byte totals of the job run
+    job_run_summary = connect_api.summarize_transfer(job_run_id)
+    print(json.dumps(job_run_summary, indent=4, sort_keys=True))
+
     # get job run agents
     job_run_agents = connect_api.get_job_run_agents(job_run_id)
     print(json.dumps(job_run_agents, indent=4, sort_keys=True))
@@ -0,0 +1,169 @@
+"""
+Bulk group membership edits.
+
+The console's group update (PUT /groups/{id}) replaces the whole agent
+list, and there is no call to add or remove single agents, so writing a
+membership worked out from an old read silently drops whatever someone
+else changed since. `GroupManager` instead:
+
+- reads the current membership right before writing and applies the
+  wanted change to that; a group that already matches costs no write
+- writes the resulting membership in a single PUT
+- reads the group back afterwards and, if a concurrent edit slipped in
+  between the read and the write and undid some of its changes, applies
+  them again on top of the fresh membership (up to `retries` times)
+- edits many groups in parallel with at most `max_workers` requests in
+  flight; edits for the same group are merged and applied in one go
+
+From the command line, with a JSON file of {"<group id>": [<agent id>, ...]}:
+
+    python3 group_manager.py --address https://mc.example.com:8443 --token <token> groups.json
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from errors import ApiError
+from logger import logger
+
+
+class GroupEdit:
+    """
+    Wanted change of one group: either the full `members`, or agents to
+    `add` and `remove` relative to whatever the group holds now
+    """
+
+    def __init__(self, group_id, add=(), remove=(), members=None):
+        self.group_id = group_id
+        self.add = set(add)
+        self.remove = set(remove)
+        self.members = None if members is None else set(members)
+
+    def merge(self, other):
+        """Combine a later edit of the same group into this one"""
+        if other.members is not None:
+            self.members, self.add, self.remove = set(other.members), set(), set()
+        elif self.members is not None:
+            self.members = (self.members | other.add) - other.remove
+        else:
+            self.add = (self.add - other.remove) | other.add
+            self.remove = (self.remove - other.add) | other.remove
+
+    def diff(self, current):
+        """(to add, to remove) for a group that holds `current` now"""
+        if self.members is not None:
+            return self.members - current, current - self.members
+        return self.add - current, self.remove & current
+
+
+class GroupManager:
+    def __init__(self, api, max_workers=8, verify=True, retries=2):
+        """
+        :param api: ApiBaseCommands instance
+        :param max_workers: groups edited in parallel
+        :param verify: read groups back after editing and re-apply lost changes
+        :param retries: re-applications per group after a concurrent edit
+        """
+        self.api = api
+        self.max_workers = max_workers
+        self.verify = verify
+        self.retries = retries
+
+    def members(self, group_id):
+        """Current agent ids of a group, as a set"""
+        return {agent["id"] for agent in self.api._get_group(group_id).get("agents", [])}
+
+    def apply(self, edit):
+        """
+        Apply one GroupEdit
+
+        :return: dict:
+        {
+            "group_id": <id>, "added": <count>, "removed": <count>,
+            "requests": <count>, "retries": <count>, "error": <message or None>
+        }
+        """
+        result = {"group_id": edit.group_id, "added": 0, "removed": 0, "requests": 0, "retries": 0, "error": None}
+        try:
+            # Each pass reads the membership right before writing it; the
+            # read after the last write is the check that nothing was lost
+            for attempt in range(self.retries + 2):
+                current = self.members(edit.group_id)
+                result["requests"] += 1
+                to_add, to_remove = edit.diff(current)
+                if not to_add and not to_remove:
+                    break
+                if attempt > self.retries:
+                    result["error"] = "group keeps changing, {} changes not applied".format(len(to_add) + len(to_remove))
+                    break
+                if attempt:
+                    result["retries"] += 1
+                    logger.warning("Group %s changed while editing it, re-applying %s changes",
+                                   edit.group_id, len(to_add) + len(to_remove))
+                self._write(edit.group_id, (current | to_add) - to_remove)
+                result["requests"] += 1
+                result["added"] += len(to_add)
+                result["removed"] += len(to_remove)
+                if not self.verify:
+                    break
+        except ApiError as e:
+            logger.error("Failed to edit group %s: %s", edit.group_id, e)
+            result["error"] = str(e)
+        return result
+
+    def _write(self, group_id, membership):
+        """PUT the whole membership in one request"""
+        self.api._update_group(group_id, {'agents': [{'id': agent_id} for agent_id in sorted(membership)]})
+
+    def apply_many(self, edits):
+        """
+        Apply GroupEdits to many groups, `max_workers` at a time
+
+        :param edits: iterable of GroupEdit; edits of the same group are merged in order
+        :return: list of apply() results, one per group
+        """
+        merged = {}
+        for edit in edits:
+            if edit.group_id in merged:
+                merged[edit.group_id].merge(edit)
+            else:
+                merged[edit.group_id] = GroupEdit(edit.group_id, edit.add, edit.remove, edit.members)
+        if not merged:
+            return []
+
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(merged))) as pool:
+            results = list(pool.map(self.apply, merged.values()))
+        logger.info("Edited %s groups in %.1fs: %s added, %s removed, %s requests, %s failed",
+                    len(results), time.monotonic() - started,
+                    sum(r["added"] for r in results), sum(r["removed"] for r in results),
+                    sum(r["requests"] for r in results), sum(1 for r in results if r["error"]))
+        return results
+
+
+def main():
+    import argparse
+    import json
+    import os
+    from examples import ConnectApiExample
+
+    p = argparse.ArgumentParser(description="Set the members of many groups from a JSON file")
+    p.add_argument("groups", help='JSON file: {"<group id>": [<agent id>, ...], ...}')
+    p.add_argument("--address", default=os.getenv("RESILIO_MC_URL"), help="https://mc.example.com:8443")
+    p.add_argument("--token", default=os.getenv("RESILIO_AUTH_TOKEN"))
+    p.add_argument("--add-only", action="store_true", help="Only add the listed agents, remove nobody")
+    p.add_argument("--workers", type=int, default=8)
+    args = p.parse_args()
+    if not args.address or not args.token:
+        p.error("--address and --token (or RESILIO_MC_URL / RESILIO_AUTH_TOKEN) are required")
+
+    with open(args.groups) as f:
+        wanted = json.load(f)
+    edits = [GroupEdit(int(group_id), add=agents) if args.add_only else GroupEdit(int(group_id), members=agents)
+             for group_id, agents in wanted.items()]
+    manager = GroupManager(ConnectApiExample(args.address, args.token), args.workers)
+    for result in manager.apply_many(edits):
+        print(json.dumps(result, sort_keys=True))
+
+
+if __name__ == "__main__":
+    main()
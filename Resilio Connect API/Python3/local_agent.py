@@ -0,0 +1,171 @@
+"""
+The Resilio agent running on this machine.
+
+The agent's own API (127.0.0.1:3840, enabled in the MC agent profile via
+'client_api_enabled=true') tells us its peer id; the Management Console
+knows agents by a numeric id. Mapping one to the other takes a listing of
+every agent in the console, so `AgentIdCache` keeps the mapping on disk:
+later lookups cost one local request, and the console is only listed
+again when the local peer id is not in the cache (new machine, agent
+reinstalled) or the cached id is rejected by the console.
+
+`LocalAgentClient` reads folder and job run status straight from the
+agent, so status checks from many workstations don't all land on the
+console. Responses are cached for `ttl` seconds; if the agent API is not
+reachable, that is remembered for `error_ttl` seconds and callers fall
+back to the console right away.
+"""
+import json
+import os
+import tempfile
+import threading
+import time
+from json import JSONDecodeError
+
+import requests
+
+from logger import logger
+
+AGENT_API_PORT = 3840
+
+DEFAULT_CACHE_PATH = os.getenv(
+    "RESILIO_AGENT_ID_CACHE",
+    os.path.join(os.path.expanduser("~"), ".cache", "resilio-connect", "agent_ids.json"))
+
+
+class LocalAgentClient:
+    # Folder fields matched against a job run / job. These names are assumed, not taken from a
+    # recorded agent response, and stub_agent.py serves the same names, so its tests can't confirm
+    # them. Until they are checked against a real agent's /api/v2/folders, local-first status is
+    # opt-in (ConnectApiExample.check_transfer_status_of_local_agent(local_first=True)).
+    RUN_ID_FIELDS = ("job_run_id", "run_id")
+    JOB_ID_FIELDS = ("job_id",)
+
+    def __init__(self, host="127.0.0.1", port=AGENT_API_PORT, ttl=2.0, error_ttl=30.0, timeout=2):
+        """
+        :param ttl: seconds a response is reused
+        :param error_ttl: seconds an unreachable agent API is not asked again
+        :param timeout: request timeout, seconds
+        """
+        self.base_url = "http://{}:{}/api/v2".format(host, port)
+        self.ttl = ttl
+        self.error_ttl = error_ttl
+        self.timeout = timeout
+        self.requests = 0
+        self._session = requests.Session()
+        self._cache = {}  # path -> (expires at, data or None)
+        self._lock = threading.Lock()
+
+    def _get(self, path):
+        """`data` of a local API response, or None if the agent API is not available"""
+        now = time.monotonic()
+        with self._lock:
+            cached = self._cache.get(path)
+            if cached is not None and cached[0] > now:
+                return cached[1]
+            self.requests += 1
+        # The request runs without the lock, so a slow agent doesn't hold up cached lookups
+        try:
+            r = self._session.get(self.base_url + path, timeout=self.timeout)
+            r.raise_for_status()
+            data = r.json()['data']
+        except (requests.RequestException, JSONDecodeError, KeyError, TypeError) as e:
+            logger.error("Local agent API not reachable at %s: %s", self.base_url, e)
+            with self._lock:
+                self._cache[path] = (now + self.error_ttl, None)
+            return None
+        with self._lock:
+            self._cache[path] = (now + self.ttl, data)
+        return data
+
+    def invalidate(self):
+        with self._lock:
+            self._cache.clear()
+
+    def peer_id(self):
+        """Peer id of the agent, or None"""
+        client = self._get('/client')
+        return client.get('peerid') if isinstance(client, dict) else None
+
+    def folders(self):
+        """Folders the agent syncs (list of dicts), or None if the agent API is not available"""
+        folders = self._get('/folders')
+        return folders if isinstance(folders, list) else None
+
+    def folder(self, job_run_id=None, job_id=None, path=None):
+        """
+        The agent's folder of a job run, a job or a path
+
+        :return: folder dict, or None if not found or the agent API is not available
+        """
+        for folder in self.folders() or ():
+            if job_run_id is not None and any(folder.get(f) == job_run_id for f in self.RUN_ID_FIELDS):
+                return folder
+            if job_id is not None and any(folder.get(f) == job_id for f in self.JOB_ID_FIELDS):
+                return folder
+            if path is not None and folder.get('path') == path:
+                return folder
+        return None
+
+    def job_run_status(self, job_run_id):
+        """Status of the job run on this agent, or None if the agent can't tell"""
+        folder = self.folder(job_run_id=job_run_id)
+        return folder.get('status') if folder else None
+
+
+class AgentIdCache:
+    """
+    peer id -> MC agent id, per Management Console address, in a small JSON
+    file ({"<mc address>": {"<peer id>": <agent id>}}). A missing or broken
+    file is an empty cache; writes replace the file atomically.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH):
+        """
+        :param path: cache file, None to keep the mapping in memory only
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._data = None
+
+    def _load(self):
+        if self._data is None:
+            self._data = {}
+            if self.path and os.path.exists(self.path):
+                try:
+                    with open(self.path) as f:
+                        data = json.load(f)
+                    if isinstance(data, dict):
+                        self._data = data
+                except (OSError, ValueError) as e:
+                    logger.warning("Ignoring unreadable agent id cache %s: %s", self.path, e)
+        return self._data
+
+    def _save(self):
+        if not self.path:
+            return
+        try:
+            directory = os.path.dirname(self.path) or "."
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".agent_ids.")
+            with os.fdopen(fd, "w") as f:
+                json.dump(self._data, f, indent=1, sort_keys=True)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning("Failed to write agent id cache %s: %s", self.path, e)
+
+    def get(self, mc_address, peer_id):
+        with self._lock:
+            return self._load().get(mc_address, {}).get(peer_id)
+
+    def put(self, mc_address, peer_id, agent_id):
+        with self._lock:
+            agents = self._load().setdefault(mc_address, {})
+            if agents.get(peer_id) != agent_id:
+                agents[peer_id] = agent_id
+                self._save()
+
+    def forget(self, mc_address, peer_id):
+        with self._lock:
+            if self._load().get(mc_address, {}).pop(peer_id, None) is not None:
+                self._save()
@@ -1,36 +1,86 @@
+"""
+Logger for the example scripts.
+
+Logs through a queue: callers only enqueue records, listener threads format
+them and write INFO and below to stdout, errors to stderr. The queue
+handler, correlation filter, INFO sampling and JSON formatter come from
+logging_setup.py, a copy of shotgrid-webhooks-firebase/functions/logging_setup.py
+(see its docstring); only the `Logger` facade below is specific to the
+scripts.
+"""
 from sys import stdout, stderr
+from contextlib import contextmanager
+from logging.handlers import QueueListener
+import atexit
 import logging
 import os
+import queue
+
+from logging_setup import ContextFilter, JsonFormatter, MergingQueueHandler, request_context
 
 IS_DEBUG = os.getenv("DEBUG") == "1"
+# "json" writes one structured (Cloud Logging compatible) entry per line
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()
+# Fraction of correlation contexts whose INFO/DEBUG lines are kept (warnings and errors always are)
+LOG_INFO_SAMPLE_RATE = float(os.getenv("LOG_INFO_SAMPLE_RATE", "1"))
 
 
 class Logger:
-    FORMATTER = logging.Formatter('[ %(asctime)s ][ %(levelname)s ] %(message)s')
+    """
+    Pass `%`-style arguments (`logger.info("Created job %s", job_id)`) so the
+    message is only built for records that are actually emitted.
+    """
+    FORMATTER = logging.Formatter('[ %(asctime)s ][ %(levelname)s ][ %(request_id)s ] %(message)s')
     LOG_LEVEL = logging.DEBUG if IS_DEBUG else logging.INFO
 
     def __init__(self):
+        formatter = JsonFormatter() if LOG_FORMAT == "json" else self.FORMATTER
+
+        # create stdout stream handler
+        self.stdout_handler = logging.StreamHandler(stream=stdout)
+        self.stdout_handler.setFormatter(formatter)
+        self.stdout_handler.setLevel(self.LOG_LEVEL)
+
+        # create stderr stream handler
+        self.stderr_handler = logging.StreamHandler(stream=stderr)
+        self.stderr_handler.setFormatter(formatter)
+        self.stderr_handler.setLevel(logging.ERROR)
+
         # info logger
         self.logger = logging.getLogger("info")
         self.logger.setLevel(self.LOG_LEVEL)
+        self.info_listener = self._attach_queue(self.logger, self.stdout_handler)
 
         # error logger
         self.error_logger = logging.getLogger("error")
         self.error_logger.setLevel(logging.ERROR)
+        self.error_listener = self._attach_queue(self.error_logger, self.stderr_handler)
 
-        # create stdout stream handler
-        self.stdout_handler = logging.StreamHandler(stream=stdout)
-        self.stdout_handler.setFormatter(self.FORMATTER)
-        self.stdout_handler.setLevel(self.LOG_LEVEL)
+        atexit.register(self.flush)
 
-        self.logger.addHandler(self.stdout_handler)
+    @staticmethod
+    def _attach_queue(target, stream_handler):
+        """Loggers only enqueue; stream I/O happens on the listener thread."""
+        log_queue = queue.SimpleQueue()
+        queue_handler = MergingQueueHandler(log_queue)
+        queue_handler.addFilter(ContextFilter())
+        target.addHandler(queue_handler)
+        target.propagate = False
+        listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+        listener.start()
+        return listener
 
-        # create stderr stream handler
-        self.stderr_handler = logging.StreamHandler(stream=stderr)
-        self.stderr_handler.setFormatter(self.FORMATTER)
-        self.stderr_handler.setLevel(logging.ERROR)
+    def flush(self):
+        """Drain queued records and stop the writer threads (runs at exit)."""
+        for listener in (self.info_listener, self.error_listener):
+            if listener._thread is not None:
+                listener.stop()
 
-        self.error_logger.addHandler(self.stderr_handler)
+    @contextmanager
+    def correlation(self, correlation_id=None):
+        """Tag records logged inside the block (e.g. one job run) with a shared id."""
+        with request_context(correlation_id, LOG_INFO_SAMPLE_RATE) as correlation_id:
+            yield correlation_id
 
     def error(self, *args, backtrace=False):
         self.error_logger.error(*args, exc_info=backtrace)
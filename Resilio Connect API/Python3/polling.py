@@ -0,0 +1,231 @@
+"""
+Adaptive polling policy for job-run watchers.
+
+Polling a run at a fixed interval wastes console calls on long runs and
+detects short ones late. `AdaptivePollPolicy` picks the next delay from
+what it has seen so far:
+
+- right after the status changes (or the first poll) it polls at
+  `min_interval`, since more changes tend to follow
+- while the status stays the same, the delay grows by `backoff` per poll
+  up to `max_interval`
+- when progress or an ETA is reported, it predicts the finish time and
+  never sleeps past it, so the finish is seen about as soon as it happens
+- without progress or an ETA there is nothing to predict the finish from,
+  so the delay stays at most `blind_interval` (the fixed interval being
+  replaced) and the finish is seen no later than a fixed poller would
+- every delay gets +/- `jitter` (proportional), so many watchers started
+  together spread out instead of hitting the console in bursts
+
+One policy instance per watched run. Run this module to compare it with
+fixed-interval polling on simulated runs:
+
+    python polling.py --runs 500 --interval 5
+
+The legacy samples in ../Python carry a copy of this file, so each folder
+stays self-contained. Edit Python3/polling.py and copy it over;
+Python3/tests/test_polling.py fails while the two differ.
+"""
+import random
+import time
+
+# Keys read from a run (or job-run agent) dict to estimate progress
+PROGRESS_KEYS = ("progress", "percent")
+ETA_KEYS = ("eta", "eta_seconds")
+SIZE_KEYS = (("transferred", "size"), ("size_completed", "size_total"), ("files_completed", "files_total"))
+
+# The interval the watchers polled at before this policy
+DEFAULT_FIXED_INTERVAL = 5.0
+
+
+def run_progress(run):
+    """
+    (fraction done 0..1 or None, eta seconds or None) from a run dict.
+
+    Understands `progress`/`percent` (0..1 or 0..100), `eta`, and
+    completed/total pairs such as `transferred`/`size`.
+    """
+    if not isinstance(run, dict):
+        return None, None
+    eta = next((float(run[k]) for k in ETA_KEYS if isinstance(run.get(k), (int, float))), None)
+    for key in PROGRESS_KEYS:
+        value = run.get(key)
+        if isinstance(value, (int, float)):
+            return (value / 100.0 if value > 1 else float(value)), eta
+    for done_key, total_key in SIZE_KEYS:
+        done, total = run.get(done_key), run.get(total_key)
+        if isinstance(done, (int, float)) and isinstance(total, (int, float)) and total > 0:
+            return min(1.0, done / float(total)), eta
+    return None, eta
+
+
+class AdaptivePollPolicy:
+    def __init__(self, min_interval=1.0, max_interval=60.0, backoff=1.6, jitter=0.15,
+                 finish_margin=None, blind_interval=DEFAULT_FIXED_INTERVAL, rng=None, clock=time.monotonic):
+        """
+        :param min_interval: delay after a status change, seconds
+        :param max_interval: cap for the delay while nothing changes, seconds
+        :param backoff: factor the delay grows by per unchanged poll
+        :param jitter: +/- fraction applied to every delay
+        :param finish_margin: seconds to poll after a predicted finish
+            (half of `min_interval` by default)
+        :param blind_interval: cap for the delay while neither progress nor
+            an ETA is known, seconds
+        :param rng: random.Random for the jitter (a private one by default)
+        :param clock: monotonic clock, seconds
+        """
+        self.min_interval = min_interval
+        self.max_interval = max(max_interval, min_interval)
+        self.backoff = backoff
+        self.jitter = jitter
+        self.finish_margin = min_interval / 2.0 if finish_margin is None else finish_margin
+        self.blind_interval = min(self.max_interval, max(blind_interval, min_interval))
+        self._rng = rng or random.Random()
+        self._clock = clock
+        self._interval = min_interval
+        self._status = None
+        self._samples = []  # (time, fraction done), last few
+        self.polls = 0
+
+    @classmethod
+    def for_interval(cls, interval, **kwargs):
+        """
+        A policy for code that used a fixed `interval`: starts 5x faster and
+        backs off to 6x slower, but only while it can predict the finish;
+        otherwise it polls at most every `interval`. Keyword arguments
+        override any of these.
+        """
+        kwargs.setdefault("min_interval", interval / 5.0)
+        kwargs.setdefault("max_interval", interval * 6)
+        kwargs.setdefault("blind_interval", interval)
+        return cls(**kwargs)
+
+    def reset(self):
+        """Poll soon again, e.g. after an outside hint that the run changed."""
+        self._interval = self.min_interval
+        self._samples = []
+
+    def predicted_finish(self):
+        """Seconds until the run is expected to finish, from recent progress, or None."""
+        if len(self._samples) < 2:
+            return None
+        (t0, p0), (t1, p1) = self._samples[0], self._samples[-1]
+        if t1 <= t0 or p1 <= p0:
+            return None
+        rate = (p1 - p0) / (t1 - t0)
+        return max(0.0, (1.0 - p1) / rate - (self._clock() - t1))
+
+    def next_delay(self, status, progress=None, eta=None):
+        """
+        Record one poll result and return how long to wait before the next.
+
+        :param status: run status just observed
+        :param progress: fraction done (0..1), if known
+        :param eta: seconds to finish reported by the console, if known
+        """
+        now = self._clock()
+        self.polls += 1
+        if status != self._status:
+            self._status = status
+            self.reset()
+        else:
+            self._interval = min(self.max_interval, self._interval * self.backoff)
+
+        if progress is not None:
+            self._samples = (self._samples + [(now, float(progress))])[-5:]
+        remaining = eta if eta is not None else self.predicted_finish()
+
+        delay = self._interval
+        if remaining is None:
+            # Nothing to predict the finish from: never slower than a fixed poller
+            delay = min(delay, self.blind_interval)
+        else:
+            # Don't sleep past the predicted finish; close to it, poll tightly
+            delay = min(delay, max(self.min_interval, remaining + self.finish_margin))
+        return self._jittered(delay)
+
+    def after_error(self):
+        """Delay after a failed poll: back off without changing what was seen."""
+        self._interval = min(self.max_interval, self._interval * self.backoff)
+        return self._jittered(self._interval)
+
+    def _jittered(self, delay):
+        if self.jitter:
+            delay *= 1.0 + self._rng.uniform(-self.jitter, self.jitter)
+        return max(0.05, delay)
+
+
+class FixedPollPolicy:
+    """The previous behaviour, kept for comparison and for callers that need it."""
+
+    def __init__(self, interval=5.0):
+        self.interval = interval
+        self.polls = 0
+
+    def reset(self):
+        pass
+
+    def next_delay(self, status, progress=None, eta=None):
+        self.polls += 1
+        return self.interval
+
+    def after_error(self):
+        return self.interval
+
+
+def _simulate(policy_factory, durations):
+    """Console calls and detection delay per run for runs of the given durations (virtual time)."""
+    calls = latency = 0.0
+    for duration in durations:
+        now = [0.0]
+        policy = policy_factory(lambda: now[0])
+        # A short queue before transferring starts, then steady progress
+        queued = min(duration * 0.1, 5.0)
+        while True:
+            calls += 1
+            t = now[0]
+            if t >= duration:
+                latency += t - duration
+                break
+            status = "queued" if t < queued else "working"
+            progress = None if t < queued else (t - queued) / (duration - queued)
+            now[0] += policy.next_delay(status, progress)
+    return calls / len(durations), latency / len(durations)
+
+
+def main():
+    import argparse
+
+    p = argparse.ArgumentParser(description="Compare fixed and adaptive polling on simulated job runs")
+    p.add_argument("--runs", type=int, default=500)
+    p.add_argument("--interval", type=float, default=5.0, help="The fixed interval being replaced")
+    p.add_argument("--seed", type=int, default=1)
+    args = p.parse_args()
+
+    rng = random.Random(args.seed)
+    # Log-uniform durations: from ten seconds to ten hours
+    durations = [10 ** rng.uniform(1, 4.56) for _ in range(args.runs)]
+    print("%d simulated runs, %.0fs to %.0fs" % (args.runs, min(durations), max(durations)))
+    for label, factory in (
+        ("fixed %gs" % args.interval, lambda clock: FixedPollPolicy(args.interval)),
+        ("adaptive, no progress", lambda clock: _NoProgress(AdaptivePollPolicy.for_interval(
+            args.interval, rng=random.Random(args.seed), clock=clock))),
+        ("adaptive", lambda clock: AdaptivePollPolicy.for_interval(
+            args.interval, rng=random.Random(args.seed), clock=clock)),
+    ):
+        calls, latency = _simulate(factory, durations)
+        print("  %-22s %8.1f calls/run  %6.2fs mean detection delay" % (label, calls, latency))
+
+
+class _NoProgress:
+    """Simulation helper: a policy that never sees progress."""
+
+    def __init__(self, policy):
+        self.policy = policy
+
+    def next_delay(self, status, progress=None, eta=None):
+        return self.policy.next_delay(status)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,312 @@
+"""
+Job run progress: throughput, ETA and stragglers per run and per agent.
+
+`ProgressTracker` samples followed runs (`_get_job_run` and the paged
+run agents, see run_status.py) and keeps the last `samples`
+readings of bytes and files completed per agent in a fixed-size ring
+buffer. From those it derives throughput over a sliding window, an ETA,
+and which agents are falling behind the others.
+
+As a terminal dashboard:
+
+    python3 progress.py --address https://mc.example.com:8443 --token <token> 123 124 125
+"""
+import statistics
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from errors import ApiError
+from examples import FINAL_JOB_RUN_STATUSES
+from logger import logger
+from run_status import BYTES_FIELDS, FILES_FIELDS, iter_job_run_agents, transfer_counters
+
+
+class TransferSeries:
+    """Samples of one transfer (a run or one agent of a run), oldest dropped first."""
+
+    def __init__(self, size=120):
+        self.samples = deque(maxlen=size)  # (time, bytes done, files done)
+        self.bytes_total = None
+        self.files_total = None
+        self.status = None
+        self.errors = None
+
+    def add(self, at, item):
+        """Record one run / run-agent dict observed at monotonic time `at`"""
+        bytes_done, self.bytes_total = transfer_counters(item, BYTES_FIELDS)
+        files_done, self.files_total = transfer_counters(item, FILES_FIELDS)
+        self.status = item.get("status", self.status)
+        self.errors = item.get("errors", self.errors)
+        if bytes_done is None:
+            return
+        if self.samples and bytes_done < self.samples[-1][1]:
+            # Counters went backwards: the transfer restarted, old rates no longer apply
+            self.samples.clear()
+        self.samples.append((at, bytes_done, files_done or 0))
+
+    @property
+    def done(self):
+        return self.status in FINAL_JOB_RUN_STATUSES
+
+    @property
+    def bytes_done(self):
+        return self.samples[-1][1] if self.samples else 0
+
+    @property
+    def files_done(self):
+        return self.samples[-1][2] if self.samples else 0
+
+    def progress(self):
+        """Fraction of bytes completed, None while the total is unknown"""
+        if self.done and self.status == "finished":
+            return 1.0
+        if not self.bytes_total:
+            return None
+        return min(1.0, self.bytes_done / float(self.bytes_total))
+
+    def rates(self, window_s=60.0):
+        """(bytes/s, files/s) between the newest sample and the oldest one inside `window_s`"""
+        if len(self.samples) < 2:
+            return None, None
+        t1, b1, f1 = self.samples[-1]
+        t0, b0, f0 = next(s for s in self.samples if s[0] >= t1 - window_s or s is self.samples[-2])
+        if t1 <= t0:
+            return None, None
+        return (b1 - b0) / (t1 - t0), (f1 - f0) / (t1 - t0)
+
+    def eta(self, window_s=60.0):
+        """Seconds left at the current throughput, 0 when done, None when unknown or stalled"""
+        if self.done:
+            return 0.0
+        rate, _ = self.rates(window_s)
+        if not rate or self.bytes_total is None:
+            return None
+        return max(0.0, (self.bytes_total - self.bytes_done) / rate)
+
+
+class RunProgress:
+    def __init__(self, job_run_id, samples=120):
+        self.job_run_id = job_run_id
+        self.samples = samples
+        self.run = TransferSeries(samples)
+        self.agents = {}  # agent_id -> TransferSeries
+        self.names = {}
+        self.last_sampled = None
+
+    def add(self, at, job_run, job_run_agents):
+        self.run.add(at, job_run)
+        for item in job_run_agents:
+            agent_id = item["agent_id"]
+            if agent_id not in self.agents:
+                self.agents[agent_id] = TransferSeries(self.samples)
+            self.agents[agent_id].add(at, item)
+            if item.get("name"):
+                self.names[agent_id] = item["name"]
+        self.last_sampled = at
+
+    def eta(self, window_s=60.0):
+        """
+        Seconds until the run is done: the slowest agent's ETA (None while
+        any agent is stalled), or the run totals' ETA when agents don't
+        report sizes
+        """
+        if self.run.done:
+            return 0.0
+        if self.agents and all(series.bytes_total is not None for series in self.agents.values()):
+            agent_etas = [series.eta(window_s) for series in self.agents.values()]
+            return None if None in agent_etas else max(agent_etas)
+        return self.run.eta(window_s)
+
+    def stragglers(self, factor=2.0, window_s=60.0):
+        """
+        Agents that are not done and are well behind the others: an ETA more
+        than `factor` times the median ETA, or no progress at all in the
+        window while other agents are moving
+        """
+        active = {a: s for a, s in self.agents.items() if not s.done}
+        etas = {a: s.eta(window_s) for a, s in active.items()}
+        known = [eta for eta in etas.values() if eta is not None]
+        if len(active) < 2 or not known:
+            return []
+        median = statistics.median(known)
+        return sorted(a for a, eta in etas.items()
+                      if (eta is None and len(active[a].samples) > 1) or
+                      (eta is not None and eta > factor * max(median, 1.0)))
+
+    def snapshot(self, window_s=60.0, straggler_factor=2.0):
+        """
+        Current state as a dict:
+        {
+            "job_run_id": <id>, "status": <status>, "progress": <0..1 or None>,
+            "bytes_per_s": <float or None>, "files_per_s": <float or None>, "eta_s": <float or None>,
+            "stragglers": [<agent_id>, ...],
+            "agents": [{"agent_id", "name", "status", "progress", "bytes_per_s", "files_per_s", "eta_s", "errors"}, ...]
+        }
+        """
+        bytes_per_s, files_per_s = self.run.rates(window_s)
+        agents = []
+        for agent_id, series in sorted(self.agents.items()):
+            agent_bytes_per_s, agent_files_per_s = series.rates(window_s)
+            agents.append({
+                "agent_id": agent_id,
+                "name": self.names.get(agent_id),
+                "status": series.status,
+                "progress": series.progress(),
+                "bytes_per_s": agent_bytes_per_s,
+                "files_per_s": agent_files_per_s,
+                "eta_s": series.eta(window_s),
+                "errors": series.errors,
+            })
+        if bytes_per_s is None and agents:
+            # Run totals missing: sum what the agents report
+            rates = [a["bytes_per_s"] for a in agents if a["bytes_per_s"] is not None]
+            bytes_per_s = sum(rates) if rates else None
+        return {
+            "job_run_id": self.job_run_id,
+            "status": self.run.status,
+            "progress": self.run.progress(),
+            "bytes_per_s": bytes_per_s,
+            "files_per_s": files_per_s,
+            "eta_s": self.eta(window_s),
+            "stragglers": self.stragglers(straggler_factor, window_s),
+            "agents": agents,
+        }
+
+
+class ProgressTracker:
+    def __init__(self, api, samples=120, window_s=60.0, straggler_factor=2.0, workers=4):
+        """
+        :param api: ApiBaseCommands instance (e.g. ConnectApiExample)
+        :param samples: readings kept per run and per agent
+        :param window_s: throughput is averaged over this many seconds
+        :param straggler_factor: see RunProgress.stragglers
+        :param workers: runs sampled in parallel
+        """
+        self.api = api
+        self.samples = samples
+        self.window_s = window_s
+        self.straggler_factor = straggler_factor
+        self.workers = workers
+        self.runs = {}
+
+    def follow(self, job_run_id):
+        if job_run_id not in self.runs:
+            self.runs[job_run_id] = RunProgress(job_run_id, self.samples)
+        return self.runs[job_run_id]
+
+    def unfollow(self, job_run_id):
+        self.runs.pop(job_run_id, None)
+
+    def active(self):
+        """Followed runs that are not in a final status yet"""
+        return [run_id for run_id, run in self.runs.items() if not run.run.done]
+
+    def sample(self):
+        """Take one reading of every active run; returns the ids that failed to sample"""
+        run_ids = self.active()
+        if not run_ids:
+            return []
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(run_ids))) as pool:
+            results = list(pool.map(self._sample_one, run_ids))
+        return [run_id for run_id, ok in zip(run_ids, results) if not ok]
+
+    def _sample_one(self, job_run_id):
+        try:
+            job_run = self.api._get_job_run(job_run_id)
+            job_run_agents = list(iter_job_run_agents(self.api, job_run_id))
+        except ApiError as e:
+            logger.warning("Failed to sample job run %s: %s", job_run_id, e)
+            return False
+        self.runs[job_run_id].add(time.monotonic(), job_run, job_run_agents)
+        return True
+
+    def snapshot(self, job_run_id):
+        return self.runs[job_run_id].snapshot(self.window_s, self.straggler_factor)
+
+    def snapshots(self):
+        return [self.snapshot(run_id) for run_id in self.runs]
+
+
+# ─────────────── Dashboard ───────────────
+
+def _fmt_bytes(value):
+    if value is None:
+        return "-"
+    for unit in ("B", "KB", "MB", "GB", "TB"):
+        if abs(value) < 1024 or unit == "TB":
+            return "%.1f %s" % (value, unit)
+        value /= 1024.0
+
+
+def _fmt_eta(seconds):
+    if seconds is None:
+        return "-"
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return "%dh%02dm" % (seconds // 3600, seconds % 3600 // 60)
+    return "%dm%02ds" % (seconds // 60, seconds % 60)
+
+
+def _fmt_progress(progress):
+    return "-" if progress is None else "%5.1f%%" % (progress * 100)
+
+
+def render(snapshots, show_agents=True):
+    """Dashboard text for a list of RunProgress snapshots"""
+    lines = ["%-10s %-12s %7s %12s %9s  %s" % ("RUN", "STATUS", "DONE", "SPEED", "ETA", "STRAGGLERS")]
+    for snap in snapshots:
+        lines.append("%-10s %-12s %7s %10s/s %9s  %s" % (
+            snap["job_run_id"], snap["status"] or "?", _fmt_progress(snap["progress"]),
+            _fmt_bytes(snap["bytes_per_s"]), _fmt_eta(snap["eta_s"]),
+            ", ".join(str(a) for a in snap["stragglers"]) or "-"))
+        if not show_agents:
+            continue
+        stragglers = set(snap["stragglers"])
+        for agent in snap["agents"]:
+            lines.append("  %s %-17s %-12s %7s %10s/s %9s%s" % (
+                "!" if agent["agent_id"] in stragglers else " ",
+                (agent["name"] or str(agent["agent_id"]))[:17], agent["status"] or "?",
+                _fmt_progress(agent["progress"]), _fmt_bytes(agent["bytes_per_s"]), _fmt_eta(agent["eta_s"]),
+                "  errors: %s" % agent["errors"] if agent["errors"] else ""))
+    return "\n".join(lines)
+
+
+def main():
+    import argparse
+    import os
+    from examples import ConnectApiExample
+
+    p = argparse.ArgumentParser(description="Follow job runs: throughput, ETA and stragglers per agent")
+    p.add_argument("job_run_ids", nargs="+", type=int)
+    p.add_argument("--address", default=os.getenv("RESILIO_MC_URL"), help="https://mc.example.com:8443")
+    p.add_argument("--token", default=os.getenv("RESILIO_AUTH_TOKEN"))
+    p.add_argument("--interval", type=float, default=5.0, help="Seconds between samples")
+    p.add_argument("--window", type=float, default=60.0, help="Seconds of samples throughput is averaged over")
+    p.add_argument("--runs-only", action="store_true", help="Hide the per-agent lines")
+    p.add_argument("--once", action="store_true", help="Print two samples --interval apart and exit")
+    args = p.parse_args()
+    if not args.address or not args.token:
+        p.error("--address and --token (or RESILIO_MC_URL / RESILIO_AUTH_TOKEN) are required")
+
+    tracker = ProgressTracker(ConnectApiExample(args.address, args.token), window_s=args.window)
+    for job_run_id in args.job_run_ids:
+        tracker.follow(job_run_id)
+
+    rounds = 0
+    while True:
+        started = time.monotonic()
+        tracker.sample()
+        rounds += 1
+        if not args.once:
+            print("\033[H\033[J", end="")
+        if rounds > 1 or not args.once:
+            print(time.strftime("%H:%M:%S"), "- %d of %d runs active" % (len(tracker.active()), len(tracker.runs)))
+            print(render(tracker.snapshots(), show_agents=not args.runs_only), flush=True)
+        if not tracker.active() or (args.once and rounds > 1):
+            break
+        time.sleep(max(0.0, args.interval - (time.monotonic() - started)))
+
+
+if __name__ == "__main__":
+    main()
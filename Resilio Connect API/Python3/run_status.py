@@ -0,0 +1,250 @@
+"""
+Job run status for runs with thousands of agents.
+
+`iter_job_run_agents` pages through `/runs/{id}/agents` instead of
+downloading every record at once, passes filters to the console where it
+can, and re-checks them locally (set membership), so callers see the same
+result whether or not the console honours them. `RunStatusSummary` folds
+the records into status counts, grouped errors and byte/file totals in one
+pass, with memory bounded by the number of distinct statuses and error
+groups rather than by the number of agents. `export_job_run_agents` writes
+the records as NDJSON or CSV while paging.
+
+From the command line:
+
+    python3 run_status.py --address https://mc.example.com:8443 --token <token> 123
+    python3 run_status.py ... 123 --export agents.csv
+"""
+import csv
+import json
+import re
+from collections import Counter
+
+from errors import ApiNotFoundError
+from logger import logger
+
+# (completed, total) field names, in order of preference, in run and run-agent dicts
+BYTES_FIELDS = (("size_completed", "size_total"), ("transferred", "size"))
+FILES_FIELDS = (("files_completed", "files_total"),)
+
+# Columns of the CSV export; NDJSON keeps the whole record
+CSV_FIELDS = ("agent_id", "name", "status", "size_total", "size_completed", "files_total", "files_completed", "error")
+
+# RunStatusSummary keeps this many error groups and example agents per group
+MAX_ERROR_GROUPS = 50
+MAX_ERROR_EXAMPLES = 5
+
+_DIGITS = re.compile(r"\d+")
+
+
+def transfer_counters(item, fields):
+    """(completed, total) from the first pair of `fields` present in `item`, or (None, None)"""
+    for done_key, total_key in fields:
+        if item.get(done_key) is not None or item.get(total_key) is not None:
+            return item.get(done_key) or 0, item.get(total_key)
+    return None, None
+
+
+def agent_error(item):
+    """Error text of a run-agent record, or None"""
+    errors = item.get("errors")
+    if isinstance(errors, list) and errors:
+        first = errors[0]
+        return str(first.get("message") or first.get("code") or first) if isinstance(first, dict) else str(first)
+    return item.get("error") or item.get("message") or None
+
+
+def iter_job_run_agents(api, job_run_id, agents_ids=None, statuses=None, page_size=500, direct_lookup_max=10):
+    """
+    Yield the run-agent records of a job run, one page at a time
+
+    :param api: ApiBaseCommands instance
+    :param job_run_id: Job Run ID
+    :param agents_ids: only these agents, optional
+    :param statuses: only agents in these statuses, optional
+    :param page_size: records per request
+    :param direct_lookup_max: up to this many `agents_ids` are fetched one by one
+        instead of paging through the whole run
+    :return: generator of run-agent dicts
+    :raises ApiError: if the run can't be read; agents that aren't in the run are skipped
+    """
+
+    agents_ids = None if agents_ids is None else set(agents_ids)
+    statuses = None if statuses is None else set(statuses)
+
+    if agents_ids is not None and len(agents_ids) <= direct_lookup_max:
+        found = False
+        for agent_id in sorted(agents_ids):
+            try:
+                item = api._get_job_run_agent(job_run_id, agent_id)
+            except ApiNotFoundError as e:
+                logger.debug("Agent %s not in job run %s: %s", agent_id, job_run_id, e)
+                continue
+            found = True
+            if statuses is None or item.get("status") in statuses:
+                yield item
+        if not found:
+            # Every lookup said "not found": make sure it's the agents and not the run
+            api._get_job_run(job_run_id)
+        return
+
+    params = {"limit": page_size}
+    if statuses is not None and len(statuses) == 1:
+        params["status"] = next(iter(statuses))
+
+    offset = 0
+    first_of_previous_page = None
+    while True:
+        page = api._get_job_run_agents(job_run_id, dict(params, offset=offset))
+        items = page.get("data", []) if isinstance(page, dict) else page
+        if not items:
+            return
+        if first_of_previous_page is not None and items[0].get("agent_id") == first_of_previous_page:
+            # The console ignored the offset and sent the first page again
+            logger.warning("Job run %s agents: paging not supported, stopping after one page", job_run_id)
+            return
+        first_of_previous_page = items[0].get("agent_id")
+
+        for item in items:
+            if agents_ids is not None and item.get("agent_id") not in agents_ids:
+                continue
+            if statuses is not None and item.get("status") not in statuses:
+                continue
+            yield item
+
+        if len(items) != page_size:
+            # A short page is the last one; a longer one means the limit was ignored
+            return
+        offset += len(items)
+
+
+class RunStatusSummary:
+    def __init__(self, max_error_groups=MAX_ERROR_GROUPS, max_examples=MAX_ERROR_EXAMPLES):
+        self.max_error_groups = max_error_groups
+        self.max_examples = max_examples
+        self.agents = 0
+        self.statuses = Counter()
+        self.errors = {}  # normalized message -> {"message", "count", "agents"}
+        self.other_errors = 0
+        self.size_total = self.size_completed = 0
+        self.files_total = self.files_completed = 0
+
+    def add(self, item):
+        self.agents += 1
+        self.statuses[item.get("status")] += 1
+
+        size_completed, size_total = transfer_counters(item, BYTES_FIELDS)
+        files_completed, files_total = transfer_counters(item, FILES_FIELDS)
+        self.size_completed += size_completed or 0
+        self.size_total += size_total or 0
+        self.files_completed += files_completed or 0
+        self.files_total += files_total or 0
+
+        error = agent_error(item)
+        if error:
+            # Group "Disk full on /mnt/12" and "Disk full on /mnt/7" together
+            key = _DIGITS.sub("N", error)
+            group = self.errors.get(key)
+            if group is None:
+                if len(self.errors) >= self.max_error_groups:
+                    self.other_errors += 1
+                    return
+                group = self.errors[key] = {"message": error, "count": 0, "agents": []}
+            group["count"] += 1
+            if len(group["agents"]) < self.max_examples:
+                group["agents"].append(item.get("agent_id"))
+
+    def to_dict(self):
+        """
+        {
+            "agents": <count>,
+            "statuses": {<status>: <count>},
+            "errors": [{"message": <first message>, "count": <count>, "agents": [<example agent ids>]}],
+            "other_errors": <errors beyond the kept groups>,
+            "size_total": <bytes>, "size_completed": <bytes>, "progress": <0..1 or None>,
+            "files_total": <count>, "files_completed": <count>
+        }
+        """
+        return {
+            "agents": self.agents,
+            "statuses": dict(self.statuses),
+            "errors": sorted(self.errors.values(), key=lambda group: -group["count"]),
+            "other_errors": self.other_errors,
+            "size_total": self.size_total,
+            "size_completed": self.size_completed,
+            "progress": self.size_completed / float(self.size_total) if self.size_total else None,
+            "files_total": self.files_total,
+            "files_completed": self.files_completed,
+        }
+
+
+def summarize_job_run(api, job_run_id, agents_ids=None, statuses=None, page_size=500):
+    """RunStatusSummary.to_dict() of a job run, built while paging"""
+    summary = RunStatusSummary()
+    for item in iter_job_run_agents(api, job_run_id, agents_ids, statuses, page_size):
+        summary.add(item)
+    return summary.to_dict()
+
+
+def export_job_run_agents(api, job_run_id, out, fmt="ndjson", agents_ids=None, statuses=None, page_size=500):
+    """
+    Write the run-agent records of a job run to a text file object
+
+    :param fmt: "ndjson" (one full record per line) or "csv" (CSV_FIELDS columns)
+    :return: number of records written
+    """
+
+    if fmt not in ("ndjson", "csv"):
+        raise ValueError("Unknown export format '{}' (use 'ndjson' or 'csv')".format(fmt))
+
+    writer = None
+    if fmt == "csv":
+        writer = csv.DictWriter(out, fieldnames=CSV_FIELDS, extrasaction="ignore")
+        writer.writeheader()
+
+    written = 0
+    for item in iter_job_run_agents(api, job_run_id, agents_ids, statuses, page_size):
+        if writer is not None:
+            writer.writerow(dict(item, error=agent_error(item)))
+        else:
+            out.write(json.dumps(item, separators=(",", ":")))
+            out.write("\n")
+        written += 1
+    return written
+
+
+def main():
+    import argparse
+    import os
+    import sys
+    from examples import ConnectApiExample
+
+    p = argparse.ArgumentParser(description="Summarize or export the agents of a job run")
+    p.add_argument("job_run_id", type=int)
+    p.add_argument("--address", default=os.getenv("RESILIO_MC_URL"), help="https://mc.example.com:8443")
+    p.add_argument("--token", default=os.getenv("RESILIO_AUTH_TOKEN"))
+    p.add_argument("--agents", type=int, nargs="*", help="Only these agent ids")
+    p.add_argument("--status", nargs="*", help="Only agents in these statuses")
+    p.add_argument("--page-size", type=int, default=500)
+    p.add_argument("--export", metavar="PATH", help="Write records to PATH (.csv or .ndjson, '-' for stdout)")
+    p.add_argument("--format", choices=("ndjson", "csv"), help="Export format (default: from the file extension)")
+    args = p.parse_args()
+    if not args.address or not args.token:
+        p.error("--address and --token (or RESILIO_MC_URL / RESILIO_AUTH_TOKEN) are required")
+
+    api = ConnectApiExample(args.address, args.token)
+    if args.export:
+        fmt = args.format or ("csv" if args.export.endswith(".csv") else "ndjson")
+        if args.export == "-":
+            written = export_job_run_agents(api, args.job_run_id, sys.stdout, fmt, args.agents, args.status, args.page_size)
+        else:
+            with open(args.export, "w", newline="") as out:
+                written = export_job_run_agents(api, args.job_run_id, out, fmt, args.agents, args.status, args.page_size)
+        logger.info("Exported %s agents of job run %s", written, args.job_run_id)
+    else:
+        summary = summarize_job_run(api, args.job_run_id, args.agents, args.status, args.page_size)
+        print(json.dumps(summary, indent=4, sort_keys=True))
+
+
+if __name__ == "__main__":
+    main()
@@ -2,11 +2,36 @@
 from enum import Enum
 from functools import wraps
 from json import JSONDecodeError
+import threading
 import requests
+from requests.adapters import HTTPAdapter
 
 from errors import ApiConnectionError, ApiUnauthorizedError, ApiError
+from tracing import route_name, span
 
 BASE_API_URL = '/api/v2'
+POOL_SIZE = 16
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def shared_session(address):
+    """
+    One pooled, keep-alive session per Management Console address, shared by
+    every ApiBaseCommands instance (and the warm-up probe) in this process.
+    """
+    session = _sessions.get(address)
+    if session is None:
+        with _sessions_lock:
+            session = _sessions.get(address)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                _sessions[address] = session
+    return session
 
 
 def authorized_api_request(func):
@@ -18,10 +43,12 @@ def authorized_api_request(func):
         }
         kwargs['verify'] = self._verify
 
+        span_name = 'mc.{} {}'.format(func.__name__.lstrip('_').upper(), route_name(url))
         url = self._base_url + url
 
         try:
-            response = func(self, url, *args, **kwargs)
+            with span(span_name):
+                response = func(self, url, *args, **kwargs)
         except requests.RequestException as e:
             raise ApiConnectionError('Connection to Management Console failed', e)
 
@@ -46,23 +73,24 @@ class ApiBaseCommands:
         self._address = address
         self._base_url = address + BASE_API_URL
         self._verify = verify
+        self._session = shared_session(address)
 
     # Request methods
     @authorized_api_request
     def _get(self, *args, **kwargs):
-        return requests.get(*args, **kwargs)
+        return self._session.get(*args, **kwargs)
 
     @authorized_api_request
     def _post(self, *args, **kwargs):
-        return requests.post(*args, **kwargs)
+        return self._session.post(*args, **kwargs)
 
     @authorized_api_request
     def _put(self, *args, **kwargs):
-        return requests.put(*args, **kwargs)
+        return self._session.put(*args, **kwargs)
 
     @authorized_api_request
     def _delete(self, *args, **kwargs):
-        return requests.delete(*args, **kwargs)
+        return self._session.delete(*args, **kwargs)
 
     # Helpers
     def _create(self, *args, **kwargs):
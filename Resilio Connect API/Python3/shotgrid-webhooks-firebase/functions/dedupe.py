@@ -0,0 +1,317 @@
+"""
+De-duplication of ShotGrid webhook deliveries.
+
+ShotGrid retries failed deliveries and occasionally sends the same event
+twice. Each delivery is keyed on its event id (falling back to the delivery
+id) and the handler result is remembered, so a duplicate returns the earlier
+result without touching ShotGrid or Resilio again. Before handling, a
+delivery claims its key with an "in progress" entry: a retry that arrives
+while the first delivery is still running (a slow full sync) is answered
+as in progress instead of running everything again. Results are stored
+compacted (no per-job sync details).
+
+Two tiers:
+- an in-memory LRU with TTL, per function instance
+- an optional shared store (SQLite locally, Firestore in production) so
+  duplicates landing on another instance are caught too
+"""
+from __future__ import annotations
+
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+from state_model import json_default
+from sync_trigger import compact_result
+
+logger = logging.getLogger("shotgrid-webhooks.dedupe")
+
+# Stored under a key while its first delivery is being handled
+IN_PROGRESS: Dict[str, Any] = {"in_progress": True}
+
+
+def delivery_key(route: str, payload: Dict[str, Any], headers: Optional[Mapping[str, str]] = None) -> Optional[str]:
+    """Stable key for a webhook event, or None if the payload carries no ids."""
+    data = payload.get("data") or {}
+    event_id = data.get("event_log_entry_id") or data.get("id")
+    if event_id is not None:
+        return f"{route}:event:{event_id}"
+    delivery_id = payload.get("delivery_id") or (headers or {}).get("X-SG-Delivery-Id")
+    if delivery_id:
+        return f"{route}:delivery:{delivery_id}"
+    return None
+
+
+class LRUTTLCache:
+    """Bounded, thread-safe LRU whose entries also expire after `ttl_s`."""
+
+    def __init__(self, capacity: int = 4096, ttl_s: float = 3600.0):
+        self.capacity = capacity
+        self.ttl_s = ttl_s
+        self._lock = threading.Lock()
+        self._items: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._items.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+            return value
+
+    def put(self, key: str, value: Any, ttl_s: Optional[float] = None) -> None:
+        with self._lock:
+            self._put(key, value, ttl_s)
+
+    def add(self, key: str, value: Any, ttl_s: Optional[float] = None) -> Optional[Any]:
+        """Put `value` unless `key` has a live entry; returns that entry, or None if added."""
+        with self._lock:
+            entry = self._items.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._items.move_to_end(key)
+                return entry[1]
+            self._put(key, value, ttl_s)
+            return None
+
+    def pop(self, key: str) -> None:
+        with self._lock:
+            self._items.pop(key, None)
+
+    def _put(self, key: str, value: Any, ttl_s: Optional[float]) -> None:
+        self._items[key] = (time.monotonic() + (self.ttl_s if ttl_s is None else ttl_s), value)
+        self._items.move_to_end(key)
+        while len(self._items) > self.capacity:
+            self._items.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+class DedupeStore:
+    """Shared persistent tier."""
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def put(self, key: str, result: Dict[str, Any], ttl_s: float) -> None:
+        raise NotImplementedError
+
+    def add(self, key: str, result: Dict[str, Any], ttl_s: float) -> Optional[Dict[str, Any]]:
+        """Store `result` unless `key` has a live entry; returns that entry, or None if stored."""
+        raise NotImplementedError
+
+    def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+
+class SQLiteDedupeStore(DedupeStore):
+    def __init__(self, path: str):
+        self.path = path
+        with self._connect() as db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS deliveries ("
+                " key TEXT PRIMARY KEY, result TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+
+    @contextmanager
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=30)
+        try:
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    def get(self, key):
+        with self._connect() as db:
+            row = db.execute(
+                "SELECT result FROM deliveries WHERE key = ? AND expires_at > ?", (key, time.time())
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, key, result, ttl_s):
+        now = time.time()
+        with self._connect() as db:
+            db.execute(
+                "INSERT OR REPLACE INTO deliveries (key, result, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(result, default=json_default), now + ttl_s),
+            )
+            db.execute("DELETE FROM deliveries WHERE expires_at <= ?", (now,))
+
+    def add(self, key, result, ttl_s):
+        now = time.time()
+        with self._connect() as db:
+            db.execute("BEGIN IMMEDIATE")
+            row = db.execute(
+                "SELECT result FROM deliveries WHERE key = ? AND expires_at > ?", (key, now)
+            ).fetchone()
+            if row:
+                return json.loads(row[0])
+            db.execute(
+                "INSERT OR REPLACE INTO deliveries (key, result, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(result, default=json_default), now + ttl_s),
+            )
+        return None
+
+    def delete(self, key):
+        with self._connect() as db:
+            db.execute("DELETE FROM deliveries WHERE key = ?", (key,))
+
+
+class FirestoreDedupeStore(DedupeStore):
+    """Delivery results in a Firestore collection (set a TTL policy on `expires_at`)."""
+
+    def __init__(self, collection: str = "webhook_deliveries", client=None):
+        from google.cloud import firestore  # deferred: only needed in production
+
+        self._col = (client or firestore.Client()).collection(collection)
+
+    @staticmethod
+    def _doc_id(key: str) -> str:
+        return key.replace("/", "_")
+
+    def get(self, key):
+        snap = self._col.document(self._doc_id(key)).get()
+        if not snap.exists:
+            return None
+        doc = snap.to_dict() or {}
+        if doc.get("expires_at", 0) <= time.time():
+            return None
+        return json.loads(doc["result"])
+
+    def put(self, key, result, ttl_s):
+        self._col.document(self._doc_id(key)).set({
+            "result": json.dumps(result, default=json_default),
+            "expires_at": time.time() + ttl_s,
+        })
+
+    def add(self, key, result, ttl_s):
+        from google.api_core.exceptions import AlreadyExists
+
+        doc = {"result": json.dumps(result, default=json_default), "expires_at": time.time() + ttl_s}
+        try:
+            self._col.document(self._doc_id(key)).create(doc)
+            return None
+        except AlreadyExists:
+            previous = self.get(key)
+        if previous is None:
+            # The existing entry has expired; take it over
+            self._col.document(self._doc_id(key)).set(doc)
+        return previous
+
+    def delete(self, key):
+        self._col.document(self._doc_id(key)).delete()
+
+
+class DeliveryDeduper:
+    def __init__(self, capacity: int = 4096, ttl_s: float = 3600.0, store: Optional[DedupeStore] = None,
+                 in_progress_ttl_s: float = 600.0):
+        """
+        `in_progress_ttl_s` bounds how long a claim lives if its delivery
+        never finishes (the instance died): after that a retry runs again.
+        """
+        self.ttl_s = ttl_s
+        self.in_progress_ttl_s = in_progress_ttl_s
+        self.memory = LRUTTLCache(capacity, ttl_s)
+        self.store = store
+
+    def seen(self, key: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Previously computed result for `key`, if any."""
+        if key is None:
+            return None
+        result = self.memory.get(key)
+        if result is None and self.store is not None:
+            try:
+                result = self.store.get(key)
+            except Exception as e:
+                logger.warning("Dedupe store lookup failed for %s: %s", key, e)
+                return None
+            if result is not None:
+                self.memory.put(key, result)
+        return result
+
+    def begin(self, key: Optional[str]) -> Optional[Dict[str, Any]]:
+        """
+        Claim `key` for the delivery about to be handled. Returns None if
+        this delivery should run, otherwise what an earlier one left: its
+        result, or IN_PROGRESS while it is still running. Finish the claim
+        with remember() or forget().
+        """
+        if key is None:
+            return None
+        previous = self.memory.add(key, IN_PROGRESS, self.in_progress_ttl_s)
+        if previous is not None or self.store is None:
+            return previous
+        try:
+            previous = self.store.add(key, IN_PROGRESS, self.in_progress_ttl_s)
+        except Exception as e:
+            logger.warning("Dedupe store claim failed for %s: %s", key, e)
+            return None
+        if previous is not None:
+            # Another instance has it: keep its answer here, not our claim
+            if previous.get("in_progress"):
+                self.memory.pop(key)
+            else:
+                self.memory.put(key, previous)
+        return previous
+
+    def remember(self, key: Optional[str], result: Dict[str, Any]) -> None:
+        """
+        Record a result, compacted. Errors, including partly failed
+        ShotGrid writes (`write_errors`), are not remembered so redeliveries
+        retry them; their claim is dropped.
+        """
+        if key is None:
+            return
+        if "error" in result or result.get("write_errors"):
+            self.forget(key)
+            return
+        result = compact_result(result)
+        self.memory.put(key, result)
+        if self.store is not None:
+            try:
+                self.store.put(key, result, self.ttl_s)
+            except Exception as e:
+                logger.warning("Dedupe store write failed for %s: %s", key, e)
+
+    def forget(self, key: Optional[str]) -> None:
+        """Drop `key`, e.g. the claim of a delivery that failed."""
+        if key is None:
+            return
+        self.memory.pop(key)
+        if self.store is not None:
+            try:
+                self.store.delete(key)
+            except Exception as e:
+                logger.warning("Dedupe store delete failed for %s: %s", key, e)
+
+
+def make_deduper(conf: Dict[str, Any]) -> DeliveryDeduper:
+    """
+    In-memory tier always on; `DEDUPE_STORE` adds a shared tier:
+    "" (none), "sqlite" or "firestore", located by `DEDUPE_PATH`.
+    """
+    kind = (conf.get("DEDUPE_STORE") or "").lower()
+    location = conf.get("DEDUPE_PATH") or None
+    store: Optional[DedupeStore] = None
+    if kind == "sqlite":
+        store = SQLiteDedupeStore(location or "/tmp/shotgrid-webhooks-dedupe.db")
+    elif kind == "firestore":
+        store = FirestoreDedupeStore(location or "webhook_deliveries")
+    elif kind:
+        raise ValueError(f"Unknown DEDUPE_STORE '{kind}'")
+    return DeliveryDeduper(
+        capacity=int(conf.get("DEDUPE_CAPACITY", 4096)),
+        ttl_s=float(conf.get("DEDUPE_TTL_S", 3600)),
+        store=store,
+        in_progress_ttl_s=float(conf.get("DEDUPE_IN_PROGRESS_TTL_S", 600)),
+    )
@@ -0,0 +1,57 @@
+"""
+Thread-safe lazy initialization.
+
+Cold starts pay for everything done at import time, so expensive objects
+(the ShotGrid connection, parsed YAML mappings, cloud clients) are built on
+first use instead. Concurrent first callers block on one lock and share a
+single instance; later calls are a plain attribute read.
+"""
+from __future__ import annotations
+
+import threading
+from typing import Callable, Generic, Optional, TypeVar
+
+T = TypeVar("T")
+
+_UNSET = object()
+
+
+class Lazy(Generic[T]):
+    def __init__(self, factory: Callable[[], T], name: str = ""):
+        self._factory = factory
+        self._value = _UNSET
+        self._lock = threading.Lock()
+        self.name = name or getattr(factory, "__name__", "lazy")
+
+    def get(self) -> T:
+        value = self._value
+        if value is _UNSET:
+            with self._lock:
+                value = self._value
+                if value is _UNSET:
+                    value = self._value = self._factory()
+        return value
+
+    @property
+    def initialized(self) -> bool:
+        return self._value is not _UNSET
+
+    def peek(self) -> Optional[T]:
+        """The value if already built, without triggering initialization."""
+        value = self._value
+        return None if value is _UNSET else value
+
+    def set(self, value: T) -> None:
+        """Install a prebuilt value (e.g. a Mockgun client in local harnesses)."""
+        with self._lock:
+            self._value = value
+
+    def reset(self) -> None:
+        with self._lock:
+            self._value = _UNSET
+
+    @classmethod
+    def of(cls, value: T) -> "Lazy[T]":
+        lazy = cls(lambda: value)
+        lazy.set(value)
+        return lazy
@@ -0,0 +1,431 @@
+"""
+Lease backends for coordinating work across function instances.
+
+A lease is a named, time-limited ownership record plus a "pending" flag that
+other instances can raise while the lease is held. Backends:
+
+- MemoryLeaseBackend   – single process (default, local dev)
+- SQLiteLeaseBackend   – shared SQLite file (tests, single host)
+- FileLeaseBackend     – JSON files guarded by fcntl locks (tests, single host)
+- FirestoreLeaseBackend – Firestore documents updated in transactions (production)
+
+Pick one with `make_lease_backend(config)`.
+
+Every acquisition gets a fencing token, one higher than the last. The
+holder keeps the lease alive with a `LeaseHeartbeat`, and its `Fence` tells
+long-running work when the lease was lost, so an expired holder stops
+before a newer one's writes can be clobbered. Each run taken with
+`take_pending` gets a sequence number; the holder `publish`es the run's
+result under it, so callers that marked work pending can wait for the run
+that covers them (`read`) instead of starting their own.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger("shotgrid-webhooks.leases")
+
+
+class LeaseLostError(RuntimeError):
+    """The lease expired or was taken over while work was still running."""
+
+
+def _new_row() -> Dict[str, Any]:
+    return {"owner": None, "expires_at": 0.0, "pending": False, "token": 0,
+            "run_seq": 0, "done_seq": 0, "result": None}
+
+
+class LeaseBackend:
+    """Interface shared by all lease backends. All methods are atomic."""
+
+    def try_acquire(self, key: str, owner: str, ttl_s: float) -> Optional[int]:
+        """
+        Take the lease if it is free or expired; returns its fencing token,
+        or None if someone else holds it. Re-acquiring your own lease renews
+        it and keeps the token.
+        """
+        raise NotImplementedError
+
+    def renew(self, key: str, owner: str, ttl_s: float) -> bool:
+        """Extend a lease we hold. Returns False if it was lost."""
+        raise NotImplementedError
+
+    def release(self, key: str, owner: str) -> None:
+        raise NotImplementedError
+
+    def mark_pending(self, key: str) -> int:
+        """Record that work is wanted for `key`; returns the last started run's sequence number."""
+        raise NotImplementedError
+
+    def take_pending(self, key: str) -> int:
+        """Clear the pending flag. If it was set, a run starts: returns its sequence number, else 0."""
+        raise NotImplementedError
+
+    def has_pending(self, key: str) -> bool:
+        raise NotImplementedError
+
+    def publish(self, key: str, owner: str, token: int, run: int, result: Dict[str, Any]) -> bool:
+        """Store the result of run `run`, unless the lease has since changed hands."""
+        raise NotImplementedError
+
+    def read(self, key: str) -> Dict[str, Any]:
+        """Snapshot: owner, expires_at, pending, token, run_seq, done_seq, result (JSON text)."""
+        raise NotImplementedError
+
+
+class _RowLeaseBackend(LeaseBackend):
+    """Backends that can apply a function to the lease row (a dict) atomically."""
+
+    def _apply(self, key: str, fn: Callable[[Dict[str, Any]], Any]) -> Any:
+        raise NotImplementedError
+
+    def try_acquire(self, key, owner, ttl_s):
+        def _acquire(row):
+            now = time.time()
+            if row.get("owner") not in (None, owner) and row.get("expires_at", 0) > now:
+                return None
+            if row.get("owner") != owner or row.get("expires_at", 0) <= now:
+                row["token"] = row.get("token", 0) + 1
+            row["owner"], row["expires_at"] = owner, now + ttl_s
+            return row["token"]
+        return self._apply(key, _acquire)
+
+    def renew(self, key, owner, ttl_s):
+        def _renew(row):
+            if row.get("owner") != owner:
+                return False
+            row["expires_at"] = time.time() + ttl_s
+            return True
+        return self._apply(key, _renew)
+
+    def release(self, key, owner):
+        def _release(row):
+            if row.get("owner") == owner:
+                row["owner"], row["expires_at"] = None, 0.0
+        self._apply(key, _release)
+
+    def mark_pending(self, key):
+        def _mark(row):
+            row["pending"] = True
+            return row.get("run_seq", 0)
+        return self._apply(key, _mark)
+
+    def take_pending(self, key):
+        def _take(row):
+            if not row.get("pending"):
+                return 0
+            row["pending"] = False
+            row["run_seq"] = row.get("run_seq", 0) + 1
+            return row["run_seq"]
+        return self._apply(key, _take)
+
+    def has_pending(self, key):
+        return bool(self.read(key).get("pending"))
+
+    def publish(self, key, owner, token, run, result):
+        text = json.dumps(result, default=str)
+
+        def _publish(row):
+            if row.get("owner") != owner or row.get("token") != token:
+                return False
+            if run > row.get("done_seq", 0):
+                row["done_seq"], row["result"] = run, text
+            return True
+        return self._apply(key, _publish)
+
+    def read(self, key):
+        return self._apply(key, dict)
+
+
+# ─────────────────────────────── In-process ─────────────────────────────────
+
+class MemoryLeaseBackend(_RowLeaseBackend):
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._leases: Dict[str, Dict[str, Any]] = {}
+
+    def _apply(self, key, fn):
+        with self._lock:
+            return fn(self._leases.setdefault(key, _new_row()))
+
+
+# ─────────────────────────────── SQLite ─────────────────────────────────────
+
+class SQLiteLeaseBackend(LeaseBackend):
+    """Lease table in a SQLite file; safe across processes on one host."""
+
+    _COLUMNS = {
+        "token": "INTEGER NOT NULL DEFAULT 0",
+        "run_seq": "INTEGER NOT NULL DEFAULT 0",
+        "done_seq": "INTEGER NOT NULL DEFAULT 0",
+        "result": "TEXT",
+    }
+
+    def __init__(self, path: str):
+        self.path = path
+        with self._tx() as db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS leases ("
+                " key TEXT PRIMARY KEY, owner TEXT, expires_at REAL NOT NULL DEFAULT 0,"
+                " pending INTEGER NOT NULL DEFAULT 0)"
+            )
+            # Lease files created before fencing tokens lack the newer columns
+            existing = {row[1] for row in db.execute("PRAGMA table_info(leases)")}
+            for column, ddl in self._COLUMNS.items():
+                if column not in existing:
+                    db.execute(f"ALTER TABLE leases ADD COLUMN {column} {ddl}")
+
+    @contextmanager
+    def _tx(self):
+        db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                yield db
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+            db.execute("COMMIT")
+        finally:
+            db.close()
+
+    @staticmethod
+    def _ensure(db, key):
+        db.execute("INSERT OR IGNORE INTO leases (key) VALUES (?)", (key,))
+
+    def try_acquire(self, key, owner, ttl_s):
+        now = time.time()
+        with self._tx() as db:
+            self._ensure(db, key)
+            # A new holder (or one whose lease lapsed) gets the next fencing token
+            cur = db.execute(
+                "UPDATE leases SET"
+                " token = CASE WHEN owner IS ? AND expires_at > ? THEN token ELSE token + 1 END,"
+                " owner = ?, expires_at = ?"
+                " WHERE key = ? AND (owner IS NULL OR owner = ? OR expires_at <= ?)",
+                (owner, now, owner, now + ttl_s, key, owner, now),
+            )
+            if cur.rowcount != 1:
+                return None
+            (token,) = db.execute("SELECT token FROM leases WHERE key = ?", (key,)).fetchone()
+            return token
+
+    def renew(self, key, owner, ttl_s):
+        with self._tx() as db:
+            cur = db.execute(
+                "UPDATE leases SET expires_at = ? WHERE key = ? AND owner = ?",
+                (time.time() + ttl_s, key, owner),
+            )
+            return cur.rowcount == 1
+
+    def release(self, key, owner):
+        with self._tx() as db:
+            db.execute(
+                "UPDATE leases SET owner = NULL, expires_at = 0 WHERE key = ? AND owner = ?",
+                (key, owner),
+            )
+
+    def mark_pending(self, key):
+        with self._tx() as db:
+            self._ensure(db, key)
+            db.execute("UPDATE leases SET pending = 1 WHERE key = ?", (key,))
+            (run_seq,) = db.execute("SELECT run_seq FROM leases WHERE key = ?", (key,)).fetchone()
+            return run_seq
+
+    def take_pending(self, key):
+        with self._tx() as db:
+            self._ensure(db, key)
+            pending, run_seq = db.execute(
+                "SELECT pending, run_seq FROM leases WHERE key = ?", (key,)).fetchone()
+            if not pending:
+                return 0
+            db.execute("UPDATE leases SET pending = 0, run_seq = ? WHERE key = ?", (run_seq + 1, key))
+            return run_seq + 1
+
+    def has_pending(self, key):
+        with self._tx() as db:
+            row = db.execute("SELECT pending FROM leases WHERE key = ?", (key,)).fetchone()
+            return bool(row and row[0])
+
+    def publish(self, key, owner, token, run, result):
+        with self._tx() as db:
+            cur = db.execute(
+                "UPDATE leases SET"
+                " result = CASE WHEN done_seq < ? THEN ? ELSE result END,"
+                " done_seq = MAX(done_seq, ?)"
+                " WHERE key = ? AND owner = ? AND token = ?",
+                (run, json.dumps(result, default=str), run, key, owner, token),
+            )
+            return cur.rowcount == 1
+
+    def read(self, key):
+        with self._tx() as db:
+            db.row_factory = sqlite3.Row
+            row = db.execute("SELECT * FROM leases WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return _new_row()
+            state = dict(row)
+            state.pop("key", None)
+            state["pending"] = bool(state["pending"])
+            return state
+
+
+# ─────────────────────────────── Files ──────────────────────────────────────
+
+class FileLeaseBackend(_RowLeaseBackend):
+    """One JSON file per lease key in `directory`, serialized with fcntl.flock."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _apply(self, key, fn):
+        import fcntl
+
+        path = os.path.join(self.directory, f"{key}.lease")
+        with open(path, "a+", encoding="utf8") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.seek(0)
+                raw = f.read()
+                row = dict(_new_row(), **json.loads(raw)) if raw else _new_row()
+                before = dict(row)
+                result = fn(row)
+                if row != before:
+                    f.seek(0)
+                    f.truncate()
+                    f.write(json.dumps(row))
+                    f.flush()
+                    os.fsync(f.fileno())
+                return result
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+# ─────────────────────────────── Firestore ──────────────────────────────────
+
+class FirestoreLeaseBackend(_RowLeaseBackend):
+    """Lease documents in a Firestore collection, mutated inside transactions."""
+
+    def __init__(self, collection: str = "webhook_leases", client=None):
+        from google.cloud import firestore  # deferred: only needed in production
+
+        self._firestore = firestore
+        self._db = client or firestore.Client()
+        self._col = self._db.collection(collection)
+
+    def _apply(self, key: str, fn):
+        """Apply `fn(row) -> result` to the lease document in one transaction."""
+        ref = self._col.document(key)
+
+        @self._firestore.transactional
+        def _txn(tx):
+            snap = ref.get(transaction=tx)
+            row = dict(_new_row(), **(snap.to_dict() or {})) if snap.exists else _new_row()
+            before = dict(row)
+            result = fn(row)
+            if row != before:
+                tx.set(ref, row)
+            return result
+
+        return _txn(self._db.transaction())
+
+    def read(self, key):
+        # Plain read: no transaction needed for a snapshot
+        snap = self._col.document(key).get()
+        return dict(_new_row(), **(snap.to_dict() or {})) if snap.exists else _new_row()
+
+
+# ─────────────────────────────── Heartbeat ──────────────────────────────────
+
+class Fence:
+    """
+    Handed to work running under a lease. `check()` raises `LeaseLostError`
+    once the heartbeat could not renew the lease; call it before each step
+    with side effects.
+    """
+
+    def __init__(self, key: str, token: int):
+        self.key = key
+        self.token = token
+        self._lost = threading.Event()
+
+    @property
+    def lost(self) -> bool:
+        return self._lost.is_set()
+
+    def check(self) -> None:
+        if self._lost.is_set():
+            raise LeaseLostError(f"Lease '{self.key}' (token {self.token}) lost")
+
+
+class LeaseHeartbeat:
+    """
+    Background thread renewing a held lease every `interval_s` (a third of
+    the TTL by default), so the TTL can stay short: a crashed holder blocks
+    others for at most one TTL. Use as a context manager around the work;
+    it yields the lease's `Fence`.
+    """
+
+    def __init__(self, backend: LeaseBackend, key: str, owner: str, token: int,
+                 ttl_s: float, interval_s: Optional[float] = None):
+        self.backend = backend
+        self.key = key
+        self.owner = owner
+        self.ttl_s = ttl_s
+        self.interval_s = interval_s if interval_s else ttl_s / 3
+        self.fence = Fence(key, token)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _beat(self) -> None:
+        while not self._stop.wait(self.interval_s):
+            try:
+                renewed = self.backend.renew(self.key, self.owner, self.ttl_s)
+            except Exception as e:
+                # A transient backend error is not a lost lease; the TTL leaves room to retry
+                logger.warning("Lease '%s' heartbeat failed: %s", self.key, e)
+                continue
+            if not renewed:
+                logger.error("Lease '%s' (token %s) was lost, stopping work under it",
+                             self.key, self.fence.token)
+                self.fence._lost.set()
+                return
+
+    def __enter__(self) -> Fence:
+        self._thread = threading.Thread(target=self._beat, name=f"lease-heartbeat-{self.key}", daemon=True)
+        self._thread.start()
+        return self.fence
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+
+# ─────────────────────────────── Factory ────────────────────────────────────
+
+def make_lease_backend(conf: Dict[str, Any]) -> LeaseBackend:
+    """
+    Build the backend named by `SYNC_LEASE_BACKEND` in config.json:
+    "memory" (default), "sqlite", "file" or "firestore". `SYNC_LEASE_PATH`
+    is the SQLite file / lease directory / Firestore collection.
+    """
+    kind = (conf.get("SYNC_LEASE_BACKEND") or "memory").lower()
+    location: Optional[str] = conf.get("SYNC_LEASE_PATH") or None
+    if kind == "memory":
+        return MemoryLeaseBackend()
+    if kind == "sqlite":
+        return SQLiteLeaseBackend(location or "/tmp/shotgrid-webhooks-leases.db")
+    if kind == "file":
+        return FileLeaseBackend(location or "/tmp/shotgrid-webhooks-leases")
+    if kind == "firestore":
+        return FirestoreLeaseBackend(location or "webhook_leases")
+    raise ValueError(f"Unknown SYNC_LEASE_BACKEND '{kind}'")
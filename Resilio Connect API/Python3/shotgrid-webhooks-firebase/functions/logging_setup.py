@@ -0,0 +1,173 @@
+"""
+Non-blocking, structured logging for the webhook functions.
+
+Loggers only put records on an in-memory queue (`QueueHandler`); a single
+`QueueListener` thread formats them and writes to stdout, so request
+threads never wait on log I/O. On the request thread:
+
+- messages use lazy `%`-style arguments, merged only for records that pass
+  the level and sampling filters; wrap expensive arguments such as payload
+  dumps in `lazy_json` so DEBUG-only work is skipped when DEBUG is off
+- every record is stamped with the current request's correlation id
+  (`request_context`), carried in a contextvar so it follows threads that
+  copy the context
+- INFO records can be sampled per request (`LOG_INFO_SAMPLE_RATE`): a
+  sampled-out request drops its INFO lines but keeps warnings and errors
+
+`LOG_FORMAT` "json" writes one Cloud Logging structured entry per line
+(severity, message, request id label); "text" keeps the classic layout.
+
+The example scripts' logger (Resilio Connect API/Python3/logger.py) is
+built from the same pieces. The function deploys only this folder, so
+the scripts carry a copy of this file, Python3/logging_setup.py. Edit
+this one and copy it there; Python3/tests/test_logger.py fails while the
+two differ.
+"""
+from __future__ import annotations
+
+import atexit
+import contextvars
+import json
+import logging
+import queue
+import sys
+import time
+import uuid
+import zlib
+from contextlib import contextmanager
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+_REQUEST_ID: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("request_id", default=None)
+_SAMPLED: contextvars.ContextVar[bool] = contextvars.ContextVar("log_sampled", default=True)
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - [%(request_id)s] %(message)s"
+
+
+def request_id() -> Optional[str]:
+    return _REQUEST_ID.get()
+
+
+@contextmanager
+def request_context(rid: Optional[str] = None, sample_rate: float = 1.0) -> Iterator[str]:
+    """Tag log records in this block with `rid` (a new id if None) and decide INFO sampling once."""
+    rid = rid or uuid.uuid4().hex[:16]
+    sampled = sample_rate >= 1.0 or (zlib.crc32(rid.encode()) / 0xFFFFFFFF) < sample_rate
+    rid_token = _REQUEST_ID.set(rid)
+    sampled_token = _SAMPLED.set(sampled)
+    try:
+        yield rid
+    finally:
+        _SAMPLED.reset(sampled_token)
+        _REQUEST_ID.reset(rid_token)
+
+
+class lazy_json:
+    """`json.dumps(value)` computed only if the record is actually formatted."""
+    __slots__ = ("value",)
+
+    def __init__(self, value: Any):
+        self.value = value
+
+    def __str__(self) -> str:
+        return json.dumps(self.value, default=str)
+
+
+class ContextFilter(logging.Filter):
+    """Stamps the correlation id and drops INFO-and-below records of sampled-out requests."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno <= logging.INFO and not _SAMPLED.get():
+            return False
+        record.request_id = _REQUEST_ID.get() or "-"
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One Cloud Logging structured entry per record."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "severity": record.levelname,
+            "message": record.getMessage(),
+            "logger": record.name,
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created))
+                    + f".{int(record.msecs):03d}Z",
+        }
+        rid = getattr(record, "request_id", "-")
+        if rid != "-":
+            entry["logging.googleapis.com/labels"] = {"request_id": rid}
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exception"] = record.exc_text
+        fields = getattr(record, "json_fields", None)
+        if isinstance(fields, dict):
+            entry.update(fields)
+        return json.dumps(entry, default=str)
+
+
+class MergingQueueHandler(QueueHandler):
+    """
+    Merges `%` args on the request thread, so later mutation of an argument
+    can't change the line; formatting and I/O are left to the listener.
+    Each record belongs to this handler alone (loggers using it must not
+    propagate), so it is updated in place rather than copied.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+_LISTENER: Optional[QueueListener] = None
+
+
+def configure_logging(conf: Optional[Dict[str, Any]] = None, names: Iterable[str] = ("shotgrid-webhooks",),
+                      stream=None) -> QueueListener:
+    """
+    Route the named loggers (and their children) through one queue to one
+    writer thread. Reads LOG_LEVEL and LOG_FORMAT from `conf`. Returns the
+    listener, which is stopped (flushing queued records) at interpreter exit.
+    """
+    global _LISTENER
+    conf = conf or {}
+    level = getattr(logging, str(conf.get("LOG_LEVEL") or "INFO").upper(), logging.INFO)
+    json_output = (conf.get("LOG_FORMAT") or "text").lower() == "json"
+
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(JsonFormatter() if json_output else logging.Formatter(TEXT_FORMAT))
+
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    queue_handler = MergingQueueHandler(log_queue)
+    queue_handler.addFilter(ContextFilter())
+
+    for name in names:
+        logger = logging.getLogger(name)
+        for existing in list(logger.handlers):
+            logger.removeHandler(existing)
+        logger.addHandler(queue_handler)
+        logger.setLevel(level)
+        logger.propagate = False
+
+    if _LISTENER is None:
+        atexit.register(_stop_listener)
+    else:
+        _stop_listener()
+    _LISTENER = QueueListener(log_queue, output)
+    _LISTENER.start()
+    return _LISTENER
+
+
+def _stop_listener() -> None:
+    """Flush queued records; runs at interpreter exit."""
+    if _LISTENER is not None and _LISTENER._thread is not None:
+        _LISTENER.stop()
+
+
+def info_sample_rate(conf: Dict[str, Any]) -> float:
+    return min(1.0, max(0.0, float(conf.get("LOG_INFO_SAMPLE_RATE", 1.0))))
@@ -7,43 +7,51 @@ Exports HTTP Cloud Functions for ShotGrid webhook integration with Resilio state
 - version_created_webhook – Version created
 - assignment_webhook      – Task assignment (legacy)
 - shot_status_webhook     – Shot status change (triggers full sync)
+- queue_worker            – Drains queued webhooks (WEBHOOK_MODE=queue, SQLite backend)
+- queue_worker_pubsub     – Processes queued webhooks (WEBHOOK_MODE=queue, Pub/Sub backend)
 
 Deploy (Gen‑2):
     firebase deploy --only functions
 """
 from __future__ import annotations
-from resilio_state_sync import ResilioStateSyncManager, ShotGridStateManager
-import os, json, hmac, hashlib, yaml, logging
+# Keep module import cheap: it is paid on every cold start. shotgun_api3,
+# yaml, resilio_state_sync (requests) and the SG connection load lazily on
+# first use via `Lazy`; see tools/bench_import_time.py.
+from lazy import Lazy
+from leases import Fence, make_lease_backend
+from sync_trigger import CoalescingSyncTrigger
+from work_queue import make_work_queue, process_item
+from dedupe import delivery_key, make_deduper
+from transitions import TransitionTable, Write, load_transitions
+from logging_setup import configure_logging, info_sample_rate, lazy_json, request_context
+from tracing import STATS as SPAN_STATS, TracedClient, configure_tracing, current_trace, span, trace
+import os, json, hmac, hashlib, logging
 from datetime import datetime, timezone
-from typing import List, Dict, Any, Optional
-import shotgun_api3
+from typing import List, Dict, Any, Iterable, Optional
 import functions_framework            # local dev convenience
-from firebase_functions import https_fn  # GCF/Firebase runtime
-from flask import Request, abort, make_response, jsonify
+from firebase_functions import https_fn, pubsub_fn  # GCF/Firebase runtime (pulls in flask)
+from flask import Request, Response, abort, make_response
+from state_model import json_default
 
 # ─────────────────────────────── Standard Python Logging ────────────────────────
-# Set up a logger with a name in Firebase Functions
+# Set up a logger with a name in Firebase Functions; handlers are attached by
+# `configure_logging` once config.json is loaded (see logging_setup.py).
 logger = logging.getLogger("shotgrid-webhooks")
 
-# Configure the logger
-formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-
-# Configure the handler (Firebase Functions automatically captures stdout/stderr)
-handler = logging.StreamHandler()
-handler.setFormatter(formatter)
-
-# Add the handler to the logger
-logger.addHandler(handler)
-
-# Set the logging level
-logger.setLevel(logging.INFO)
-
 # ─────────────────────────────── Configuration ──────────────────────────────
+# config.json is a few hundred bytes of JSON and decides which functions are
+# exported, so it is read eagerly; status_mapping.yaml is compiled lazily below.
 ROOT = os.path.dirname(__file__)
 with open(os.path.join(ROOT, "config.json"), "rt", encoding="utf8") as f:
     _CONF = json.load(f)
-with open(os.path.join(ROOT, "status_mapping.yaml"), "rt", encoding="utf8") as f:
-    _MAP = yaml.safe_load(f)
+
+# Records go through a queue to one writer thread (Firebase Functions captures
+# stdout); resilio_state_sync logs under its own name.
+configure_logging(_CONF, ("shotgrid-webhooks", "resilio-state-sync"))
+LOG_INFO_SAMPLE_RATE = info_sample_rate(_CONF)
+# Spans around SG / MC calls and sync phases; see tracing.py.
+configure_tracing(_CONF)
+TRACE_IN_RESPONSE = bool(_CONF.get("TRACE_IN_RESPONSE", True))
 
 SG_HOST        = _CONF["SHOTGRID_URL"]
 SG_API_KEY     = _CONF["SHOTGRID_API_KEY"]
@@ -51,128 +59,384 @@ SG_SCRIPT_NAME = _CONF["SHOTGRID_SCRIPT_NAME"]
 SECRET_TOKEN   = _CONF["SECRET_TOKEN"].encode()
 RESILIO_URL = _CONF.get("RESILIO_URL", "")
 RESILIO_TOKEN = _CONF.get("RESILIO_TOKEN", "")
+SYNC_COALESCE_WINDOW_S = float(_CONF.get("SYNC_COALESCE_WINDOW_S", 5))
+SYNC_LEASE_TTL_S = float(_CONF.get("SYNC_LEASE_TTL_S", 60))
+SYNC_LEASE_HEARTBEAT_S = float(_CONF.get("SYNC_LEASE_HEARTBEAT_S") or 0) or None
+SYNC_WAIT_MODE = (_CONF.get("SYNC_WAIT_MODE") or "skip").lower()
+SYNC_JOIN_TIMEOUT_S = float(_CONF.get("SYNC_JOIN_TIMEOUT_S", 120))
+WEBHOOK_MODE = (_CONF.get("WEBHOOK_MODE") or "sync").lower()
+QUEUE_BACKEND = (_CONF.get("QUEUE_BACKEND") or "sqlite").lower()
+QUEUE_TOPIC = _CONF.get("QUEUE_TOPIC") or "shotgrid-webhooks"
 
 logger.info("Starting ShotGrid webhooks service with Resilio state sync")
-logger.info(f"Using ShotGrid host: {SG_HOST}")
-logger.info(f"Using script name: {SG_SCRIPT_NAME}")
+logger.info("Using ShotGrid host: %s", SG_HOST)
+logger.info("Using script name: %s", SG_SCRIPT_NAME)
 
 
 # ─────────────────────────────── Singleton SG client ────────────────────────
-logger.info("Initializing ShotGrid client connection")
-try:
-    _SG_CLIENT = shotgun_api3.Shotgun(
-        SG_HOST,
-        script_name=SG_SCRIPT_NAME,
-        api_key=SG_API_KEY,
-        connect=True,
-    )
+def _connect_shotgrid():
+    import shotgun_api3
+
+    logger.info("Initializing ShotGrid client connection")
+    try:
+        client = shotgun_api3.Shotgun(
+            SG_HOST,
+            script_name=SG_SCRIPT_NAME,
+            api_key=SG_API_KEY,
+            connect=True,
+        )
+    except Exception as e:
+        logger.error("Failed to initialize ShotGrid client: %s", e)
+        raise
     logger.info("ShotGrid client connection successful")
-except Exception as e:
-    logger.error(f"Failed to initialize ShotGrid client: {str(e)}")
-    raise
+    return client
+
+# Opened on first use; `_SG_CLIENT.set(...)` installs a prebuilt client.
+_SG_CLIENT: Lazy = Lazy(_connect_shotgrid)
+
+# ─────────────────────────────── Connection pre-warm ────────────────────────
+# Optional: open the SG and Management Console connections in the background
+# while the instance waits for its first request.
+if _CONF.get("PREWARM"):
+    from warmup import start_warmup
+
+    start_warmup(_CONF, _SG_CLIENT.get)
+
+# ─────────────────────────────── Full-sync trigger ──────────────────────────
+# Bursts of shot/assignment events collapse into one sync per burst, and a
+# fenced, heartbeat-renewed lease keeps syncs on different instances apart.
+def _build_sync_trigger() -> CoalescingSyncTrigger:
+    return CoalescingSyncTrigger(
+        make_lease_backend(_CONF),
+        window_s=SYNC_COALESCE_WINDOW_S,
+        lease_ttl_s=SYNC_LEASE_TTL_S,
+        heartbeat_s=SYNC_LEASE_HEARTBEAT_S,
+        wait_mode=SYNC_WAIT_MODE,
+        join_timeout_s=SYNC_JOIN_TIMEOUT_S,
+    )
+
+_SYNC_TRIGGER: Lazy = Lazy(_build_sync_trigger)
+
+# ─────────────────────────────── Work queue ─────────────────────────────────
+# In queue mode webhooks are persisted and acknowledged with 202; a worker
+# function runs the handlers later.
+_WORK_QUEUE: Lazy = Lazy(lambda: make_work_queue(_CONF), "work_queue")
+if WEBHOOK_MODE == "queue":
+    logger.info("Webhook queue mode enabled (%s backend)", QUEUE_BACKEND)
+
+# ─────────────────────────────── Delivery de-duplication ────────────────────
+# Redelivered or duplicated events return the result computed the first time.
+_DEDUPER: Lazy = Lazy(lambda: make_deduper(_CONF), "deduper")
 
 # ─────────────────────────────── ShotGrid helper ────────────────────────────
+# Fields each lookup asks for up front. Linked fields (`sg_task.Task.step`,
+# `entity.Shot.sg_status_list`) pull the Task/Shot a handler needs next into
+# the same round-trip; `SG` seeds them into its identity map.
+SHOT_FIELDS = ["id", "sg_status_list", "code", "project"]
+TASK_FIELDS = ["id", "step", "sg_status_list", "entity", "project"]
+TASK_ASSIGNMENT_FIELDS = TASK_FIELDS + ["task_assignees"]
+VERSION_FIELDS = ["id", "sg_task", "sg_status_list", "entity", "project"]
+
+_LINKED_FIELDS = {
+    # entity type fetched → [(link field, linked type, fields pulled through the link)]
+    "Version": [("sg_task", "Task", TASK_FIELDS), ("entity", "Shot", SHOT_FIELDS)],
+    "Task": [("entity", "Shot", SHOT_FIELDS)],
+    "Shot": [],
+}
+
+
 class SG:
-    """Lightweight wrapper re‑using one persistent ShotGrid session."""
+    """
+    Lightweight wrapper re‑using one persistent ShotGrid session.
+
+    Each instance is request-scoped and keeps an identity map: an entity's
+    fields are fetched at most once per request, whether they came from a
+    direct lookup, a batch lookup or linked fields of another entity.
+    """
     def __init__(self):
-        self._sg = _SG_CLIENT
+        self._sg = TracedClient(_SG_CLIENT.get(), "sg")
+        self._entities: Dict[tuple, Dict[str, Any]] = {}
+        # Set while processing a batched delivery: every handler stages into it
+        self.shared_uow: Optional["SGUnitOfWork"] = None
+        # Also set for batched deliveries: full syncs the handlers asked for,
+        # as (result, reason, attach); the dispatcher triggers one for all
+        self.deferred_syncs: Optional[List[tuple]] = None
+
+    # Identity map
+    def cached(self, entity_type: str, eid: int, fields: List[str]) -> Optional[Dict[str, Any]]:
+        """The entity if every field in `fields` is already known, else None."""
+        entity = self._entities.get((entity_type, eid))
+        if entity is not None and all(f in entity for f in fields):
+            return entity
+        return None
+
+    def _remember(self, entity_type: str, record: Dict[str, Any]) -> Dict[str, Any]:
+        entity = self._entities.setdefault((entity_type, record["id"]), {"type": entity_type, "id": record["id"]})
+        for link, linked_type, linked_fields in _LINKED_FIELDS.get(entity_type, []):
+            target = record.get(link)
+            if not isinstance(target, dict) or target.get("type") != linked_type or not target.get("id"):
+                continue
+            prefix = f"{link}.{linked_type}."
+            linked = {f: record[prefix + f] for f in linked_fields if prefix + f in record}
+            if linked:
+                linked["id"] = target["id"]
+                self._remember(linked_type, linked)
+        entity.update((k, v) for k, v in record.items() if "." not in k)
+        return entity
+
+    @staticmethod
+    def _query_fields(entity_type: str, fields: List[str]) -> List[str]:
+        query = list(fields)
+        for link, linked_type, linked_fields in _LINKED_FIELDS.get(entity_type, []):
+            if link in fields:
+                query += [f"{link}.{linked_type}.{f}" for f in linked_fields if f != "id"]
+        return query
+
+    def _find_one(self, entity_type: str, eid: int, fields: List[str]) -> Optional[Dict[str, Any]]:
+        entity = self.cached(entity_type, eid, fields)
+        if entity is not None:
+            logger.info("%s %s served from request cache", entity_type, eid)
+            return entity
+        result = self._sg.find_one(entity_type, [["id", "is", eid]], self._query_fields(entity_type, fields))
+        return self._remember(entity_type, result) if result else None
+
+    def find_many(self, entity_type: str, ids: List[int], fields: List[str]) -> Dict[int, Dict[str, Any]]:
+        """
+        Load many entities of one type with a single `in`-filtered find.
+        Entities already in the identity map are not re-fetched.
+        """
+        found: Dict[int, Dict[str, Any]] = {}
+        missing = []
+        for eid in dict.fromkeys(ids):
+            entity = self.cached(entity_type, eid, fields)
+            if entity is not None:
+                found[eid] = entity
+            else:
+                missing.append(eid)
+        if missing:
+            logger.info("Batch loading %s %s entities (%s cached)", len(missing), entity_type, len(found))
+            try:
+                rows = self._sg.find(entity_type, [["id", "in", missing]], self._query_fields(entity_type, fields))
+            except Exception as e:
+                logger.error("Error batch loading %s %s: %s", entity_type, missing, e)
+                rows = []
+            for row in rows:
+                found[row["id"]] = self._remember(entity_type, row)
+        return found
+
+    def prefetch_versions(self, ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        return self.find_many("Version", ids, VERSION_FIELDS)
+
+    def prefetch_tasks(self, ids: List[int], fields: List[str] = TASK_FIELDS) -> Dict[int, Dict[str, Any]]:
+        return self.find_many("Task", ids, fields)
+
+    def prefetch_shots(self, ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        return self.find_many("Shot", ids, SHOT_FIELDS)
 
     # Queries
-    def find_version(self, vid: int):
-        logger.info(f"Finding Version {vid}")
+    def find_version(self, vid: int, fields: List[str] = VERSION_FIELDS):
+        logger.info("Finding Version %s", vid)
         try:
-            result = self._sg.find_one(
-                "Version", [["id", "is", vid]],
-                ["id", "sg_task", "sg_status_list", "entity", "project"],
-            )
+            result = self._find_one("Version", vid, fields)
             if result:
-                logger.info(f"Found Version {vid} with status {result.get('sg_status_list')}")
+                logger.info("Found Version %s with status %s", vid, result.get('sg_status_list'))
                 task_id = (result.get("sg_task") or {}).get("id")
-                logger.info(f"Version {vid} is linked to Task {task_id}" if task_id else f"Version {vid} has no linked Task")
+                if task_id:
+                    logger.info("Version %s is linked to Task %s", vid, task_id)
+                else:
+                    logger.info("Version %s has no linked Task", vid)
             else:
-                logger.warning(f"Version {vid} not found")
+                logger.warning("Version %s not found", vid)
             return result
         except Exception as e:
-            logger.error(f"Error finding Version {vid}: {str(e)}")
+            logger.error("Error finding Version %s: %s", vid, e)
             return None
 
-    def find_task(self, tid: int):
-        logger.info(f"Finding Task {tid}")
+    def find_task(self, tid: int, fields: List[str] = TASK_FIELDS):
+        logger.info("Finding Task %s", tid)
         try:
-            result = self._sg.find_one(
-                "Task", [["id", "is", tid]],
-                ["id", "step", "sg_status_list", "entity", "project", "task_assignees"],
-            )
+            result = self._find_one("Task", tid, fields)
             if result:
                 step_name = (result.get("step") or {}).get("name")
-                assignees = result.get("task_assignees", [])
-                logger.info(f"Found Task {tid} with status {result.get('sg_status_list')} and step {step_name}, {len(assignees)} assignees")
+                assignees = result.get("task_assignees")
+                logger.info("Found Task %s with status %s and step %s%s", tid, result.get('sg_status_list'), step_name,
+                            f", {len(assignees)} assignees" if assignees is not None else "")
             else:
-                logger.warning(f"Task {tid} not found")
+                logger.warning("Task %s not found", tid)
             return result
         except Exception as e:
-            logger.error(f"Error finding Task {tid}: {str(e)}")
+            logger.error("Error finding Task %s: %s", tid, e)
             return None
 
-    def find_shot(self, sid: int):
-        logger.info(f"Finding Shot {sid}")
+    def find_shot(self, sid: int, fields: List[str] = SHOT_FIELDS):
+        logger.info("Finding Shot %s", sid)
         try:
-            result = self._sg.find_one(
-                "Shot", [["id", "is", sid]], ["id", "sg_status_list", "code", "project"],
-            )
+            result = self._find_one("Shot", sid, fields)
             if result:
                 project_name = (result.get("project") or {}).get("name", "")
-                logger.info(f"Found Shot {sid} ({result.get('code')}) in project '{project_name}' with status {result.get('sg_status_list')}")
+                logger.info("Found Shot %s (%s) in project '%s' with status %s",
+                            sid, result.get('code'), project_name, result.get('sg_status_list'))
             else:
-                logger.warning(f"Shot {sid} not found")
+                logger.warning("Shot %s not found", sid)
             return result
         except Exception as e:
-            logger.error(f"Error finding Shot {sid}: {str(e)}")
+            logger.error("Error finding Shot %s: %s", sid, e)
             return None
 
     # Mutations
+    def _set_cached(self, entity_type: str, eid: int, data: Dict[str, Any]):
+        entity = self._entities.get((entity_type, eid))
+        if entity is not None:
+            entity.update(data)
+
     def set_task_status(self, ids: List[int], status: str):
-        logger.info(f"Setting Task status to {status} for IDs: {ids}")
+        logger.info("Setting Task status to %s for IDs: %s", status, ids)
         try:
             batch = [
                 {"request_type": "update", "entity_type": "Task", "entity_id": tid,
                 "data": {"sg_status_list": status}} for tid in ids
             ]
             result = self._sg.batch(batch)
-            logger.info(f"Task status update successful: {result}")
+            logger.info("Task status update successful: %s", result)
+            for tid in ids:
+                self._set_cached("Task", tid, {"sg_status_list": status})
             return result
         except Exception as e:
-            logger.error(f"Error updating Task statuses: {str(e)}")
+            logger.error("Error updating Task statuses: %s", e)
             return None
 
     def set_shot_status(self, sid: int, status: str):
-        logger.info(f"Setting Shot {sid} status to {status}")
+        logger.info("Setting Shot %s status to %s", sid, status)
         try:
             result = self._sg.update("Shot", sid, {"sg_status_list": status})
-            logger.info(f"Shot {sid} status update successful: {result}")
+            logger.info("Shot %s status update successful: %s", sid, result)
+            self._set_cached("Shot", sid, {"sg_status_list": status})
             return result
         except Exception as e:
-            logger.error(f"Error updating Shot {sid} status: {str(e)}")
+            logger.error("Error updating Shot %s status: %s", sid, e)
             return None
 
     def set_version_status(self, vid: int, status: str):
-        logger.info(f"Setting Version {vid} status to {status}")
+        logger.info("Setting Version %s status to %s", vid, status)
         try:
             result = self._sg.update("Version", vid, {"sg_status_list": status})
-            logger.info(f"Version {vid} status update successful: {result}")
+            logger.info("Version %s status update successful: %s", vid, result)
+            self._set_cached("Version", vid, {"sg_status_list": status})
             return result
         except Exception as e:
-            logger.error(f"Error updating Version {vid} status: {str(e)}")
+            logger.error("Error updating Version %s status: %s", vid, e)
             return None
 
-# ─────────────────────────────── YAML mappings ──────────────────────────────
-_V2T: Dict[str, List[str]] = _MAP.get("version_to_task", {})
-_T2S: Dict[str, List[str]] = _MAP.get("task_to_shot", {})
-logger.info(f"Loaded version-to-task mappings: {json.dumps(_V2T)}")
-logger.info(f"Loaded task-to-shot mappings: {json.dumps(_T2S)}")
-
-map_version_to_task = lambda v: _V2T.get(v, [])
-map_task_to_shot   = lambda t: _T2S.get(t, [])
+    def unit_of_work(self) -> "SGUnitOfWork":
+        """Collect mutations for this request and commit them as one `batch`."""
+        return self.shared_uow if self.shared_uow is not None else SGUnitOfWork(self)
+
+
+class SGUnitOfWork:
+    """
+    Collects the writes a handler wants to make and commits them as a single
+    `SG.batch` call.
+
+    - Writes whose target values already equal the current values (from the
+      identity map, or `current=` when given) are skipped as no-ops.
+    - Repeated writes to one entity are merged into one update.
+    - Staged values are applied to the identity map right away, so later
+      reads in the same request see them.
+
+    ShotGrid applies a batch atomically. If it fails, each update is retried
+    on its own so `commit()` can report which items failed.
+
+    A `deferred` unit of work is shared by all events of a batched delivery;
+    handlers leave committing it to the dispatcher. `transitions` is the
+    compiled status table handlers consult for the writes an event causes.
+    """
+    def __init__(self, sg: SG, deferred: bool = False, transitions: Optional[TransitionTable] = None):
+        self._sg = sg
+        self.deferred = deferred
+        self.transitions = transitions if transitions is not None else _TRANSITIONS.get()
+        self._pending: Dict[tuple, Dict[str, Any]] = {}
+        self._staged: List[tuple] = []
+        self.skipped: List[Dict[str, Any]] = []
+
+    def update(self, entity_type: str, eid: int, data: Dict[str, Any],
+               current: Optional[Dict[str, Any]] = None) -> bool:
+        """Stage an update; returns False if it would not change anything."""
+        if current is None:
+            current = self._sg._entities.get((entity_type, eid))
+        changes = {k: v for k, v in data.items() if current is None or k not in current or current[k] != v}
+        if not changes:
+            logger.info("Skipping no-op write to %s %s: %s", entity_type, eid, data)
+            self.skipped.append({"entity_type": entity_type, "id": eid, "data": data})
+            return False
+        self._pending.setdefault((entity_type, eid), {}).update(changes)
+        self._staged.append((entity_type, eid))
+        self._sg._set_cached(entity_type, eid, changes)
+        return True
+
+    def mark(self) -> int:
+        """Position in the staging log; pass to `staged_since` later."""
+        return len(self._staged)
+
+    def staged_since(self, mark: int) -> List[tuple]:
+        """(entity_type, id) keys staged after `mark`, without repeats."""
+        return list(dict.fromkeys(self._staged[mark:]))
+
+    def set_status(self, entity_type: str, eid: int, status: str,
+                   current: Optional[Dict[str, Any]] = None) -> bool:
+        return self.update(entity_type, eid, {"sg_status_list": status}, current)
+
+    def apply(self, writes: Iterable[Write], ids: Dict[str, Optional[int]]) -> List[Write]:
+        """Stage transition-table writes onto the entities in `ids` (e.g. {"Task": 5, "Shot": 9})."""
+        return [w for w in writes
+                if ids.get(w.entity_type) and self.set_status(w.entity_type, ids[w.entity_type], w.status)]
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def commit(self) -> List[Dict[str, Any]]:
+        """
+        Send all staged updates in one batch. Returns one report per item:
+        {"entity_type", "id", "data", "ok", "error"}.
+        """
+        if not self._pending:
+            return []
+        items = [
+            {"request_type": "update", "entity_type": et, "entity_id": eid, "data": data}
+            for (et, eid), data in self._pending.items()
+        ]
+        self._pending = {}
+        logger.info("Committing %s ShotGrid updates in one batch", len(items))
+        try:
+            self._sg._sg.batch(items)
+            return [self._report(item, None) for item in items]
+        except Exception as e:
+            logger.error("Batch commit failed (%s), retrying items individually", e)
+
+        reports = []
+        for item in items:
+            try:
+                self._sg._sg.update(item["entity_type"], item["entity_id"], item["data"])
+                reports.append(self._report(item, None))
+            except Exception as e:
+                logger.error("Error updating %s %s: %s", item['entity_type'], item['entity_id'], e)
+                reports.append(self._report(item, str(e)))
+        return reports
+
+    @staticmethod
+    def _report(item: Dict[str, Any], error: Optional[str]) -> Dict[str, Any]:
+        return {"entity_type": item["entity_type"], "id": item["entity_id"], "data": item["data"],
+                "ok": error is None, "error": error}
+
+
+# ─────────────────────────────── Status transitions ─────────────────────────
+# status_mapping.yaml compiled into an immutable table (see transitions.py);
+# an invalid mapping fails the first handler that needs it, loudly.
+def _load_transitions() -> TransitionTable:
+    table = load_transitions(os.path.join(ROOT, "status_mapping.yaml"))
+    logger.info("Compiled %d status transitions from status_mapping.yaml", len(table))
+    return table
+
+_TRANSITIONS: Lazy = Lazy(_load_transitions)
 
 # ─────────────────────────────── Helper utils ───────────────────────────────
 
@@ -196,12 +460,12 @@ def _entity_id(data: dict) -> Optional[int]:
     entity_id = None
     if "entity_id" in data:
         entity_id = data["entity_id"]
-        logger.info(f"Found entity_id: {entity_id}")
+        logger.info("Found entity_id: %s", entity_id)
     else:
         ent = data.get("entity")
         if isinstance(ent, dict):
             entity_id = ent.get("id")
-            logger.info(f"Found entity.id: {entity_id}")
+            logger.info("Found entity.id: %s", entity_id)
 
     if entity_id is None:
         logger.warning("No entity ID found in payload")
@@ -213,52 +477,97 @@ def _is_composite_step(task: dict) -> bool:
     step = (task or {}).get("step") or {}
     step_name = step.get("name")
     result = step_name in {"Composite", "Secondary Composite"}
-    logger.info(f"Checking if step '{step_name}' is composite: {result}")
+    logger.info("Checking if step '%s' is composite: %s", step_name, result)
     return result
 
 
-def _update_linked_shot_if_needed(sg: SG, task: dict, candidate: List[str]):
-    logger.info(f"Checking if linked Shot needs status update to one of: {candidate}")
-
-    if not candidate:
-        logger.info("No candidate statuses provided for Shot, skipping")
-        return None, None
-
+def _linked_shot(sg: SG, task: dict) -> Optional[dict]:
     if "entity" not in task:
         logger.info("Task has no linked entity, skipping")
-        return None, None
+        return None
 
-    shot_id = task["entity"].get("id")
+    shot_id = (task["entity"] or {}).get("id")
     if not shot_id:
         logger.info("Task's linked entity has no ID, skipping")
-        return None, None
+        return None
 
     shot = sg.find_shot(shot_id)
     if not shot:
-        logger.warning(f"Linked Shot {shot_id} not found")
+        logger.warning("Linked Shot %s not found", shot_id)
+    return shot
+
+
+def _update_linked_shot_if_needed(sg: SG, uow: SGUnitOfWork, task: dict, task_status: str):
+    """Stage the Shot write `task_status` causes; returns (status_before, status_after or None)."""
+    candidates = uow.transitions.shot_candidates(task_status)
+    logger.info("Mapped Task status '%s' to Shot statuses: %s", task_status, list(candidates))
+
+    if not candidates:
+        logger.info("No candidate statuses provided for Shot, skipping")
+        return None, None
+
+    shot = _linked_shot(sg, task)
+    if not shot:
         return None, None
 
     current_status = shot["sg_status_list"]
-    if current_status in candidate:
-        logger.info(f"Shot {shot_id} already has status '{current_status}' which is in candidate list, skipping update")
-        return shot, None
+    writes = uow.transitions.task_writes(task_status, current_status)
+    if not writes:
+        logger.info("Shot %s already has status '%s' which is in candidate list, skipping update", shot['id'], current_status)
+        return current_status, None
+
+    logger.info("Updating Shot %s status from '%s' to '%s'", shot['id'], current_status, writes[0].status)
+    uow.apply(writes, {"Shot": shot["id"]})
+    return current_status, writes[0].status
+
 
-    logger.info(f"Updating Shot {shot_id} status from '{current_status}' to '{candidate[0]}'")
-    result = sg.set_shot_status(shot_id, candidate[0])
-    return shot, result
+def _cascade_task_status(sg: SG, uow: SGUnitOfWork, task: Optional[dict], task_id: Optional[int],
+                         version_status: str):
+    """Stage the Task (and linked Shot) writes a Version status causes."""
+    table = uow.transitions
+    if not task:
+        logger.info("No Task found for Task ID %s, skipping Task update", task_id)
+        return
+
+    task_status = task["sg_status_list"]
+    if table.task_target(version_status, task_status) is None:
+        if not table.task_candidates(version_status):
+            logger.info("No mapped Task statuses for Version status '%s', skipping Task update", version_status)
+        else:
+            logger.info("Task %s already has status '%s' which matches mapping, skipping update", task_id, task_status)
+        return
+
+    shot = _linked_shot(sg, task)
+    shot_status = shot["sg_status_list"] if shot else None
+    writes = table.version_writes(version_status, task_status, shot_status)
+    logger.info("Version status '%s' cascades to %s (Task %s was '%s', Shot was '%s')",
+                version_status, writes, task_id, task_status, shot_status)
+    uow.apply(writes, {"Task": task_id, "Shot": shot["id"] if shot else None})
+
+
+def _commit(uow: SGUnitOfWork, result: dict) -> dict:
+    """Commit staged writes and attach the per-item report to `result`."""
+    if uow.deferred:
+        return result  # batched delivery: the dispatcher commits once for all events
+    writes = uow.commit()
+    result["writes"] = writes
+    failed = [w for w in writes if not w["ok"]]
+    if failed:
+        result["write_errors"] = len(failed)
+    return result
 
 # ─────────────────────────────── Handlers ───────────────────────────────────
 
-def _handle_version_status(payload: dict):
+def _handle_version_status(payload: dict, sg: Optional[SG] = None):
     logger.info("Version status webhook triggered")
     # Use debug level for large payloads
-    logger.debug(f"Version status payload: {json.dumps(payload)}")
+    logger.debug("Version status payload: %s", lazy_json(payload))
 
     meta = payload["data"].get("meta", {})
     attribute_name = meta.get("attribute_name")
 
     if attribute_name != "sg_status_list":
-        logger.info(f"Ignoring update to attribute '{attribute_name}', only handling sg_status_list")
+        logger.info("Ignoring update to attribute '%s', only handling sg_status_list", attribute_name)
         return {"ignored": True, "reason": f"attribute_name is '{attribute_name}', not 'sg_status_list'"}
 
     vid = _entity_id(payload["data"])
@@ -268,52 +577,34 @@ def _handle_version_status(payload: dict):
 
     new_status = meta.get("new_value")
     old_status = meta.get("old_value")
-    logger.info(f"Version {vid} status changed from '{old_status}' to '{new_status}'")
+    logger.info("Version %s status changed from '%s' to '%s'", vid, old_status, new_status)
 
-    sg = SG()
+    sg = sg or SG()
+    uow = sg.unit_of_work()
     version = sg.find_version(vid) or {}
 
     task_id = (version.get("sg_task") or {}).get("id")
-    logger.info(f"Version {vid} is linked to Task {task_id}" if task_id else f"Version {vid} has no linked Task")
+    if task_id:
+        logger.info("Version %s is linked to Task %s", vid, task_id)
+    else:
+        logger.info("Version %s has no linked Task", vid)
 
     task = sg.find_task(task_id) if task_id else None
 
-    task_statuses = map_version_to_task(new_status)
-    logger.info(f"Mapped Version status '{new_status}' to Task statuses: {task_statuses}")
-
-    if task and task_statuses and task["sg_status_list"] not in task_statuses:
-        current_task_status = task["sg_status_list"]
-        target_task_status = task_statuses[0]
-        logger.info(f"Updating Task {task_id} status from '{current_task_status}' to '{target_task_status}'")
+    _cascade_task_status(sg, uow, task, task_id, new_status)
 
-        sg.set_task_status([task_id], target_task_status)
+    return _commit(uow, {"version_id": vid, "task_id": task_id, "new_status": new_status})
 
-        shot_statuses = map_task_to_shot(target_task_status)
-        logger.info(f"Mapped Task status '{target_task_status}' to Shot statuses: {shot_statuses}")
 
-        shot_before, shot_update = _update_linked_shot_if_needed(sg, task, shot_statuses)
-        if shot_update:
-            logger.info(f"Updated linked Shot from '{shot_before['sg_status_list']}' to '{shot_update['sg_status_list']}'")
-    else:
-        if not task:
-            logger.info(f"No Task found for Task ID {task_id}, skipping Task update")
-        elif not task_statuses:
-            logger.info(f"No mapped Task statuses for Version status '{new_status}', skipping Task update")
-        else:
-            logger.info(f"Task {task_id} already has status '{task['sg_status_list']}' which matches mapping, skipping update")
-
-    return {"version_id": vid, "task_id": task_id, "new_status": new_status}
-
-
-def _handle_task_status(payload: dict):
+def _handle_task_status(payload: dict, sg: Optional[SG] = None):
     logger.info("Task status webhook triggered")
-    logger.debug(f"Task status payload: {json.dumps(payload)}")
+    logger.debug("Task status payload: %s", lazy_json(payload))
 
     meta = payload["data"].get("meta", {})
     attribute_name = meta.get("attribute_name")
 
     if attribute_name != "sg_status_list":
-        logger.info(f"Ignoring update to attribute '{attribute_name}', only handling sg_status_list")
+        logger.info("Ignoring update to attribute '%s', only handling sg_status_list", attribute_name)
         return {"ignored": True, "reason": f"attribute_name is '{attribute_name}', not 'sg_status_list'"}
 
     tid = _entity_id(payload["data"])
@@ -323,58 +614,55 @@ def _handle_task_status(payload: dict):
 
     new_status = meta.get("new_value")
     old_status = meta.get("old_value")
-    logger.info(f"Task {tid} status changed from '{old_status}' to '{new_status}'")
+    logger.info("Task %s status changed from '%s' to '%s'", tid, old_status, new_status)
 
-    sg = SG()
+    sg = sg or SG()
     task = sg.find_task(tid)
 
     if not task:
-        logger.error(f"Task {tid} not found")
+        logger.error("Task %s not found", tid)
         return {"error": f"Task {tid} not found"}
 
     if not _is_composite_step(task):
-        logger.info(f"Task {tid} is not in a Composite step, ignoring")
+        logger.info("Task %s is not in a Composite step, ignoring", tid)
         return {"ignored": True, "reason": "Not a composite step task"}
 
-    shot_statuses = map_task_to_shot(new_status)
-    logger.info(f"Mapped Task status '{new_status}' to Shot statuses: {shot_statuses}")
-
-    shot_before, shot_update = _update_linked_shot_if_needed(sg, task, shot_statuses)
+    uow = sg.unit_of_work()
+    shot_before, shot_after = _update_linked_shot_if_needed(sg, uow, task, new_status)
 
-    if shot_update:
-        before_status = shot_before["sg_status_list"] if shot_before else None
-        after_status = shot_update["sg_status_list"] if shot_update else None
-        logger.info(f"Updated linked Shot from '{before_status}' to '{after_status}'")
+    if shot_after:
+        logger.info("Updated linked Shot from '%s' to '%s'", shot_before, shot_after)
     else:
         logger.info("No Shot update performed")
 
-    return {
+    return _commit(uow, {
         "task_id": tid,
         "new_status": new_status,
-        "shot_before": shot_before["sg_status_list"] if shot_before else None,
-        "shot_after": shot_update["sg_status_list"] if shot_update else None
-    }
+        "shot_before": shot_before,
+        "shot_after": shot_after
+    })
 
 
-def _handle_version_created(payload: dict):
+def _handle_version_created(payload: dict, sg: Optional[SG] = None):
     """Set new Versions to status `cnv` only for Prep, Composite, or Computer Graphics steps."""
     logger.info("Version created webhook triggered")
-    logger.debug(f"Version created payload: {json.dumps(payload)}")
+    logger.debug("Version created payload: %s", lazy_json(payload))
 
     vid = _entity_id(payload["data"])
     if vid is None:
         logger.error("Failed to extract entity ID from payload")
         return {"error": "No entity id"}
 
-    sg = SG()
+    sg = sg or SG()
+    uow = sg.unit_of_work()
     version = sg.find_version(vid)
 
     if not version:
-        logger.error(f"Version {vid} not found")
+        logger.error("Version %s not found", vid)
         return {"error": f"Version {vid} not found"}
 
     status_before = version["sg_status_list"]
-    logger.info(f"New Version {vid} initial status: '{status_before}'")
+    logger.info("New Version %s initial status: '%s'", vid, status_before)
 
     step_name = None
     task = None
@@ -382,76 +670,52 @@ def _handle_version_created(payload: dict):
 
     if version.get("sg_task"):
         task_id = version["sg_task"]["id"]
-        logger.info(f"Version {vid} is linked to Task {task_id}")
+        logger.info("Version %s is linked to Task %s", vid, task_id)
 
         task = sg.find_task(task_id)
         if task:
             step_name = (task.get("step") or {}).get("name")
-            logger.info(f"Task {task_id} is in step '{step_name}' with status '{task.get('sg_status_list')}'")
+            logger.info("Task %s is in step '%s' with status '%s'", task_id, step_name, task.get('sg_status_list'))
         else:
-            logger.warning(f"Failed to fetch Task {task_id} details")
+            logger.warning("Failed to fetch Task %s details", task_id)
     else:
-        logger.info(f"Version {vid} has no linked Task")
+        logger.info("Version %s has no linked Task", vid)
 
     # Only specific pipeline steps should get 'cnv' status
     eligible_steps = ["Prep", "Composite", "Computer Graphics"]
 
     if step_name in eligible_steps:
-        logger.info(f"Setting Version {vid} status from '{status_before}' to 'cnv' (in eligible step: {step_name})")
-        sg.set_version_status(vid, "cnv")
+        logger.info("Setting Version %s status from '%s' to 'cnv' (in eligible step: %s)", vid, status_before, step_name)
+        uow.set_status("Version", vid, "cnv")
         status_after = "cnv"
 
         # Propagate the status to tasks
-        task_statuses = map_version_to_task("cnv")
-        logger.info(f"Mapped Version status 'cnv' to Task statuses: {task_statuses}")
-
-        if task and task_statuses and task["sg_status_list"] not in task_statuses:
-            current_task_status = task["sg_status_list"]
-            target_task_status = task_statuses[0]
-            logger.info(f"Updating Task {task_id} status from '{current_task_status}' to '{target_task_status}'")
-
-            sg.set_task_status([task_id], target_task_status)
-
-            shot_statuses = map_task_to_shot(target_task_status)
-            logger.info(f"Mapped Task status '{target_task_status}' to Shot statuses: {shot_statuses}")
-
-            shot_before, shot_update = _update_linked_shot_if_needed(sg, task, shot_statuses)
-            if shot_update:
-                before_status = shot_before["sg_status_list"] if shot_before else None
-                after_status = shot_update["sg_status_list"] if shot_update else None
-                logger.info(f"Updated linked Shot from '{before_status}' to '{after_status}'")
-        else:
-            if not task:
-                logger.info(f"No Task found for Task ID {task_id}, skipping Task update")
-            elif not task_statuses:
-                logger.info(f"No mapped Task statuses for Version status 'cnv', skipping Task update")
-            else:
-                logger.info(f"Task {task_id} already has status '{task['sg_status_list']}' which matches mapping, skipping update")
+        _cascade_task_status(sg, uow, task, task_id, "cnv")
     else:
         # Set to 'na' if not in eligible steps and not already 'na'
         if step_name not in eligible_steps and status_before != "na":
-            logger.info(f"Setting Version {vid} status from '{status_before}' to 'na' (not in eligible step)")
-            sg.set_version_status(vid, "na")
+            logger.info("Setting Version %s status from '%s' to 'na' (not in eligible step)", vid, status_before)
+            uow.set_status("Version", vid, "na")
             status_after = "na"
         else:
             status_after = status_before
             if step_name in eligible_steps:
-                logger.info(f"Version {vid} already has status 'cnv', no update needed")
+                logger.info("Version %s already has status 'cnv', no update needed", vid)
             else:
-                logger.info(f"Version {vid} already has status 'na', no update needed")
+                logger.info("Version %s already has status 'na', no update needed", vid)
 
-    return {
+    return _commit(uow, {
         "version_id": vid,
         "pipeline_step": step_name,
         "status_before": status_before,
         "status_after": status_after,
         "task_id": task_id
-    }
+    })
 
-def _handle_task_assignment(payload: dict):
+def _handle_task_assignment(payload: dict, sg: Optional[SG] = None):
     """Handle new task assignment - simplified version that triggers shot status sync."""
     logger.info("Task assignment webhook triggered - triggering shot status sync")
-    logger.debug(f"Task assignment payload: {json.dumps(payload)}")
+    logger.debug("Task assignment payload: %s", lazy_json(payload))
 
     try:
         # Extract task information from payload
@@ -462,24 +726,24 @@ def _handle_task_assignment(payload: dict):
             return {"error": "No task ID found"}
 
         # Get task details from ShotGrid
-        sg = SG()
-        task = sg.find_task(task_id)
+        sg = sg or SG()
+        task = sg.find_task(task_id, TASK_ASSIGNMENT_FIELDS)
 
         if not task:
-            logger.error(f"Task {task_id} not found in ShotGrid")
+            logger.error("Task %s not found in ShotGrid", task_id)
             return {"error": f"Task {task_id} not found"}
 
         # Get shot information
         entity = task.get("entity")
         if not entity or entity.get("type") != "Shot":
-            logger.info(f"Task {task_id} is not linked to a Shot, skipping")
+            logger.info("Task %s is not linked to a Shot, skipping", task_id)
             return {"message": "Task not linked to Shot", "task_id": task_id}
 
         shot_id = entity.get("id")
         shot = sg.find_shot(shot_id) if shot_id else None
 
         if not shot:
-            logger.error(f"Shot {shot_id} not found")
+            logger.error("Shot %s not found", shot_id)
             return {"error": f"Shot {shot_id} not found"}
 
         shot_name = shot.get("code", "")
@@ -487,39 +751,28 @@ def _handle_task_assignment(payload: dict):
 
         # If shot is active, trigger full sync (same as shot status webhook)
         if shot_status == "active":
-            logger.info(f"Shot {shot_name} is active, triggering full Resilio sync")
+            logger.info("Shot %s is active, triggering full Resilio sync", shot_name)
 
             # Validate Resilio configuration
             if not RESILIO_URL or not RESILIO_TOKEN:
                 logger.error("Resilio Connect credentials not configured")
                 return {"error": "Resilio Connect not configured"}
 
-            # Initialize managers
-            sg_state_manager = ShotGridStateManager(_SG_CLIENT)
-            resilio_sync_manager = ResilioStateSyncManager()
-
-            # Get current ShotGrid state
-            sg_state = sg_state_manager.get_active_shots_with_assignments()
-
-            # Sync Resilio to match ShotGrid state
-            sync_results = resilio_sync_manager.sync_resilio_to_shotgrid_state(
-                sg_state=sg_state,
-                resilio_url=RESILIO_URL,
-                resilio_token=RESILIO_TOKEN
-            )
-
-            logger.info(f"Assignment sync complete: {sync_results['shot_jobs_created']} shot jobs created, "
-                       f"{sync_results['shot_jobs_updated']} updated")
-
-            return {
+            result = {
                 "task_id": task_id,
                 "shot_name": shot_name,
                 "shot_status": shot_status,
                 "trigger_reason": "assignment_to_active_shot",
-                "sync_results": sync_results
             }
+
+            def attach(outcome: Dict[str, Any]):
+                result.update(_sync_outcome(outcome))
+                if outcome.get("sync"):
+                    result["sync_results"] = outcome["sync"].get("sync_results")
+
+            return _request_full_sync(sg, result, f"assignment on task {task_id}", attach)
         else:
-            logger.info(f"Shot {shot_name} status is '{shot_status}', not active - no sync needed")
+            logger.info("Shot %s status is '%s', not active - no sync needed", shot_name, shot_status)
             return {
                 "task_id": task_id,
                 "shot_name": shot_name,
@@ -528,19 +781,19 @@ def _handle_task_assignment(payload: dict):
             }
 
     except Exception as e:
-        logger.error(f"Task assignment webhook failed: {e}")
+        logger.error("Task assignment webhook failed: %s", e)
         return {"error": f"Webhook processing failed: {str(e)}"}
 
-def _handle_shot_status(payload: dict):
-    """Handle shot status changes and sync Resilio state."""
+def _handle_shot_status(payload: dict, sg: Optional[SG] = None):
+    """Handle shot status changes and sync Resilio state (`sg` is unused: the sync runs its own queries)."""
     logger.info("Shot status webhook triggered - starting full Resilio sync")
-    logger.debug(f"Shot status payload: {json.dumps(payload)}")
+    logger.debug("Shot status payload: %s", lazy_json(payload))
 
     meta = payload["data"].get("meta", {})
     attribute_name = meta.get("attribute_name")
 
     if attribute_name != "sg_status_list":
-        logger.info(f"Ignoring update to attribute '{attribute_name}', only handling sg_status_list")
+        logger.info("Ignoring update to attribute '%s', only handling sg_status_list", attribute_name)
         return {"ignored": True, "reason": f"attribute_name is '{attribute_name}', not 'sg_status_list'"}
 
     shot_id = _entity_id(payload["data"])
@@ -550,7 +803,7 @@ def _handle_shot_status(payload: dict):
 
     new_status = meta.get("new_value")
     old_status = meta.get("old_value")
-    logger.info(f"Shot {shot_id} status changed from '{old_status}' to '{new_status}'")
+    logger.info("Shot %s status changed from '%s' to '%s'", shot_id, old_status, new_status)
 
     try:
         # Validate Resilio configuration
@@ -558,104 +811,362 @@ def _handle_shot_status(payload: dict):
             logger.error("Resilio Connect credentials not configured")
             return {"error": "Resilio Connect not configured"}
 
-        # Initialize managers
-        sg_state_manager = ShotGridStateManager(_SG_CLIENT)
-        resilio_sync_manager = ResilioStateSyncManager()
+        result = {
+            "trigger_shot_id": shot_id,
+            "trigger_status_change": f"{old_status} -> {new_status}",
+        }
 
-        # Get current ShotGrid state
-        logger.info("Querying current ShotGrid state...")
-        sg_state = sg_state_manager.get_active_shots_with_assignments()
+        def attach(outcome: Dict[str, Any]):
+            result.update(_sync_outcome(outcome))
+            if outcome.get("sync"):
+                result.update(outcome["sync"])
 
-        active_shots_count = len(sg_state['shots'])
-        artists_count = len(sg_state['artist_projects'])
-        logger.info(f"Found {active_shots_count} active shots across {artists_count} artists")
+        return _request_full_sync(sg, result, f"shot {shot_id} {old_status} -> {new_status}", attach)
 
-        # Sync Resilio to match ShotGrid state
-        logger.info("Synchronizing Resilio jobs to match ShotGrid state...")
-        sync_results = resilio_sync_manager.sync_resilio_to_shotgrid_state(
-            sg_state=sg_state,
-            resilio_url=RESILIO_URL,
-            resilio_token=RESILIO_TOKEN
-        )
+    except Exception as e:
+        logger.error("Shot status webhook failed: %s", e)
+        return {"error": f"Sync processing failed: {str(e)}"}
 
-        # Log summary
-        logger.info(f"Sync complete: {sync_results['shot_jobs_created']} shot jobs created, "
-                   f"{sync_results['shot_jobs_updated']} updated, "
-                   f"{sync_results['shot_jobs_hydrated']} hydrated, "
-                   f"{sync_results['assets_jobs_created']} assets jobs created, "
-                   f"{sync_results['assets_jobs_updated']} assets updated")
 
-        if sync_results['errors']:
-            logger.warning(f"Sync completed with {len(sync_results['errors'])} errors")
-            for error in sync_results['errors']:
-                logger.warning(f"  - {error}")
+def _request_full_sync(sg: Optional[SG], result: dict, reason: str, attach) -> dict:
+    """
+    Trigger the full sync for one event and `attach(outcome)` to its result;
+    in a batched delivery, leave it to `_process_batch` to trigger once.
+    """
+    if sg is not None and sg.deferred_syncs is not None:
+        sg.deferred_syncs.append((result, reason, attach))
+        return result
+    attach(_SYNC_TRIGGER.get().trigger(_run_full_sync, reason=reason))
+    return result
 
-        return {
-            "trigger_shot_id": shot_id,
-            "trigger_status_change": f"{old_status} -> {new_status}",
-            "active_shots_found": active_shots_count,
-            "artists_found": artists_count,
-            "sync_results": sync_results
-        }
 
-    except Exception as e:
-        logger.error(f"Shot status webhook failed: {e}")
-        return {"error": f"Sync processing failed: {str(e)}"}
+def _sync_outcome(outcome: Dict[str, Any]) -> Dict[str, Any]:
+    """The trigger flags a handler reports: coalesced / joined / lease_lost / sync_runs."""
+    return {k: outcome[k] for k in ("coalesced", "joined", "sync_run", "sync_runs", "lease_lost") if k in outcome}
+
+
+def _run_full_sync(fence: Optional[Fence] = None) -> Dict[str, Any]:
+    """Query the active ShotGrid state and make Resilio jobs match it (stops if `fence` reports a lost lease)."""
+    from resilio_state_sync import ResilioStateSyncManager, ShotGridStateManager
+
+    # Initialize managers
+    sg_state_manager = ShotGridStateManager(TracedClient(_SG_CLIENT.get(), "sg"))
+    resilio_sync_manager = ResilioStateSyncManager()
+
+    # Get current ShotGrid state
+    logger.info("Querying current ShotGrid state...")
+    sg_state = sg_state_manager.get_active_shots_with_assignments()
+
+    active_shots_count = len(sg_state['shots'])
+    artists_count = len(sg_state['artist_projects'])
+    logger.info("Found %s active shots across %s artists", active_shots_count, artists_count)
+
+    # Sync Resilio to match ShotGrid state
+    logger.info("Synchronizing Resilio jobs to match ShotGrid state...")
+    sync_results = resilio_sync_manager.sync_resilio_to_shotgrid_state(
+        sg_state=sg_state,
+        resilio_url=RESILIO_URL,
+        resilio_token=RESILIO_TOKEN,
+        fence=fence,
+    )
+
+    # Log summary
+    logger.info("Sync complete: %s shot jobs created, %s updated, %s hydrated, "
+                "%s assets jobs created, %s assets updated",
+                sync_results['shot_jobs_created'], sync_results['shot_jobs_updated'],
+                sync_results['shot_jobs_hydrated'], sync_results['assets_jobs_created'],
+                sync_results['assets_jobs_updated'])
+
+    if sync_results['errors']:
+        logger.warning("Sync completed with %s errors", len(sync_results['errors']))
+        for error in sync_results['errors']:
+            logger.warning("  - %s", error)
+
+    return {
+        "active_shots_found": active_shots_count,
+        "artists_found": artists_count,
+        "sync_results": sync_results
+    }
 
 
 # ─────────────────────────────── Dispatcher ────────────────────────────────
 
+_HANDLERS = {
+    "task": _handle_task_status,
+    "version": _handle_version_status,
+    "status": _handle_version_status,
+    "version_created": _handle_version_created,
+    "version-created": _handle_version_created,
+    "assignment": _handle_task_assignment,
+    "shot": _handle_shot_status,
+    "shot_status": _handle_shot_status,
+    "shot-status": _handle_shot_status,
+}
+
+
+def _process_event(key: str, payload: dict, sg: Optional[SG] = None) -> dict:
+    """Run the handler for `key` and annotate the result with event lag."""
+    handler = _HANDLERS[key]
+    name = handler.__name__[len('_handle_'):]
+    logger.info("Handling as %s webhook", name)
+    with span(f"handler.{name}"):
+        result = handler(payload, sg)
+
+    ts = payload.get("timestamp")
+    if ts:
+        try:
+            ts_dt = datetime.fromisoformat(ts.replace("Z", "+00:00"))
+            lag_ms = int((datetime.now(timezone.utc) - ts_dt).total_seconds()*1000)
+            result["lag_ms"] = lag_ms
+            logger.info("Event processing lag: %sms", lag_ms)
+        except Exception as e:
+            logger.warning("Bad timestamp '%s': %s", ts, e)
+
+    return result
+
+
+# ─────────────────────────────── Batched deliveries ─────────────────────────
+# With batched deliveries enabled on the ShotGrid webhook, one POST carries
+# many events under `data.deliveries`. They are processed together: one
+# request-scoped SG, a few `in`-filtered prefetch queries for every Version,
+# Task and Shot they reference, and a single batch commit for all writes.
+
+def _split_deliveries(payload: dict) -> Optional[List[dict]]:
+    """Single-event payloads of a batched delivery, or None for a regular one."""
+    deliveries = (payload.get("data") or {}).get("deliveries")
+    if not isinstance(deliveries, list):
+        return None
+    events = []
+    for delivery in deliveries:
+        if not isinstance(delivery, dict):
+            continue
+        if isinstance(delivery.get("data"), dict):
+            events.append(delivery)
+        else:
+            # Bare event data: wrap it like a non-batched payload
+            events.append({"data": delivery, "timestamp": delivery.get("timestamp", payload.get("timestamp"))})
+    return events
+
+
+def _prefetch_batch(sg: SG, key: str, events: List[dict]) -> None:
+    """Load every entity the handler for `key` will read, a few queries in total."""
+    handler = _HANDLERS[key]
+    ids = [eid for eid in (_entity_id(e["data"]) for e in events) if eid is not None]
+    if not ids:
+        return
+
+    if handler in (_handle_version_status, _handle_version_created):
+        versions = sg.prefetch_versions(ids)
+        task_ids = [(v.get("sg_task") or {}).get("id") for v in versions.values()]
+        tasks = sg.prefetch_tasks([tid for tid in task_ids if tid])
+    elif handler is _handle_task_status:
+        tasks = sg.prefetch_tasks(ids)
+    elif handler is _handle_task_assignment:
+        tasks = sg.prefetch_tasks(ids, TASK_ASSIGNMENT_FIELDS)
+    else:
+        return
+
+    shot_ids = [(t.get("entity") or {}).get("id") for t in tasks.values()
+                if (t.get("entity") or {}).get("type") == "Shot"]
+    sg.prefetch_shots([sid for sid in shot_ids if sid])
+
+
+def _process_batch(key: str, events: List[dict]) -> List[dict]:
+    """Run `key`'s handler over all events with shared lookups and one commit."""
+    sg = SG()
+    uow = sg.shared_uow = SGUnitOfWork(sg, deferred=True)
+    sg.deferred_syncs = []
+    with span("sg.prefetch"):
+        _prefetch_batch(sg, key, events)
+
+    results = []
+    staged = []
+    for event in events:
+        mark = uow.mark()
+        try:
+            result = _process_event(key, event, sg)
+        except Exception as e:
+            logger.error("Batched %s event failed: %s", key, e)
+            result = {"error": f"Event processing failed: {str(e)}"}
+        results.append(result)
+        staged.append(uow.staged_since(mark))
+
+    reports = {(w["entity_type"], w["id"]): w for w in uow.commit()}
+    if sg.deferred_syncs:
+        _run_deferred_syncs(sg.deferred_syncs)
+    for result, keys in zip(results, staged):
+        if keys:
+            result["writes"] = [reports[k] for k in keys if k in reports]
+            failed = [w for w in result["writes"] if not w["ok"]]
+            if failed:
+                result["write_errors"] = len(failed)
+    return results
+
+
+def _run_deferred_syncs(deferred: List[tuple]) -> None:
+    """One full-sync trigger for every event of a batch that asked for one."""
+    reasons = [reason for _, reason, _ in deferred]
+    reason = reasons[0] if len(reasons) == 1 else f"{len(reasons)} batched events, first: {reasons[0]}"
+    try:
+        outcome = _SYNC_TRIGGER.get().trigger(_run_full_sync, reason=reason, events=len(deferred))
+    except Exception as e:
+        logger.error("Batched full sync failed: %s", e)
+        for result, _, _ in deferred:
+            result["error"] = f"Sync processing failed: {str(e)}"
+        return
+    # The sync result goes on the first event; the others were coalesced into it
+    _, _, first_attach = deferred[0]
+    first_attach(outcome)
+    for _, _, attach in deferred[1:]:
+        attach(dict(_sync_outcome(outcome), coalesced=True))
+
+
+def _dispatch_batch(key: str, events: List[dict]):
+    """Per-event de-duplication, then queue or process the remaining events."""
+    logger.info("Batched delivery of %s %s events", len(events), key)
+    deduper = _DEDUPER.get()
+    results: List[Optional[dict]] = [None] * len(events)
+    todo = []
+    repeats = []  # (index, index of the same event earlier in this batch)
+    first_seen: Dict[str, int] = {}
+    for i, event in enumerate(events):
+        # The delivery-id header is shared by the whole batch, so key on event ids only
+        dedupe_key = delivery_key(key, event)
+        if dedupe_key is not None and dedupe_key in first_seen:
+            repeats.append((i, first_seen[dedupe_key]))
+            continue
+        previous = deduper.begin(dedupe_key)
+        if previous is not None:
+            logger.info("Duplicate delivery %s, returning previous result", dedupe_key)
+            results[i] = dict(previous, duplicate=True)
+        else:
+            todo.append((i, event, dedupe_key))
+            if dedupe_key is not None:
+                first_seen[dedupe_key] = i
+
+    if WEBHOOK_MODE == "queue":
+        for n, (i, event, dedupe_key) in enumerate(todo):
+            try:
+                results[i] = {"queued": True, "id": _WORK_QUEUE.get().enqueue(key, event)}
+            except Exception:
+                for _, _, claimed in todo[n:]:
+                    deduper.forget(claimed)
+                raise
+            deduper.remember(dedupe_key, results[i])
+        for i, j in repeats:
+            results[i] = dict(results[j], duplicate=True)
+        return _json(_with_timings({"batch": True, "events": len(events), "results": results})), 202
+
+    if todo:
+        try:
+            processed = _process_batch(key, [event for _, event, _ in todo])
+        except Exception:
+            for _, _, dedupe_key in todo:
+                deduper.forget(dedupe_key)
+            raise
+        for (i, _, dedupe_key), result in zip(todo, processed):
+            results[i] = result
+            deduper.remember(dedupe_key, result)
+    for i, j in repeats:
+        results[i] = dict(results[j], duplicate=True)
+
+    logger.info("Batched webhook %s processing complete (%s processed, %s duplicates)",
+                key, len(todo), len(events) - len(todo))
+    return _json(_with_timings({"batch": True, "events": len(events), "results": results})), 200
+
+
+def _json(body: Any) -> Response:
+    """JSON response body; sync detail records are converted one by one as it is written."""
+    return make_response(json.dumps(body, default=json_default), {"Content-Type": "application/json"})
+
+
+def _correlation_id(request: Request) -> Optional[str]:
+    """Cloud trace id when the platform sent one, else the ShotGrid delivery id."""
+    trace = request.headers.get("X-Cloud-Trace-Context", "")
+    return trace.split("/", 1)[0] or request.headers.get("X-SG-Delivery-Id") or None
+
+
+def _route_key(request: Request, route: Optional[str]) -> str:
+    last = request.path.rstrip("/").split("/")[-1].lower()
+    if last == "timings":
+        # <function url>/timings reaches the span aggregate under every export's fixed route
+        return last
+    return (route or last).lower()
+
+
+def _with_timings(result: dict) -> dict:
+    """Log this request's span breakdown and, if enabled, add it to the response body."""
+    current = current_trace()
+    if current is None:
+        return result
+    timings = current.summary()
+    logger.info("Request timings: %s", lazy_json(timings), extra={"json_fields": {"timings": timings}})
+    return dict(result, timings=timings) if TRACE_IN_RESPONSE else result
+
+
 def _dispatch(request: Request, route: Optional[str] = None):
+    with request_context(_correlation_id(request), LOG_INFO_SAMPLE_RATE), trace(_route_key(request, route)):
+        return _dispatch_request(request, route)
+
+
+def _dispatch_request(request: Request, route: Optional[str]):
     path = request.path
-    key = (route or path.rstrip("/").split("/")[-1]).lower()
-    logger.info(f"Received webhook request to path '{path}', dispatching as '{key}'")
+    key = _route_key(request, route)
+    logger.info("Received webhook request to path '%s', dispatching as '%s'", path, key)
 
     body_data = request.get_data()
-    logger.debug(f"Request body size: {len(body_data)} bytes")
+    logger.debug("Request body size: %s bytes", len(body_data))
 
     sig = request.headers.get("X-SG-Signature")
     if not _verify_sig(body_data, sig):
-        logger.warning(f"Unauthorized request to {path}: Invalid signature")
+        logger.warning("Unauthorized request to %s: Invalid signature", path)
         abort(make_response(("Unauthorized", 401)))
 
+    if key == "timings":
+        # Span aggregate of this instance: POST <function url>/timings (see _route_key)
+        return _json(SPAN_STATS.snapshot()), 200
+
     try:
         payload = request.get_json(force=True)
-        logger.debug(f"Parsed JSON payload type: {payload.get('event_type', 'unknown')}")
+        logger.debug("Parsed JSON payload type: %s", payload.get('event_type', 'unknown'))
     except Exception as e:
-        logger.error(f"Failed to parse JSON from request: {str(e)}")
+        logger.error("Failed to parse JSON from request: %s", e)
         abort(make_response(("Bad JSON", 400)))
 
-    if key == "task":
-        logger.info("Handling as task webhook")
-        result = _handle_task_status(payload)
-    elif key in {"version", "status"}:
-        logger.info("Handling as version status webhook")
-        result = _handle_version_status(payload)
-    elif key in {"version_created", "version-created"}:
-        logger.info("Handling as version created webhook")
-        result = _handle_version_created(payload)
-    elif key == "assignment":
-        logger.info("Handling as assignment webhook")
-        result = _handle_task_assignment(payload)
-    elif key in {"shot", "shot_status", "shot-status"}:
-        logger.info("Handling as shot status webhook")
-        result = _handle_shot_status(payload)
-    else:
-        logger.warning(f"Unknown webhook type: {key}")
+    if key not in _HANDLERS:
+        logger.warning("Unknown webhook type: %s", key)
         abort(make_response(("Not Found", 404)))
 
-    ts = payload.get("timestamp")
-    if ts:
-        try:
-            ts_dt = datetime.fromisoformat(ts.replace("Z", "+00:00"))
-            lag_ms = int((datetime.now(timezone.utc) - ts_dt).total_seconds()*1000)
-            result["lag_ms"] = lag_ms
-            logger.info(f"Event processing lag: {lag_ms}ms")
-        except Exception as e:
-            logger.warning(f"Bad timestamp '{ts}': {str(e)}")
+    events = _split_deliveries(payload)
+    if events is not None:
+        return _dispatch_batch(key, events)
 
-    logger.info(f"Webhook {key} processing complete")
-    return jsonify(result), 200
+    deduper = _DEDUPER.get()
+    dedupe_key = delivery_key(key, payload, request.headers)
+    previous = deduper.begin(dedupe_key)
+    if previous is not None:
+        # A first delivery still running (in_progress) or queued is answered as accepted
+        accepted = previous.get("queued") or previous.get("in_progress")
+        logger.info("Duplicate delivery %s, returning %s", dedupe_key,
+                    "in-progress marker" if previous.get("in_progress") else "previous result")
+        return _json(_with_timings(dict(previous, duplicate=True))), 202 if accepted else 200
+
+    try:
+        if WEBHOOK_MODE == "queue":
+            item_id = _WORK_QUEUE.get().enqueue(key, payload)
+            logger.info("Webhook %s queued as %s", key, item_id)
+            result = {"queued": True, "id": item_id}
+            deduper.remember(dedupe_key, result)
+            return _json(_with_timings(result)), 202
+
+        result = _process_event(key, payload)
+    except Exception:
+        deduper.forget(dedupe_key)
+        raise
+    deduper.remember(dedupe_key, result)
+
+    logger.info("Webhook %s processing complete", key)
+    return _json(_with_timings(result)), 200
 
 
 # ─────────────────────────────── Cloud Function exports ────────────────────
@@ -690,3 +1201,27 @@ def assignment_webhook(request: Request):
 def shot_status_webhook(request: Request):
     """HTTP Cloud Function for shot status webhooks."""
     return _dispatch(request, "shot_status")
+
+# Queue workers
+@https_fn.on_request()
+def queue_worker(request: Request):
+    """Drain the SQLite work queue (call from Cloud Scheduler or locally)."""
+    if WEBHOOK_MODE != "queue" or QUEUE_BACKEND != "sqlite":
+        abort(make_response(("Queue mode not enabled", 404)))
+    max_items = int(request.args.get("max_items", 50))
+    with request_context(_correlation_id(request), LOG_INFO_SAMPLE_RATE), trace("queue_worker"):
+        summary = _WORK_QUEUE.get().drain(_process_event, max_items=max_items)
+        logger.info("Queue drain: %s processed, %s retried, %s dead-lettered",
+                    summary['processed'], summary['retried'], summary['dead_lettered'])
+        return _json(_with_timings(summary)), 200
+
+if WEBHOOK_MODE == "queue" and QUEUE_BACKEND == "pubsub":
+    @pubsub_fn.on_message_published(topic=QUEUE_TOPIC, retry=True)
+    def queue_worker_pubsub(event: pubsub_fn.CloudEvent[pubsub_fn.MessagePublishedData]):
+        """Process one queued webhook; raising makes Pub/Sub redeliver it."""
+        queue = _WORK_QUEUE.get()
+        item = queue.item_from_message(event.data.message)
+        with request_context(str(item.id), LOG_INFO_SAMPLE_RATE), trace("queue_worker_pubsub"):
+            process_item(queue, item, _process_event)
+            queue.ack(item)
+            _with_timings({})
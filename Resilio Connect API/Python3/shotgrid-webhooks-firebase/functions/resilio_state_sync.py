@@ -8,6 +8,9 @@ import yaml
 from typing import Dict, Any, Optional, List, Set, Tuple
 from api import ApiBaseCommands
 from errors import ApiError
+from leases import Fence
+from state_model import ShotGridState, Shot, StateInterner, SyncDetail
+from tracing import span, traced
 import logging
 
 logger = logging.getLogger("resilio-state-sync")
@@ -132,11 +135,11 @@ class ResilioStateAPI(ApiBaseCommands):
                 if job.get("name") == job_name:
                     job_id = job.get("id")
                     self._delete_job(job_id)
-                    logger.info(f"Deleted job: {job_name}")
+                    logger.info("Deleted job: %s", job_name)
                     return True
             return False
         except ApiError as e:
-            logger.error(f"Failed to delete job {job_name}: {e}")
+            logger.error("Failed to delete job %s: %s", job_name, e)
             return False
 
     def start_job(self, job_id: int) -> int:
@@ -154,11 +157,13 @@ class ShotGridStateManager:
     def __init__(self, sg_client):
         self.sg = sg_client
 
-    def get_active_shots_with_assignments(self) -> Dict[str, Any]:
+    @traced("sync.sg_query")
+    def get_active_shots_with_assignments(self) -> ShotGridState:
         """
         Get all active shots and their task assignments.
 
-        Returns:
+        Returns a `ShotGridState` of slotted records. It still reads like the
+        legacy dict:
             {
                 'shots': [
                     {
@@ -166,14 +171,15 @@ class ShotGridStateManager:
                         'code': 'TST_010_0010',
                         'project': {'name': 'Test Project', 'tank_name': 'TST'},
                         'sequence': 'TST_010',
-                        'assigned_artists': ['Matthew', 'Alex']
+                        'assigned_artists': ('Matthew', 'Alex')
                     }
                 ],
                 'artist_projects': {
-                    'Matthew': ['TST', 'TST2'],
-                    'Alex': ['TST']
+                    'Matthew': ('TST', 'TST2'),
+                    'Alex': ('TST',)
                 }
             }
+        Use `.as_dict()` for the plain JSON structure.
         """
         try:
             # Get all active shots
@@ -183,18 +189,21 @@ class ShotGridStateManager:
                 ["id", "code", "project", "tasks"]
             )
 
+            interner = StateInterner()
             shots_data = []
-            artist_projects = {}
+            artist_projects: Dict[str, Set[str]] = {}
 
             for shot in active_shots:
-                project = shot.get("project", {})
+                project = shot.get("project") or {}
                 project_name = project.get("name", "")
                 tank_name = project.get("tank_name", "")
 
                 if not tank_name:
-                    logger.warning(f"Shot {shot['code']} project has no tank_name, skipping")
+                    logger.warning("Shot %s project has no tank_name, skipping", shot['code'])
                     continue
 
+                project_record = interner.project(project_name, tank_name)
+
                 # Extract sequence from shot code (TST_010_0010 -> TST_010)
                 shot_code = shot.get("code", "")
                 sequence = "_".join(shot_code.split("_")[:2]) if "_" in shot_code else shot_code
@@ -212,36 +221,28 @@ class ShotGridStateManager:
                     for assignee in assignees:
                         artist_name = assignee.get("name", "")
                         if artist_name:
+                            artist_name = interner.name(artist_name)
                             assigned_artists.add(artist_name)
 
                             # Track which projects each artist works on
-                            if artist_name not in artist_projects:
-                                artist_projects[artist_name] = set()
-                            artist_projects[artist_name].add(tank_name)
-
-                shots_data.append({
-                    'id': shot['id'],
-                    'code': shot_code,
-                    'project': {
-                        'name': project_name,
-                        'tank_name': tank_name
-                    },
-                    'sequence': sequence,
-                    'assigned_artists': list(assigned_artists)
-                })
-
-            # Convert sets to lists for JSON serialization
-            for artist in artist_projects:
-                artist_projects[artist] = list(artist_projects[artist])
-
-            return {
-                'shots': shots_data,
-                'artist_projects': artist_projects
-            }
+                            artist_projects.setdefault(artist_name, set()).add(project_record.tank_name)
+
+                shots_data.append(Shot(
+                    id=shot['id'],
+                    code=interner.name(shot_code),
+                    project=project_record,
+                    sequence=interner.name(sequence),
+                    assigned_artists=tuple(sorted(assigned_artists))
+                ))
+
+            return ShotGridState(
+                shots=shots_data,
+                artist_projects={a: tuple(sorted(p)) for a, p in artist_projects.items()}
+            )
 
         except Exception as e:
-            logger.error(f"Failed to query ShotGrid state: {e}")
-            return {'shots': [], 'artist_projects': {}}
+            logger.error("Failed to query ShotGrid state: %s", e)
+            return ShotGridState()
 
 
 class ResilioStateSyncManager:
@@ -289,19 +290,24 @@ class ResilioStateSyncManager:
         else:
             return f"HybridWork_{artist}_{project}_Assets"
 
-    def sync_resilio_to_shotgrid_state(self, sg_state: Dict[str, Any],
-                                     resilio_url: str, resilio_token: str) -> Dict[str, Any]:
+    def sync_resilio_to_shotgrid_state(self, sg_state: ShotGridState,
+                                     resilio_url: str, resilio_token: str,
+                                     fence: Optional[Fence] = None) -> Dict[str, Any]:
         """
         Synchronize Resilio jobs to match ShotGrid state.
 
         Args:
             sg_state: Output from ShotGridStateManager.get_active_shots_with_assignments()
+                      (a legacy nested dict is accepted and converted)
             resilio_url: Resilio Connect URL
             resilio_token: API token
+            fence: Fence of the full-sync lease; checked before each job is
+                   touched, so a sync whose lease was lost stops (LeaseLostError)
 
         Returns:
             Sync results summary
         """
+        sg_state = ShotGridState.from_dict(sg_state)
         api = ResilioStateAPI(resilio_url, resilio_token, verify=False)
         artist_agents = self.get_artist_agent_mapping()
 
@@ -317,18 +323,21 @@ class ResilioStateSyncManager:
         }
 
         # Process shot-specific jobs
-        for shot in sg_state['shots']:
-            project_tank = shot['project']['tank_name']
-            shot_code = shot['code']
-            sequence = shot['sequence']
-
-            for artist in shot['assigned_artists']:
+        for shot in sg_state.shots:
+            project_tank = shot.project.tank_name
+            shot_code = shot.code
+            sequence = shot.sequence
+
+            for artist in shot.assigned_artists:
+                if fence is not None:
+                    fence.check()
                 if artist not in artist_agents:
-                    logger.info(f"Artist {artist} not in config, skipping")
+                    logger.info("Artist %s not in config, skipping", artist)
                     continue
 
                 agent_name = artist_agents[artist]
-                agent = api.find_agent_by_name(agent_name)
+                with span("sync.job_lookup"):
+                    agent = api.find_agent_by_name(agent_name)
 
                 if not agent:
                     error_msg = f"Agent {agent_name} for artist {artist} not found in Resilio"
@@ -342,40 +351,44 @@ class ResilioStateSyncManager:
                     job_name = self.generate_job_names(artist, project_tank, shot_code)
 
                     # Check if job exists
-                    existing_jobs = api.find_jobs_by_pattern(job_name)
-
-                    if existing_jobs:
-                        # Update existing job
-                        job = existing_jobs[0]
-                        job_id = job['id']
-                        api.update_job_path(job_id, shot_path)
-                        results['shot_jobs_updated'] += 1
-                        action = 'updated'
-                    else:
-                        # Create new job
-                        job_result = api.create_hybrid_work_job(
-                            name=job_name,
-                            agent_id=agent['id'],
-                            path=shot_path,
-                            description=f"Shot {shot_code} for {artist}"
-                        )
-                        job_id = job_result['id']
-                        results['shot_jobs_created'] += 1
-                        action = 'created'
+                    with span("sync.job_lookup"):
+                        existing_jobs = api.find_jobs_by_pattern(job_name)
+
+                    with span("sync.create_update"):
+                        if existing_jobs:
+                            # Update existing job
+                            job = existing_jobs[0]
+                            job_id = job['id']
+                            api.update_job_path(job_id, shot_path)
+                            results['shot_jobs_updated'] += 1
+                            action = 'updated'
+                        else:
+                            # Create new job
+                            job_result = api.create_hybrid_work_job(
+                                name=job_name,
+                                agent_id=agent['id'],
+                                path=shot_path,
+                                description=f"Shot {shot_code} for {artist}"
+                            )
+                            job_id = job_result['id']
+                            results['shot_jobs_created'] += 1
+                            action = 'created'
 
                     # Start job and hydrate shot folder
-                    active_run = api.get_active_run_for_job(job_id)
-                    if not active_run:
-                        run_id = api.start_job(job_id)
-                    else:
-                        run_id = active_run['id']
+                    with span("sync.start"):
+                        active_run = api.get_active_run_for_job(job_id)
+                        if not active_run:
+                            run_id = api.start_job(job_id)
+                        else:
+                            run_id = active_run['id']
 
                     # Hydrate the shot folder
-                    hydrate_result = api.hydrate_files(
-                        run_id=run_id,
-                        files=[shot_path],
-                        agents=[agent['id']]
-                    )
+                    with span("sync.hydrate"):
+                        hydrate_result = api.hydrate_files(
+                            run_id=run_id,
+                            files=[shot_path],
+                            agents=[agent['id']]
+                        )
 
                     success_count = sum(1 for a in hydrate_result.get("agents", [])
                                       if a.get("status") == "sent")
@@ -383,16 +396,16 @@ class ResilioStateSyncManager:
                         results['shot_jobs_hydrated'] += 1
 
                     results['artists_processed'].add(artist)
-                    results['details'].append({
-                        'type': 'shot',
-                        'artist': artist,
-                        'project': project_tank,
-                        'shot': shot_code,
-                        'job_name': job_name,
-                        'path': shot_path,
-                        'action': action,
-                        'hydrated': success_count > 0
-                    })
+                    results['details'].append(SyncDetail(
+                        type='shot',
+                        artist=artist,
+                        project=project_tank,
+                        shot=shot_code,
+                        job_name=job_name,
+                        path=shot_path,
+                        action=action,
+                        hydrated=success_count > 0
+                    ))
 
                 except Exception as e:
                     error_msg = f"Failed to process shot job for {artist}/{shot_code}: {e}"
@@ -400,58 +413,64 @@ class ResilioStateSyncManager:
                     results['errors'].append(error_msg)
 
         # Process assets jobs (one per artist per project)
-        for artist, projects in sg_state['artist_projects'].items():
+        for artist, projects in sg_state.artist_projects.items():
             if artist not in artist_agents:
                 continue
 
             agent_name = artist_agents[artist]
-            agent = api.find_agent_by_name(agent_name)
+            with span("sync.job_lookup"):
+                agent = api.find_agent_by_name(agent_name)
 
             if not agent:
                 continue
 
             for project_tank in projects:
+                if fence is not None:
+                    fence.check()
                 try:
                     assets_path = self.build_assets_path(project_tank)
                     job_name = self.generate_job_names(artist, project_tank)
 
                     # Check if assets job exists
-                    existing_jobs = api.find_jobs_by_pattern(job_name)
-
-                    if existing_jobs:
-                        # Update existing assets job
-                        job = existing_jobs[0]
-                        job_id = job['id']
-                        api.update_job_path(job_id, assets_path)
-                        results['assets_jobs_updated'] += 1
-                        action = 'updated'
-                    else:
-                        # Create new assets job
-                        job_result = api.create_hybrid_work_job(
-                            name=job_name,
-                            agent_id=agent['id'],
-                            path=assets_path,
-                            description=f"Assets for {project_tank} - {artist}"
-                        )
-                        results['assets_jobs_created'] += 1
-                        action = 'created'
-
-                    results['details'].append({
-                        'type': 'assets',
-                        'artist': artist,
-                        'project': project_tank,
-                        'job_name': job_name,
-                        'path': assets_path,
-                        'action': action,
-                        'hydrated': False  # No hydration for assets
-                    })
+                    with span("sync.job_lookup"):
+                        existing_jobs = api.find_jobs_by_pattern(job_name)
+
+                    with span("sync.create_update"):
+                        if existing_jobs:
+                            # Update existing assets job
+                            job = existing_jobs[0]
+                            job_id = job['id']
+                            api.update_job_path(job_id, assets_path)
+                            results['assets_jobs_updated'] += 1
+                            action = 'updated'
+                        else:
+                            # Create new assets job
+                            job_result = api.create_hybrid_work_job(
+                                name=job_name,
+                                agent_id=agent['id'],
+                                path=assets_path,
+                                description=f"Assets for {project_tank} - {artist}"
+                            )
+                            results['assets_jobs_created'] += 1
+                            action = 'created'
+
+                    results['details'].append(SyncDetail(
+                        type='assets',
+                        artist=artist,
+                        project=project_tank,
+                        job_name=job_name,
+                        path=assets_path,
+                        action=action,
+                        hydrated=False  # No hydration for assets
+                    ))
 
                 except Exception as e:
                     error_msg = f"Failed to process assets job for {artist}/{project_tank}: {e}"
                     logger.error(error_msg)
                     results['errors'].append(error_msg)
 
-        # Convert set to count for JSON serialization
+        # Convert set to count; `details` stay SyncDetail records, turned into
+        # dicts one at a time when the result is written out (state_model.json_default)
         results['artists_processed'] = len(results['artists_processed'])
 
         return results
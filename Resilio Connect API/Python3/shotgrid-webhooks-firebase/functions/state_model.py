@@ -0,0 +1,183 @@
+"""
+Compact records for studio-scale ShotGrid/Resilio state.
+
+`ShotGridStateManager.get_active_shots_with_assignments` used to return one
+nested dict per shot, each carrying its own copy of the project dict and the
+artist-name strings. For tens of thousands of shots that dominates the memory
+of a small Cloud Function instance, so the state is held in slotted records:
+
+- one `Project` instance per project, shared by every shot in it
+- artist names and tank names interned with `sys.intern`
+- assigned artists stored as tuples instead of lists
+
+Records also answer `record["key"]`, so callers written against the old
+dict layout (``shot['project']['tank_name']``, ``sg_state['shots']``) keep
+working unchanged. `as_dict()` produces the legacy JSON-friendly structure.
+"""
+from __future__ import annotations
+
+import sys
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+class _DictAdapter:
+    """Mixin giving slotted records read-only dict-style access."""
+    __slots__ = ()
+
+    def __getitem__(self, key: str) -> Any:
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key, default)
+
+    def __contains__(self, key: str) -> bool:
+        return hasattr(self, key)
+
+
+@dataclass(frozen=True, slots=True)
+class Project(_DictAdapter):
+    name: str
+    tank_name: str
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {'name': self.name, 'tank_name': self.tank_name}
+
+
+@dataclass(frozen=True, slots=True)
+class Shot(_DictAdapter):
+    id: int
+    code: str
+    project: Project
+    sequence: str
+    assigned_artists: Tuple[str, ...] = ()
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            'id': self.id,
+            'code': self.code,
+            'project': self.project.as_dict(),
+            'sequence': self.sequence,
+            'assigned_artists': list(self.assigned_artists),
+        }
+
+
+@dataclass(frozen=True, slots=True)
+class Assignment(_DictAdapter):
+    """One artist working on one shot (flattened view of `Shot.assigned_artists`)."""
+    artist: str
+    shot: Shot
+
+    @property
+    def project(self) -> Project:
+        return self.shot.project
+
+
+@dataclass(frozen=True, slots=True)
+class SyncDetail(_DictAdapter):
+    """One line of `sync_resilio_to_shotgrid_state` output."""
+    type: str
+    artist: str
+    project: str
+    job_name: str
+    path: str
+    action: str
+    hydrated: bool = False
+    shot: Optional[str] = None
+
+    def as_dict(self) -> Dict[str, Any]:
+        result = {
+            'type': self.type,
+            'artist': self.artist,
+            'project': self.project,
+            'job_name': self.job_name,
+            'path': self.path,
+            'action': self.action,
+            'hydrated': self.hydrated,
+        }
+        if self.shot is not None:
+            result['shot'] = self.shot
+        return result
+
+
+class StateInterner:
+    """Hands out one shared instance per artist name / project."""
+    __slots__ = ('_projects',)
+
+    def __init__(self):
+        self._projects: Dict[Tuple[str, str], Project] = {}
+
+    @staticmethod
+    def name(value: str) -> str:
+        return sys.intern(value) if value else value
+
+    def project(self, name: str, tank_name: str) -> Project:
+        key = (name, tank_name)
+        project = self._projects.get(key)
+        if project is None:
+            project = Project(self.name(name), self.name(tank_name))
+            self._projects[key] = project
+        return project
+
+
+@dataclass(slots=True)
+class ShotGridState(_DictAdapter):
+    """
+    Active shots plus the artist → project tank names index.
+
+    Supports ``state['shots']`` and ``state['artist_projects']`` like the dict
+    that `get_active_shots_with_assignments` used to return.
+    """
+    shots: List[Shot] = field(default_factory=list)
+    artist_projects: Dict[str, Tuple[str, ...]] = field(default_factory=dict)
+
+    def assignments(self) -> Iterator[Assignment]:
+        for shot in self.shots:
+            for artist in shot.assigned_artists:
+                yield Assignment(artist, shot)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            'shots': [shot.as_dict() for shot in self.shots],
+            'artist_projects': {a: list(p) for a, p in self.artist_projects.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, state: Dict[str, Any]) -> "ShotGridState":
+        """Adapter for callers still building the legacy nested-dict state."""
+        if isinstance(state, cls):
+            return state
+        interner = StateInterner()
+        shots = [
+            Shot(
+                id=s['id'],
+                code=s['code'],
+                project=interner.project(s['project'].get('name', ''), s['project']['tank_name']),
+                sequence=s['sequence'],
+                assigned_artists=_interned_tuple(s.get('assigned_artists', ()), interner),
+            )
+            for s in state.get('shots', [])
+        ]
+        artist_projects = {
+            interner.name(artist): _interned_tuple(projects, interner)
+            for artist, projects in state.get('artist_projects', {}).items()
+        }
+        return cls(shots, artist_projects)
+
+
+def json_default(value: Any) -> Any:
+    """
+    `json.dumps(..., default=json_default)` hook: records are turned into
+    dicts with `as_dict()` one at a time as they are written, so a result
+    holding thousands of `SyncDetail`s is never copied into dicts all at
+    once. Anything else falls back to `str`.
+    """
+    as_dict = getattr(value, "as_dict", None)
+    return as_dict() if callable(as_dict) else str(value)
+
+
+def _interned_tuple(values: Iterable[str], interner: StateInterner) -> Tuple[str, ...]:
+    return tuple(interner.name(v) for v in values)
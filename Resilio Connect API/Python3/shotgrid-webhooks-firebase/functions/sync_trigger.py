@@ -0,0 +1,167 @@
+"""
+Debounced, coalesced trigger for the full ShotGrid → Resilio sync.
+
+A bulk status change in ShotGrid fires one webhook per shot. Every trigger
+marks the sync as pending; only the caller that wins the lease runs it:
+
+1. wait `window_s` so the rest of the burst can arrive,
+2. clear the pending flag and run one full sync,
+3. if more events arrived meanwhile, run exactly one follow-up sync,
+4. release the lease (re-checking the flag so no event is lost in between).
+
+The lease is shared by all instances (see leases.py), so two full syncs
+never overlap. While it runs, a heartbeat renews the lease, and the sync
+checks the lease's fence before each job it touches: if the lease is lost
+(a stalled instance outlived its TTL), it stops instead of racing the new
+holder.
+
+Everyone else either returns immediately with ``{"coalesced": True}``
+(`wait_mode` "skip") or, with "join", waits for the run that covers their
+event and returns its published result.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, Optional
+
+from leases import Fence, LeaseBackend, LeaseHeartbeat, LeaseLostError
+
+logger = logging.getLogger("shotgrid-webhooks.sync-trigger")
+
+# Published results are read by other instances; keep them small
+_MAX_PUBLISHED_ERRORS = 20
+
+
+def compact_result(result: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """A sync result without the per-job details, for sharing with joined callers."""
+    if not result:
+        return {}
+    compact = dict(result)
+    sync_results = compact.get("sync_results")
+    if isinstance(sync_results, dict):
+        sync_results = {k: v for k, v in sync_results.items() if k != "details"}
+        errors = sync_results.get("errors") or []
+        sync_results["errors"] = errors[:_MAX_PUBLISHED_ERRORS]
+        if len(errors) > _MAX_PUBLISHED_ERRORS:
+            sync_results["errors_truncated"] = len(errors) - _MAX_PUBLISHED_ERRORS
+        compact["sync_results"] = sync_results
+    return compact
+
+
+class CoalescingSyncTrigger:
+    def __init__(self, backend: LeaseBackend, key: str = "resilio_full_sync",
+                 window_s: float = 5.0, lease_ttl_s: float = 60.0,
+                 heartbeat_s: Optional[float] = None, wait_mode: str = "skip",
+                 join_timeout_s: float = 120.0, join_poll_s: float = 0.5,
+                 sleep: Callable[[float], None] = time.sleep):
+        if wait_mode not in ("skip", "join"):
+            raise ValueError(f"Unknown sync wait mode '{wait_mode}' (use 'skip' or 'join')")
+        self.backend = backend
+        self.key = key
+        self.window_s = window_s
+        self.lease_ttl_s = lease_ttl_s
+        self.heartbeat_s = heartbeat_s
+        self.wait_mode = wait_mode
+        self.join_timeout_s = join_timeout_s
+        self.join_poll_s = join_poll_s
+        self._sleep = sleep
+        self._owner_prefix = f"{socket.gethostname()}:{os.getpid()}"
+
+    def _owner(self) -> str:
+        return f"{self._owner_prefix}:{threading.get_ident()}:{uuid.uuid4().hex[:8]}"
+
+    def trigger(self, run_sync: Callable[[Fence], Dict[str, Any]], reason: str = "",
+                events: int = 1) -> Dict[str, Any]:
+        """
+        Request a full sync; runs it here only if no other caller is already
+        on it. `run_sync(fence)` should call `fence.check()` before each step
+        with side effects. `events` is how many events this call stands for:
+        a batched delivery triggers once for all of them. Pending is a flag,
+        so it is marked once however many events there are.
+        """
+        seen_run = self.backend.mark_pending(self.key)
+        if events > 1:
+            logger.info("Full sync requested for %s batched events (%s)", events, reason)
+        owner = self._owner()
+        token = self.backend.try_acquire(self.key, owner, self.lease_ttl_s)
+        if not token:
+            if self.wait_mode == "join":
+                return self._join(run_sync, seen_run + 1, reason)
+            logger.info("Full sync already scheduled or running, coalescing trigger (%s)", reason)
+            return {"coalesced": True}
+        return self._run(run_sync, owner, token, reason)
+
+    def _run(self, run_sync: Callable[[Fence], Dict[str, Any]], owner: str, token: int,
+             reason: str) -> Dict[str, Any]:
+        runs = 0
+        last: Optional[Dict[str, Any]] = None
+        while True:
+            logger.info("Holding full-sync lease with fencing token %s (%s)", token, reason)
+            try:
+                with LeaseHeartbeat(self.backend, self.key, owner, token,
+                                    self.lease_ttl_s, self.heartbeat_s) as fence:
+                    if self.window_s > 0:
+                        logger.info("Debouncing full sync for %ss (%s)", self.window_s, reason)
+                        self._sleep(self.window_s)
+                    while True:
+                        fence.check()
+                        run = self.backend.take_pending(self.key)
+                        if not run:
+                            break
+                        try:
+                            last = run_sync(fence)
+                        except LeaseLostError:
+                            # Hand the events of this run to whoever holds the lease now
+                            self.backend.mark_pending(self.key)
+                            raise
+                        runs += 1
+                        self.backend.publish(self.key, owner, token, run, compact_result(last))
+                        logger.info("Coalesced full sync #%s (run %s) finished", runs, run)
+            except LeaseLostError as e:
+                logger.error("Full sync stopped: %s", e)
+                return {"coalesced": False, "lease_lost": True, "sync_runs": runs, "sync": last}
+            finally:
+                self.backend.release(self.key, owner)
+            # An event may have landed between the last take_pending and
+            # release; pick it up unless another caller already has.
+            if not self.backend.has_pending(self.key):
+                break
+            token = self.backend.try_acquire(self.key, owner, self.lease_ttl_s)
+            if not token:
+                break
+
+        return {"coalesced": False, "sync_runs": runs, "sync": last}
+
+    def _join(self, run_sync: Callable[[Fence], Dict[str, Any]], target_run: int,
+              reason: str) -> Dict[str, Any]:
+        """Wait for run `target_run` (the first to start after our event) and return its result."""
+        logger.info("Full sync in flight elsewhere, joining run %s (%s)", target_run, reason)
+        deadline = time.monotonic() + self.join_timeout_s
+        poll_s = self.join_poll_s
+        while True:
+            state = self.backend.read(self.key)
+            if state.get("done_seq", 0) >= target_run:
+                result = json.loads(state["result"]) if state.get("result") else {}
+                return {"coalesced": True, "joined": True, "sync_run": state["done_seq"], "sync": result}
+
+            holder_gone = not state.get("owner") or state.get("expires_at", 0) <= time.time()
+            if holder_gone and (state.get("pending") or state.get("run_seq", 0) >= target_run):
+                # The holder released or died without finishing our event: run it ourselves
+                if not state.get("pending"):
+                    self.backend.mark_pending(self.key)
+                owner = self._owner()
+                token = self.backend.try_acquire(self.key, owner, self.lease_ttl_s)
+                if token:
+                    return self._run(run_sync, owner, token, reason)
+
+            if time.monotonic() >= deadline:
+                logger.warning("Gave up joining full sync run %s after %ss", target_run, self.join_timeout_s)
+                return {"coalesced": True, "joined": False}
+            self._sleep(poll_s)
+            poll_s = min(poll_s * 1.5, 5.0)
@@ -0,0 +1,237 @@
+"""
+Lightweight span tracing for the webhook functions.
+
+A request opens a `trace()`; code inside it wraps interesting work in
+`span(name)`: every ShotGrid call (`TracedClient`), every Management Console
+request (api.py) and each phase of the full sync. Spans only measure
+wall-clock time with `perf_counter` and add it to per-name totals, so the
+cost is a few microseconds per span and nothing when no trace is active.
+
+- `Trace.summary()` is the compact breakdown returned in handler responses
+  and logged per request: {"total_ms", "spans": {name: {"n", "ms"}}}.
+  Span times are inclusive, so nested spans (a sync phase and the MC calls
+  inside it) both count the same time.
+- `STATS` aggregates spans of all requests in this instance (count, total,
+  max and p50/p95 over a sliding window) for quick profiling.
+- With `TRACE_OTEL_EXPORTER` set, spans are also sent to OpenTelemetry
+  (`otlp`, `cloud_trace` or `console`). The OTel packages are imported
+  only then; if they are missing, tracing stays local.
+"""
+from __future__ import annotations
+
+import contextvars
+import logging
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional
+
+logger = logging.getLogger("shotgrid-webhooks.tracing")
+
+_TRACE: contextvars.ContextVar[Optional["Trace"]] = contextvars.ContextVar("trace", default=None)
+_ENABLED = True
+_TRACER = None  # OpenTelemetry tracer when an exporter is configured
+
+
+class Trace:
+    """Per-request span totals: name → [count, seconds]."""
+    __slots__ = ("name", "started", "ended", "spans")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.started = time.perf_counter()
+        self.ended: Optional[float] = None
+        self.spans: Dict[str, List[float]] = {}
+
+    def add(self, name: str, seconds: float) -> None:
+        entry = self.spans.get(name)
+        if entry is None:
+            self.spans[name] = [1, seconds]
+        else:
+            entry[0] += 1
+            entry[1] += seconds
+
+    @property
+    def total_s(self) -> float:
+        return (self.ended or time.perf_counter()) - self.started
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "total_ms": round(self.total_s * 1000, 1),
+            "spans": {name: {"n": n, "ms": round(s * 1000, 1)}
+                      for name, (n, s) in sorted(self.spans.items(), key=lambda kv: -kv[1][1])},
+        }
+
+
+class SpanStats:
+    """Thread-safe in-memory aggregate of span timings across requests."""
+
+    def __init__(self, window: int = 1024):
+        self.window = window
+        self._lock = threading.Lock()
+        self._totals: Dict[str, List[float]] = {}  # name → [count, total_s, max_s]
+        self._recent: Dict[str, Deque[float]] = {}
+
+    def record(self, trace: Trace) -> None:
+        with self._lock:
+            self._add(f"request.{trace.name}", trace.total_s)
+            for name, (n, seconds) in trace.spans.items():
+                self._add(name, seconds, n)
+
+    def _add(self, name: str, seconds: float, n: int = 1) -> None:
+        totals = self._totals.get(name)
+        if totals is None:
+            totals = self._totals[name] = [0, 0.0, 0.0]
+            self._recent[name] = deque(maxlen=self.window)
+        totals[0] += n
+        totals[1] += seconds
+        totals[2] = max(totals[2], seconds / n)
+        self._recent[name].append(seconds / n)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Per span name: count, total/mean/max ms and p50/p95 ms over the recent window."""
+        with self._lock:
+            items = [(name, list(totals), sorted(self._recent[name])) for name, totals in self._totals.items()]
+        snapshot = {}
+        for name, (count, total_s, max_s), recent in sorted(items, key=lambda item: -item[1][1]):
+            snapshot[name] = {
+                "count": int(count),
+                "total_ms": round(total_s * 1000, 1),
+                "mean_ms": round(total_s / count * 1000, 2),
+                "max_ms": round(max_s * 1000, 1),
+                "p50_ms": round(recent[len(recent) // 2] * 1000, 2),
+                "p95_ms": round(recent[min(len(recent) - 1, int(len(recent) * 0.95))] * 1000, 2),
+            }
+        return snapshot
+
+    def reset(self) -> None:
+        with self._lock:
+            self._totals.clear()
+            self._recent.clear()
+
+
+STATS = SpanStats()
+
+
+def current_trace() -> Optional[Trace]:
+    return _TRACE.get()
+
+
+@contextmanager
+def trace(name: str) -> Iterator[Optional[Trace]]:
+    """Collect spans for one request (or queue item); adds them to `STATS` on exit."""
+    if not _ENABLED:
+        yield None
+        return
+    current = Trace(name)
+    token = _TRACE.set(current)
+    otel = _TRACER.start_as_current_span(f"request.{name}") if _TRACER is not None else nullcontext()
+    try:
+        with otel:
+            yield current
+    finally:
+        current.ended = time.perf_counter()
+        _TRACE.reset(token)
+        STATS.record(current)
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[None]:
+    """Time the block under `name` in the active trace (and OTel, when exporting)."""
+    current = _TRACE.get()
+    if current is None and _TRACER is None:
+        yield
+        return
+    otel = _TRACER.start_as_current_span(name, attributes=attributes) if _TRACER is not None else nullcontext()
+    started = time.perf_counter()
+    try:
+        with otel:
+            yield
+    finally:
+        if current is not None:
+            current.add(name, time.perf_counter() - started)
+
+
+class TracedClient:
+    """Proxy that wraps every method call of `client` in a `<prefix>.<method>` span."""
+
+    def __init__(self, client: Any, prefix: str):
+        self._client = client
+        self._prefix = prefix
+
+    @property
+    def wrapped(self) -> Any:
+        return self._client
+
+    def __getattr__(self, name: str) -> Any:
+        target = getattr(self._client, name)
+        if not callable(target) or name.startswith("_"):
+            return target
+        span_name = f"{self._prefix}.{name}"
+
+        def call(*args, **kwargs):
+            with span(span_name):
+                return target(*args, **kwargs)
+        return call
+
+
+_ID_SEGMENT = re.compile(r"/\d+(?=/|$)")
+
+
+def route_name(path: str) -> str:
+    """`/runs/42/files/hydrate` → `/runs/{id}/files/hydrate`, so span names stay low-cardinality."""
+    return _ID_SEGMENT.sub("/{id}", path.split("?", 1)[0])
+
+
+def traced(name: str) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """Decorator form of `span`."""
+    def decorator(func: Callable[..., Any]) -> Callable[..., Any]:
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def configure_tracing(conf: Optional[Dict[str, Any]] = None) -> None:
+    """Apply TRACE_SPANS, TRACE_STATS_WINDOW and TRACE_OTEL_EXPORTER from `conf`."""
+    global _ENABLED, _TRACER
+    conf = conf or {}
+    _ENABLED = bool(conf.get("TRACE_SPANS", True))
+    STATS.window = int(conf.get("TRACE_STATS_WINDOW", 1024))
+    STATS.reset()
+    exporter = (conf.get("TRACE_OTEL_EXPORTER") or "").lower()
+    _TRACER = _otel_tracer(exporter, conf) if _ENABLED and exporter else None
+
+
+def _otel_tracer(exporter: str, conf: Dict[str, Any]):
+    try:
+        from opentelemetry import trace as otel_trace
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+
+        if exporter == "otlp":
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+            span_exporter = OTLPSpanExporter(endpoint=conf.get("TRACE_OTEL_ENDPOINT") or None)
+        elif exporter == "cloud_trace":
+            from opentelemetry.exporter.cloud_trace import CloudTraceSpanExporter
+            span_exporter = CloudTraceSpanExporter()
+        elif exporter == "console":
+            span_exporter = ConsoleSpanExporter()
+        else:
+            logger.warning("Unknown TRACE_OTEL_EXPORTER '%s', spans stay local", exporter)
+            return None
+    except ImportError as e:
+        logger.warning("OpenTelemetry exporter '%s' unavailable (%s), spans stay local", exporter, e)
+        return None
+
+    provider = TracerProvider(resource=Resource.create({"service.name": "shotgrid-webhooks"}))
+    provider.add_span_processor(BatchSpanProcessor(span_exporter))
+    otel_trace.set_tracer_provider(provider)
+    logger.info("Exporting spans to OpenTelemetry (%s)", exporter)
+    return otel_trace.get_tracer("shotgrid-webhooks")
@@ -0,0 +1,230 @@
+"""
+Compiled status transitions from status_mapping.yaml.
+
+`compile_transitions` turns the mapping into an immutable `TransitionTable`
+once per instance. It checks the mapping first:
+
+- every status key in `version_to_task`, `task_to_shot`, `shot_to_task` and
+  `task_step_relations` must be declared in `version_statuses`,
+  `task_statuses` or `shot_statuses` (when those lists are present)
+- the mapped writes must not form a cycle that flips an entity between two
+  statuses (e.g. Task a → Shot x → Task b → Shot y → Task a)
+
+Each Version status gets its version → task → shot cascade precomputed,
+so "which writes does this event cause" is a couple of dict and frozenset
+lookups, whatever the size of the mapping.
+"""
+from __future__ import annotations
+
+import os
+from types import MappingProxyType
+from typing import Any, Dict, FrozenSet, List, Mapping, NamedTuple, Optional, Set, Tuple
+
+ENTITY_SECTIONS = {"Version": "version_statuses", "Task": "task_statuses", "Shot": "shot_statuses"}
+
+
+class Write(NamedTuple):
+    entity_type: str
+    status: str
+
+
+class Step(NamedTuple):
+    """One hop of the cascade: leave the entity alone if its status is in `accepted`, else set `target`."""
+    candidates: Tuple[str, ...]
+    accepted: FrozenSet[str]
+    target: str
+
+
+class Cascade(NamedTuple):
+    """What a Version status change implies for its Task and that Task's Shot."""
+    task: Optional[Step]
+    shot: Optional[Step]
+
+
+_NO_CASCADE = Cascade(None, None)
+
+
+def _step(candidates: List[str]) -> Optional[Step]:
+    return Step(tuple(candidates), frozenset(candidates), candidates[0]) if candidates else None
+
+
+class TransitionTable:
+    def __init__(self, version_to_task: Dict[str, List[str]], task_to_shot: Dict[str, List[str]]):
+        self._task_steps: Mapping[str, Step] = MappingProxyType(
+            {status: step for status, c in version_to_task.items() if (step := _step(c))})
+        self._shot_steps: Mapping[str, Step] = MappingProxyType(
+            {status: step for status, c in task_to_shot.items() if (step := _step(c))})
+        self._cascades: Mapping[str, Cascade] = MappingProxyType({
+            status: Cascade(step, self._shot_steps.get(step.target))
+            for status, step in self._task_steps.items()
+        })
+        # Hot path: per Version status, the accepted sets and the two possible
+        # write tuples, prebuilt so a lookup allocates nothing.
+        self._version_writes: Mapping[str, tuple] = MappingProxyType({
+            status: self._prebuilt(cascade) for status, cascade in self._cascades.items()
+        })
+        self._task_writes: Mapping[str, tuple] = MappingProxyType({
+            status: (step.accepted, (Write("Shot", step.target),)) for status, step in self._shot_steps.items()
+        })
+
+    @staticmethod
+    def _prebuilt(cascade: Cascade) -> tuple:
+        task_write = Write("Task", cascade.task.target)
+        if cascade.shot is None:
+            return cascade.task.accepted, None, (task_write,), (task_write,)
+        return (cascade.task.accepted, cascade.shot.accepted,
+                (task_write,), (task_write, Write("Shot", cascade.shot.target)))
+
+    # Candidate lists, as the mapping file states them
+    def task_candidates(self, version_status: str) -> Tuple[str, ...]:
+        step = self._task_steps.get(version_status)
+        return step.candidates if step else ()
+
+    def shot_candidates(self, task_status: str) -> Tuple[str, ...]:
+        step = self._shot_steps.get(task_status)
+        return step.candidates if step else ()
+
+    def cascade(self, version_status: str) -> Cascade:
+        return self._cascades.get(version_status, _NO_CASCADE)
+
+    # Writes
+    def task_target(self, version_status: str, task_status: Optional[str]) -> Optional[str]:
+        """Status the Task moves to after a Version change, or None if it stays."""
+        step = self._task_steps.get(version_status)
+        if step is None or task_status is None or task_status in step.accepted:
+            return None
+        return step.target
+
+    def shot_target(self, task_status: str, shot_status: Optional[str]) -> Optional[str]:
+        """Status the Shot moves to after its Task changes, or None if it stays."""
+        step = self._shot_steps.get(task_status)
+        if step is None or shot_status is None or shot_status in step.accepted:
+            return None
+        return step.target
+
+    def version_writes(self, version_status: str, task_status: Optional[str],
+                       shot_status: Optional[str]) -> Tuple[Write, ...]:
+        """Writes caused by a Version status change, given its Task's and Shot's current statuses."""
+        entry = self._version_writes.get(version_status)
+        if entry is None or task_status is None:
+            return ()
+        task_accepted, shot_accepted, task_only, task_and_shot = entry
+        if task_status in task_accepted:
+            return ()
+        if shot_accepted is None or shot_status is None or shot_status in shot_accepted:
+            return task_only
+        return task_and_shot
+
+    def task_writes(self, task_status: str, shot_status: Optional[str]) -> Tuple[Write, ...]:
+        """Writes caused by a Task status change, given its Shot's current status."""
+        entry = self._task_writes.get(task_status)
+        if entry is None or shot_status is None or shot_status in entry[0]:
+            return ()
+        return entry[1]
+
+    def __len__(self) -> int:
+        return len(self._task_steps) + len(self._shot_steps)
+
+
+# ─────────────────────────────── Validation ─────────────────────────────────
+
+def _declared(mapping: Dict[str, Any]) -> Dict[str, Optional[Set[str]]]:
+    declared: Dict[str, Optional[Set[str]]] = {}
+    for entity_type, section in ENTITY_SECTIONS.items():
+        entries = mapping.get(section)
+        declared[entity_type] = None if entries is None else {
+            str(e["key"]) if isinstance(e, dict) else str(e) for e in entries
+        }
+    return declared
+
+
+def _relations(mapping: Dict[str, Any]) -> List[Tuple[str, str, str, str, str]]:
+    """(section, source type, source status, target type, target status) for every mapped write."""
+    edges = []
+    for section, source, target in (("version_to_task", "Version", "Task"),
+                                    ("task_to_shot", "Task", "Shot"),
+                                    ("shot_to_task", "Shot", "Task")):
+        for status, candidates in (mapping.get(section) or {}).items():
+            for candidate in candidates or []:
+                edges.append((section, source, str(status), target, str(candidate)))
+    for step, rule in (mapping.get("task_step_relations") or {}).items():
+        edges.append((f"task_step_relations.{step}", "Task", str(rule.get("triggers_on_status")),
+                      "Task", str(rule.get("new_status"))))
+    return edges
+
+
+def _unknown_keys(mapping: Dict[str, Any]) -> List[str]:
+    declared = _declared(mapping)
+    problems = []
+    for section, source, status, target, candidate in _relations(mapping):
+        for entity_type, key in ((source, status), (target, candidate)):
+            known = declared[entity_type]
+            if known is not None and key not in known:
+                problems.append(f"{section}: '{key}' is not a declared {entity_type} status")
+    return list(dict.fromkeys(problems))
+
+
+def _oscillations(mapping: Dict[str, Any]) -> List[str]:
+    """
+    Cycles through the applied writes (the first candidate of each mapping)
+    that would move one entity type through two different statuses.
+    Cycles that come back to the same status are fixed points and allowed.
+    """
+    graph: Dict[Tuple[str, str], Set[Tuple[str, str]]] = {}
+    applied: Set[Tuple[str, str]] = set()
+    for section, source, status, target, candidate in _relations(mapping):
+        if (section, status) in applied and not section.startswith("task_step_relations"):
+            continue  # only the first candidate is ever written
+        applied.add((section, status))
+        graph.setdefault((source, status), set()).add((target, candidate))
+
+    def reachable(start):
+        seen, stack = set(), [start]
+        while stack:
+            for nxt in graph.get(stack.pop(), ()):
+                if nxt not in seen:
+                    seen.add(nxt)
+                    stack.append(nxt)
+        return seen
+
+    reach = {node: reachable(node) for node in graph}
+    problems, reported = [], set()
+    for node in graph:
+        component = frozenset(n for n in reach[node] if node in reach.get(n, ()))
+        if not component or component in reported:
+            continue
+        reported.add(component)
+        by_type: Dict[str, Set[str]] = {}
+        for entity_type, status in component:
+            by_type.setdefault(entity_type, set()).add(status)
+        flipping = {t: s for t, s in by_type.items() if len(s) > 1}
+        if flipping:
+            cycle = ", ".join(f"{t} {sorted(s)}" for t, s in sorted(flipping.items()))
+            problems.append(f"status cycle would oscillate: {cycle}")
+    return problems
+
+
+def validate_mapping(mapping: Dict[str, Any]) -> List[str]:
+    """Problems that make `mapping` unusable; empty if it compiles."""
+    return _unknown_keys(mapping) + _oscillations(mapping)
+
+
+def compile_transitions(mapping: Dict[str, Any]) -> TransitionTable:
+    problems = validate_mapping(mapping)
+    if problems:
+        raise ValueError("Invalid status mapping:\n  " + "\n  ".join(problems))
+    return TransitionTable(
+        {str(k): [str(s) for s in v or []] for k, v in (mapping.get("version_to_task") or {}).items()},
+        {str(k): [str(s) for s in v or []] for k, v in (mapping.get("task_to_shot") or {}).items()},
+    )
+
+
+def load_mapping(path: str) -> Dict[str, Any]:
+    import yaml  # deferred: keeps yaml off the cold-start import path
+
+    with open(path, "rt", encoding="utf8") as f:
+        return yaml.safe_load(f) or {}
+
+
+def load_transitions(path: str = os.path.join(os.path.dirname(__file__), "status_mapping.yaml")) -> TransitionTable:
+    return compile_transitions(load_mapping(path))
@@ -0,0 +1,85 @@
+"""
+Background connection pre-warm for ShotGrid and the Management Console.
+
+When enabled (`PREWARM` in config.json), module load starts one daemon thread
+per service. Each opens the same pooled connection the request handlers use
+and makes a cheap authenticated probe, so the first webhook doesn't pay DNS,
+TCP and TLS setup:
+
+- ShotGrid: builds the shared `_SG_CLIENT` (connect=True authenticates and
+  fetches server info over the connection later requests reuse)
+- Management Console: GET /api/v2/info on the shared `api.shared_session`
+
+Handlers never wait on a probe they don't need: a Management Console warm-up
+holds no locks, and a handler that needs ShotGrid while its warm-up is in
+flight joins that connection attempt instead of starting a second one.
+
+With `PREWARM_KEEPALIVE_S` > 0 the Management Console probe repeats at that
+interval to keep idle pooled connections open. ShotGrid is probed only once:
+the shotgun_api3 client is not thread-safe, so a background keep-alive call
+could collide with a request using the same connection.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger("shotgrid-webhooks.warmup")
+
+PROBE_TIMEOUT_S = 10
+
+
+def probe_resilio(resilio_url: str, resilio_token: str) -> int:
+    """Authenticated GET /api/v2/info on the pooled session; returns the HTTP status."""
+    from api import BASE_API_URL, shared_session
+
+    response = shared_session(resilio_url).get(
+        resilio_url + BASE_API_URL + "/info",
+        headers={"Authorization": f"Token {resilio_token}"},
+        verify=False,  # matches ResilioStateAPI so the same pooled connection is reused
+        timeout=PROBE_TIMEOUT_S,
+    )
+    return response.status_code
+
+
+def probe_shotgrid(get_client: Callable[[], Any]) -> None:
+    """Open the shared ShotGrid client (a no-op if a handler already did)."""
+    get_client()
+
+
+def _loop(name: str, probe: Callable[[], Any], keepalive_s: float) -> None:
+    while True:
+        started = time.perf_counter()
+        try:
+            result = probe()
+            logger.info("Pre-warmed %s in %.0fms%s", name, (time.perf_counter() - started) * 1000,
+                        f" (HTTP {result})" if result is not None else "")
+        except Exception as e:
+            logger.warning("Pre-warm of %s failed: %s", name, e)
+        if keepalive_s <= 0:
+            return
+        time.sleep(keepalive_s)
+
+
+def start_warmup(conf: Dict[str, Any], get_sg_client: Callable[[], Any]) -> List[threading.Thread]:
+    """Start the background warm-up threads configured in `conf`; returns them."""
+    if not conf.get("PREWARM"):
+        return []
+
+    keepalive_s = float(conf.get("PREWARM_KEEPALIVE_S", 0))
+    probes: Dict[str, Callable[[], Optional[int]]] = {}
+    if conf.get("SHOTGRID_URL"):
+        probes["ShotGrid"] = lambda: probe_shotgrid(get_sg_client)
+    if conf.get("RESILIO_URL") and conf.get("RESILIO_TOKEN"):
+        probes["Management Console"] = lambda: probe_resilio(conf["RESILIO_URL"], conf["RESILIO_TOKEN"])
+
+    threads = []
+    for name, probe in probes.items():
+        interval = keepalive_s if name == "Management Console" else 0
+        thread = threading.Thread(target=_loop, args=(name, probe, interval),
+                                  name=f"warmup-{name}", daemon=True)
+        thread.start()
+        threads.append(thread)
+    return threads
@@ -0,0 +1,288 @@
+"""
+Durable work queue for webhook payloads.
+
+In queue mode `_dispatch` only verifies the signature, persists the payload
+here and answers ShotGrid with 202. A worker drains the queue later with
+retries, moving payloads that keep failing to a dead-letter store.
+
+Backends:
+- SQLiteWorkQueue  – local file; the `queue_worker` HTTP function drains it
+- PubSubWorkQueue  – production; Pub/Sub pushes each message to
+                     `queue_worker_pubsub`, which retries by raising and
+                     dead-letters to Firestore once `max_attempts` is reached
+"""
+from __future__ import annotations
+
+import json
+import logging
+import sqlite3
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger("shotgrid-webhooks.queue")
+
+
+@dataclass
+class QueueItem:
+    id: str
+    route: str
+    payload: Dict[str, Any]
+    attempts: int = 0
+
+
+class WorkQueue:
+    """Interface shared by queue backends."""
+
+    max_attempts: int = 5
+
+    def enqueue(self, route: str, payload: Dict[str, Any]) -> str:
+        """Persist a payload for later processing; returns the item id."""
+        raise NotImplementedError
+
+    def dead_letter(self, item: QueueItem, error: str) -> None:
+        raise NotImplementedError
+
+
+class HandlerFailed(RuntimeError):
+    """A handler returned a result that reports a failure instead of raising."""
+
+
+def result_error(result: Any) -> Optional[str]:
+    """
+    The failure a handler result reports, or None. Handlers catch their own
+    exceptions and return {"error": ...}; partial ShotGrid write failures
+    come back as {"write_errors": n}.
+    """
+    if not isinstance(result, dict):
+        return None
+    if result.get("error"):
+        return str(result["error"])
+    if result.get("write_errors"):
+        return f"{result['write_errors']} ShotGrid writes failed"
+    return None
+
+
+def process_item(queue: WorkQueue, item: QueueItem,
+                 handler: Callable[[str, Dict[str, Any]], Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Run one queued payload. Failures - raised, or reported in the result
+    (see `result_error`) - propagate so the backend retries; on the final
+    attempt the item is dead-lettered instead.
+    """
+    try:
+        result = handler(item.route, item.payload)
+        error = result_error(result)
+        if error is not None:
+            raise HandlerFailed(error)
+        return result
+    except Exception as e:
+        logger.error("Queued %s item %s failed (attempt %s): %s", item.route, item.id, item.attempts, e)
+        if item.attempts >= queue.max_attempts:
+            queue.dead_letter(item, str(e))
+            return {"dead_lettered": True, "error": str(e)}
+        raise
+
+
+# ─────────────────────────────── SQLite ─────────────────────────────────────
+
+class SQLiteWorkQueue(WorkQueue):
+    def __init__(self, path: str, max_attempts: int = 5, lease_s: float = 300.0,
+                 backoff_s: float = 10.0):
+        self.path = path
+        self.max_attempts = max_attempts
+        self.lease_s = lease_s
+        self.backoff_s = backoff_s
+        with self._tx() as db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS queue ("
+                " id TEXT PRIMARY KEY, route TEXT NOT NULL, payload TEXT NOT NULL,"
+                " attempts INTEGER NOT NULL DEFAULT 0, available_at REAL NOT NULL,"
+                " last_error TEXT, created_at REAL NOT NULL)"
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS queue_available ON queue (available_at)")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS dead_letters ("
+                " id TEXT PRIMARY KEY, route TEXT NOT NULL, payload TEXT NOT NULL,"
+                " attempts INTEGER NOT NULL, error TEXT, failed_at REAL NOT NULL)"
+            )
+
+    @contextmanager
+    def _tx(self):
+        db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                yield db
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+            db.execute("COMMIT")
+        finally:
+            db.close()
+
+    def enqueue(self, route, payload):
+        item_id = uuid.uuid4().hex
+        now = time.time()
+        with self._tx() as db:
+            db.execute(
+                "INSERT INTO queue (id, route, payload, available_at, created_at) VALUES (?, ?, ?, ?, ?)",
+                (item_id, route, json.dumps(payload), now, now),
+            )
+        return item_id
+
+    def claim(self, limit: int = 10) -> List[QueueItem]:
+        """Lease up to `limit` due items; unacked items reappear after `lease_s`."""
+        now = time.time()
+        with self._tx() as db:
+            rows = db.execute(
+                "SELECT id, route, payload, attempts FROM queue WHERE available_at <= ?"
+                " ORDER BY available_at LIMIT ?",
+                (now, limit),
+            ).fetchall()
+            db.executemany(
+                "UPDATE queue SET attempts = attempts + 1, available_at = ? WHERE id = ?",
+                [(now + self.lease_s, row[0]) for row in rows],
+            )
+        return [QueueItem(r[0], r[1], json.loads(r[2]), r[3] + 1) for r in rows]
+
+    def ack(self, item: QueueItem) -> None:
+        with self._tx() as db:
+            db.execute("DELETE FROM queue WHERE id = ?", (item.id,))
+
+    def retry_later(self, item: QueueItem, error: str) -> None:
+        delay = self.backoff_s * (2 ** (item.attempts - 1))
+        with self._tx() as db:
+            db.execute(
+                "UPDATE queue SET available_at = ?, last_error = ? WHERE id = ?",
+                (time.time() + delay, error, item.id),
+            )
+
+    def dead_letter(self, item, error):
+        with self._tx() as db:
+            db.execute(
+                "INSERT OR REPLACE INTO dead_letters (id, route, payload, attempts, error, failed_at)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (item.id, item.route, json.dumps(item.payload), item.attempts, error, time.time()),
+            )
+            db.execute("DELETE FROM queue WHERE id = ?", (item.id,))
+        logger.warning("Dead-lettered %s item %s after %s attempts: %s", item.route, item.id, item.attempts, error)
+
+    def dead_letters(self) -> List[Dict[str, Any]]:
+        with self._tx() as db:
+            rows = db.execute(
+                "SELECT id, route, payload, attempts, error, failed_at FROM dead_letters ORDER BY failed_at"
+            ).fetchall()
+        return [
+            {"id": r[0], "route": r[1], "payload": json.loads(r[2]), "attempts": r[3],
+             "error": r[4], "failed_at": r[5]}
+            for r in rows
+        ]
+
+    def drain(self, handler: Callable[[str, Dict[str, Any]], Dict[str, Any]],
+              max_items: int = 50) -> Dict[str, Any]:
+        """Process due items until the queue is empty or `max_items` were handled."""
+        summary = {"processed": 0, "retried": 0, "dead_lettered": 0, "results": []}
+        handled = 0
+        while handled < max_items:
+            items = self.claim(min(10, max_items - handled))
+            if not items:
+                break
+            handled += len(items)
+            for item in items:
+                try:
+                    result = process_item(self, item, handler)
+                except Exception as e:
+                    self.retry_later(item, str(e))
+                    summary["retried"] += 1
+                    continue
+                if result.get("dead_lettered"):
+                    summary["dead_lettered"] += 1
+                else:
+                    self.ack(item)
+                    summary["processed"] += 1
+                summary["results"].append({"id": item.id, "route": item.route, "result": result})
+        return summary
+
+
+# ─────────────────────────────── Pub/Sub ────────────────────────────────────
+
+class PubSubWorkQueue(WorkQueue):
+    """
+    Publishes payloads to a Pub/Sub topic. Delivery, backoff and retries are
+    Pub/Sub's; attempt counts and dead letters live in Firestore.
+    """
+
+    def __init__(self, project_id: str, topic: str, max_attempts: int = 5,
+                 dead_letter_collection: str = "webhook_dead_letters"):
+        from google.cloud import pubsub_v1  # deferred: only needed in production
+
+        self.max_attempts = max_attempts
+        self._publisher = pubsub_v1.PublisherClient()
+        self._topic_path = self._publisher.topic_path(project_id, topic)
+        self._dead_letter_collection = dead_letter_collection
+
+    def enqueue(self, route, payload):
+        item_id = uuid.uuid4().hex
+        future = self._publisher.publish(
+            self._topic_path, json.dumps(payload).encode("utf8"), route=route, item_id=item_id,
+        )
+        future.result(timeout=10)
+        return item_id
+
+    def _attempts_doc(self, item_id: str):
+        from google.cloud import firestore
+
+        return firestore.Client().collection(f"{self._dead_letter_collection}_attempts").document(item_id)
+
+    def item_from_message(self, message: Any) -> QueueItem:
+        """
+        Rebuild a QueueItem from a firebase_functions Pub/Sub message, counting
+        this delivery attempt (Pub/Sub push events don't carry one).
+        """
+        from google.cloud import firestore
+
+        attrs = message.attributes or {}
+        item_id = attrs.get("item_id") or message.message_id
+        doc = self._attempts_doc(item_id)
+        doc.set({"attempts": firestore.Increment(1)}, merge=True)
+        attempts = int((doc.get().to_dict() or {}).get("attempts", 1))
+        return QueueItem(item_id, attrs["route"], message.json, attempts)
+
+    def ack(self, item: QueueItem) -> None:
+        self._attempts_doc(item.id).delete()
+
+    def dead_letter(self, item, error):
+        from google.cloud import firestore
+
+        firestore.Client().collection(self._dead_letter_collection).document(item.id).set({
+            "route": item.route,
+            "payload": item.payload,
+            "attempts": item.attempts,
+            "error": error,
+            "failed_at": time.time(),
+        })
+        self.ack(item)
+        logger.warning("Dead-lettered %s item %s after %s attempts: %s", item.route, item.id, item.attempts, error)
+
+
+# ─────────────────────────────── Factory ────────────────────────────────────
+
+def make_work_queue(conf: Dict[str, Any]) -> Optional[WorkQueue]:
+    """
+    Build the queue named by `QUEUE_BACKEND` ("sqlite" or "pubsub"). Returns
+    None when `WEBHOOK_MODE` is not "queue".
+    """
+    if (conf.get("WEBHOOK_MODE") or "sync").lower() != "queue":
+        return None
+    kind = (conf.get("QUEUE_BACKEND") or "sqlite").lower()
+    max_attempts = int(conf.get("QUEUE_MAX_ATTEMPTS", 5))
+    if kind == "sqlite":
+        return SQLiteWorkQueue(conf.get("QUEUE_PATH") or "/tmp/shotgrid-webhooks-queue.db",
+                               max_attempts=max_attempts)
+    if kind == "pubsub":
+        return PubSubWorkQueue(conf["QUEUE_PROJECT_ID"], conf.get("QUEUE_TOPIC") or "shotgrid-webhooks",
+                               max_attempts=max_attempts)
+    raise ValueError(f"Unknown QUEUE_BACKEND '{kind}'")
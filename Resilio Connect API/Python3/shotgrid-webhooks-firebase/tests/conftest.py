@@ -0,0 +1,5 @@
+"""Tests import the function modules the way the Functions runtime does: from functions/."""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "functions"))
@@ -0,0 +1,84 @@
+"""Batched shot-status / assignment deliveries trigger one full sync, not one per event."""
+import pytest
+
+import main
+from leases import MemoryLeaseBackend
+from sync_trigger import CoalescingSyncTrigger
+
+
+class FakeShotGrid:
+    """Just enough of shotgun_api3.Shotgun for the batch prefetch: tasks on active shots."""
+
+    def __init__(self, n):
+        self.tasks = {i: {"type": "Task", "id": i, "step": None, "sg_status_list": "ip", "project": None,
+                          "entity": {"type": "Shot", "id": 100 + i}, "task_assignees": []} for i in range(1, n + 1)}
+        self.shots = {100 + i: {"type": "Shot", "id": 100 + i, "code": f"SH{i:03d}", "sg_status_list": "active",
+                                "project": None} for i in range(1, n + 1)}
+
+    def find(self, entity_type, filters, fields):
+        table = {"Task": self.tasks, "Shot": self.shots}[entity_type]
+        return [dict(table[i]) for i in filters[0][2] if i in table]
+
+    def find_one(self, entity_type, filters, fields):
+        rows = self.find(entity_type, [["id", "in", [filters[0][2]]]], fields)
+        return rows[0] if rows else None
+
+
+class CountingBackend(MemoryLeaseBackend):
+    marks = 0
+
+    def mark_pending(self, key):
+        self.marks += 1
+        return super().mark_pending(key)
+
+
+@pytest.fixture
+def syncs(monkeypatch):
+    """Counts full syncs; the trigger runs them right away (no debounce window)."""
+    runs = []
+
+    def run_full_sync(fence=None):
+        runs.append(fence)
+        return {"active_shots_found": 1, "sync_results": {"errors": []}}
+
+    monkeypatch.setattr(main, "RESILIO_URL", "http://mc.invalid")
+    monkeypatch.setattr(main, "RESILIO_TOKEN", "token")
+    monkeypatch.setattr(main, "_run_full_sync", run_full_sync)
+    main._SYNC_TRIGGER.set(CoalescingSyncTrigger(CountingBackend(), window_s=0))
+    yield runs
+    main._SYNC_TRIGGER.reset()
+    main._SG_CLIENT.reset()
+
+
+def shot_status_event(shot_id):
+    return {"data": {"entity": {"type": "Shot", "id": shot_id},
+                     "meta": {"attribute_name": "sg_status_list", "old_value": "ip", "new_value": "active"}}}
+
+
+def test_batched_shot_status_runs_one_sync(syncs):
+    main._SG_CLIENT.set(FakeShotGrid(0))
+    results = main._process_batch("shot_status", [shot_status_event(i) for i in range(10)])
+
+    assert len(syncs) == 1 and main._SYNC_TRIGGER.get().backend.marks == 1
+    assert results[0]["sync_runs"] == 1
+    assert results[0]["active_shots_found"] == 1
+    assert all(r["coalesced"] and "active_shots_found" not in r for r in results[1:])
+    assert not any("error" in r for r in results)
+
+
+def test_batched_assignments_run_one_sync(syncs):
+    main._SG_CLIENT.set(FakeShotGrid(10))
+    results = main._process_batch("assignment", [{"data": {"entity": {"type": "Task", "id": i}}}
+                                                 for i in range(1, 11)])
+
+    assert len(syncs) == 1
+    assert [r["trigger_reason"] for r in results] == ["assignment_to_active_shot"] * 10
+    assert results[0]["sync_results"] == {"errors": []}
+
+
+def test_single_delivery_still_syncs(syncs):
+    main._SG_CLIENT.set(FakeShotGrid(0))
+    result = main._process_event("shot_status", shot_status_event(1))
+
+    assert len(syncs) == 1
+    assert result["sync_runs"] == 1
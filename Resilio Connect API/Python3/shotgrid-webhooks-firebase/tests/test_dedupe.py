@@ -0,0 +1,80 @@
+import hashlib
+import hmac
+import json
+
+from flask import Flask
+
+import main
+from dedupe import IN_PROGRESS, DeliveryDeduper, SQLiteDedupeStore
+
+app = Flask(__name__)
+
+
+def test_failed_results_are_not_remembered(tmp_path):
+    deduper = DeliveryDeduper(store=SQLiteDedupeStore(str(tmp_path / "dedupe.db")))
+    deduper.remember("error", {"error": "ShotGrid down"})
+    deduper.remember("partial", {"updated": 3, "write_errors": 2})
+    deduper.remember("ok", {"updated": 5, "write_errors": 0})
+
+    assert deduper.seen("error") is None
+    assert deduper.seen("partial") is None
+    assert deduper.seen("ok") == {"updated": 5, "write_errors": 0}
+
+
+def test_sync_details_are_not_kept():
+    deduper = DeliveryDeduper()
+    deduper.remember("sync", {"sync_results": {"created": 2, "errors": [], "details": [{"shot": "SH010"}] * 1000}})
+
+    assert deduper.seen("sync") == {"sync_results": {"created": 2, "errors": []}}
+
+
+def test_claim_is_shared_through_the_store(tmp_path):
+    path = str(tmp_path / "dedupe.db")
+    first, second = DeliveryDeduper(store=SQLiteDedupeStore(path)), DeliveryDeduper(store=SQLiteDedupeStore(path))
+
+    assert first.begin("event:1") is None
+    assert first.begin("event:1") == IN_PROGRESS
+    assert second.begin("event:1") == IN_PROGRESS
+
+    first.remember("event:1", {"updated": 1})
+    assert second.begin("event:1") == {"updated": 1}
+
+
+def test_failed_claim_lets_the_retry_run(tmp_path):
+    deduper = DeliveryDeduper(store=SQLiteDedupeStore(str(tmp_path / "dedupe.db")))
+    assert deduper.begin("event:1") is None
+    deduper.remember("event:1", {"error": "Resilio down"})
+
+    assert deduper.begin("event:1") is None
+
+
+def signed_post(body):
+    signature = "sha1=" + hmac.new(main.SECRET_TOKEN, body, hashlib.sha1).hexdigest()
+    return app.test_request_context("/", method="POST", data=body, headers={"X-SG-Signature": signature})
+
+
+def test_retry_during_a_slow_delivery_is_answered_in_progress(monkeypatch):
+    body = json.dumps({"data": {"id": 77, "entity": {"type": "Shot", "id": 1}}}).encode()
+    retries = []
+
+    def slow_event(key, payload):
+        # ShotGrid retries while the first delivery is still syncing
+        with signed_post(body) as ctx:
+            retries.append(main._dispatch(ctx.request, "shot_status"))
+        return {"sync_results": {"errors": [], "details": [{"shot": "SH010"}]}}
+
+    monkeypatch.setattr(main, "WEBHOOK_MODE", "sync")
+    monkeypatch.setattr(main, "_process_event", slow_event)
+    main._DEDUPER.set(DeliveryDeduper())
+    try:
+        with signed_post(body) as ctx:
+            response, status = main._dispatch(ctx.request, "shot_status")
+        with signed_post(body) as ctx:
+            again, again_status = main._dispatch(ctx.request, "shot_status")
+    finally:
+        main._DEDUPER.reset()
+
+    assert status == 200 and len(retries) == 1
+    retry, retry_status = retries[0]
+    assert retry_status == 202 and retry.get_json()["in_progress"] and retry.get_json()["duplicate"]
+    assert again_status == 200 and again.get_json()["sync_results"] == {"errors": []}
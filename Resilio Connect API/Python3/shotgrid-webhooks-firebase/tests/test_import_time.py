@@ -0,0 +1,18 @@
+"""The cold-start gate of tools/bench_import_time.py, run as part of the suite."""
+import os
+import statistics
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "tools"))
+
+from bench_import_time import LAZY_MODULES, import_profile  # noqa: E402
+
+MAX_IMPORT_MS = float(os.getenv("MAX_IMPORT_MS", 1500))
+
+
+def test_main_imports_fast_and_stays_lazy():
+    profiles = [import_profile("main") for _ in range(3)]
+    median_ms = statistics.median(prof["main"][1] / 1000 for prof in profiles)
+
+    assert [m for m in LAZY_MODULES if m in profiles[-1]] == []
+    assert median_ms <= MAX_IMPORT_MS
@@ -0,0 +1,79 @@
+"""Lease acquisition, expiry takeover and fencing, on the backends that share state across processes."""
+import json
+import sqlite3
+import time
+
+import pytest
+
+from leases import FileLeaseBackend, LeaseHeartbeat, LeaseLostError, MemoryLeaseBackend, SQLiteLeaseBackend
+
+
+@pytest.fixture(params=["sqlite", "file", "memory"])
+def backend(request, tmp_path):
+    if request.param == "sqlite":
+        return SQLiteLeaseBackend(str(tmp_path / "leases.db"))
+    if request.param == "file":
+        return FileLeaseBackend(str(tmp_path / "leases"))
+    return MemoryLeaseBackend()
+
+
+def test_live_lease_is_exclusive(backend):
+    token = backend.try_acquire("sync", "a", 30)
+
+    assert token == 1
+    assert backend.try_acquire("sync", "b", 30) is None
+    assert backend.try_acquire("sync", "a", 30) == token  # renewing keeps the token
+    backend.release("sync", "a")
+    assert backend.try_acquire("sync", "b", 30) == token + 1
+
+
+def test_stale_owner_is_fenced_off_after_takeover(backend):
+    stale = backend.try_acquire("sync", "a", 0.05)
+    time.sleep(0.1)
+    fresh = backend.try_acquire("sync", "b", 30)
+
+    assert fresh == stale + 1
+    assert not backend.renew("sync", "a", 30)
+    assert not backend.publish("sync", "a", stale, 1, {"by": "a"})
+    assert backend.publish("sync", "b", fresh, 1, {"by": "b"})
+    assert json.loads(backend.read("sync")["result"]) == {"by": "b"}
+    backend.release("sync", "a")  # a late release from the stale owner changes nothing
+    assert backend.read("sync")["owner"] == "b"
+
+
+def test_pending_runs_are_numbered(backend):
+    assert backend.mark_pending("sync") == 0
+    assert backend.has_pending("sync")
+    assert backend.take_pending("sync") == 1
+    assert backend.take_pending("sync") == 0
+    assert backend.mark_pending("sync") == 1
+
+
+def test_fence_trips_once_the_lease_is_lost(backend):
+    token = backend.try_acquire("sync", "a", 0.2)
+    # Heartbeats slower than the TTL: the lease lapses and "b" takes it before "a" renews
+    with LeaseHeartbeat(backend, "sync", "a", token, ttl_s=0.2, interval_s=0.4) as fence:
+        fence.check()
+        time.sleep(0.25)
+        assert backend.try_acquire("sync", "b", 30) == token + 1
+        deadline = time.monotonic() + 2
+        while not fence.lost and time.monotonic() < deadline:
+            time.sleep(0.05)
+        with pytest.raises(LeaseLostError):
+            fence.check()
+
+
+def test_sqlite_lease_file_without_fencing_columns_is_migrated(tmp_path):
+    path = str(tmp_path / "leases.db")
+    db = sqlite3.connect(path)
+    db.execute("CREATE TABLE leases (key TEXT PRIMARY KEY, owner TEXT,"
+               " expires_at REAL NOT NULL DEFAULT 0, pending INTEGER NOT NULL DEFAULT 0)")
+    db.execute("INSERT INTO leases (key, owner, expires_at, pending) VALUES ('sync', 'old', 0, 1)")
+    db.commit()
+    db.close()
+
+    backend = SQLiteLeaseBackend(path)
+
+    assert backend.try_acquire("sync", "a", 30) == 1
+    assert backend.take_pending("sync") == 1
+    assert backend.publish("sync", "a", 1, 1, {"ok": True})
@@ -0,0 +1,29 @@
+"""Route resolution: exported functions pass a fixed route, `/timings` wins over it."""
+import hashlib
+import hmac
+
+from flask import Flask
+
+import main
+
+app = Flask(__name__)
+
+
+def signed_post(path, body=b""):
+    signature = "sha1=" + hmac.new(main.SECRET_TOKEN, body, hashlib.sha1).hexdigest()
+    return app.test_request_context(path, method="POST", data=body, headers={"X-SG-Signature": signature})
+
+
+def test_timings_suffix_beats_fixed_route():
+    with signed_post("/shot_status_webhook/timings") as ctx:
+        assert main._route_key(ctx.request, "shot_status") == "timings"
+        response, status = main._dispatch(ctx.request, "shot_status")
+    assert status == 200
+    assert isinstance(response.get_json(), dict)
+
+
+def test_fixed_route_is_used_otherwise():
+    with signed_post("/") as ctx:
+        assert main._route_key(ctx.request, "shot_status") == "shot_status"
+    with signed_post("/version_created") as ctx:
+        assert main._route_key(ctx.request, None) == "version_created"
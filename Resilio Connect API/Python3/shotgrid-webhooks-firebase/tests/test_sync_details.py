@@ -0,0 +1,25 @@
+"""Sync details stay records until the result is written out."""
+import json
+
+from flask import Flask
+
+import main
+from dedupe import SQLiteDedupeStore
+from state_model import SyncDetail
+
+DETAILS = [SyncDetail('shot', 'Alex', 'TST', 'HybridWork_Alex_TST_TST_010_0010',
+                      '/Volumes/Company/TST/TST_010/TST_010_0010', 'updated', True, 'TST_010_0010'),
+           SyncDetail('assets', 'Alex', 'TST', 'HybridWork_Alex_TST_assets', '/Volumes/Company/TST/assets',
+                      'created')]
+
+
+def test_response_body_converts_records():
+    with Flask(__name__).app_context():
+        response = main._json({"sync_results": {"details": DETAILS}})
+    assert json.loads(response.get_data()) == {"sync_results": {"details": [d.as_dict() for d in DETAILS]}}
+
+
+def test_dedupe_store_converts_records(tmp_path):
+    store = SQLiteDedupeStore(str(tmp_path / "dedupe.db"))
+    store.put("shot_status:event:1", {"sync_results": {"details": DETAILS}}, ttl_s=60)
+    assert store.get("shot_status:event:1")["sync_results"]["details"][1] == DETAILS[1].as_dict()
@@ -0,0 +1,56 @@
+"""Queued items whose handler reports an error are retried and dead-lettered, not acked."""
+import pytest
+
+from work_queue import HandlerFailed, SQLiteWorkQueue, process_item
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return SQLiteWorkQueue(str(tmp_path / "queue.db"), max_attempts=3, backoff_s=0)
+
+
+def drain_until_empty(queue, handler):
+    totals = {"processed": 0, "retried": 0, "dead_lettered": 0}
+    for _ in range(10):
+        summary = queue.drain(handler)
+        for key in totals:
+            totals[key] += summary[key]
+    return totals
+
+
+def test_error_result_is_retried_then_dead_lettered(queue):
+    calls = []
+
+    def handler(route, payload):
+        calls.append(route)
+        return {"error": "Task 5 not found"}
+
+    queue.enqueue("task", {"data": {"entity_id": 5}})
+    totals = drain_until_empty(queue, handler)
+
+    assert len(calls) == 3
+    assert totals == {"processed": 0, "retried": 2, "dead_lettered": 1}
+    [dead] = queue.dead_letters()
+    assert dead["attempts"] == 3 and dead["error"] == "Task 5 not found"
+
+
+def test_write_errors_fail_until_they_succeed(queue):
+    results = iter([{"write_errors": 1}, {"writes": [], "task_id": 5}])
+    queue.enqueue("task", {"data": {"entity_id": 5}})
+    totals = drain_until_empty(queue, lambda route, payload: next(results))
+
+    assert totals == {"processed": 1, "retried": 1, "dead_lettered": 0}
+    assert queue.dead_letters() == []
+
+
+def test_process_item_raises_for_pubsub_redelivery(queue):
+    queue.enqueue("shot_status", {})
+    [item] = queue.claim()
+    with pytest.raises(HandlerFailed):
+        process_item(queue, item, lambda route, payload: {"error": "Sync processing failed: boom"})
+
+
+def test_ignored_results_are_acked(queue):
+    queue.enqueue("task", {})
+    totals = drain_until_empty(queue, lambda route, payload: {"ignored": True, "reason": "not a status change"})
+    assert totals["processed"] == 1 and totals["retried"] == 0
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Cold-start import benchmark for the Firebase functions module.
+
+Runs `python -X importtime -c "import main"` in fresh interpreters, reports
+the cumulative import time of `main` (median of --runs) and the heaviest
+modules, and exits non-zero when the median exceeds --max-ms. Also fails if
+modules that must stay lazy (shotgun_api3, yaml, resilio_state_sync) are
+imported eagerly.
+
+    python tools/bench_import_time.py --max-ms 1500
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+FUNCTIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "functions")
+
+# Modules `main` must not import at module load.
+LAZY_MODULES = ("shotgun_api3", "yaml", "resilio_state_sync")
+
+_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def import_profile(module: str):
+    """Return {module_name: (self_us, cumulative_us)} for one fresh import."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=FUNCTIONS_DIR, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        sys.exit(f"[ERROR] import {module} failed:\n{proc.stderr[-2000:]}")
+    profile = {}
+    for line in proc.stderr.splitlines():
+        m = _LINE.match(line)
+        if m:
+            profile[m.group(4)] = (int(m.group(1)), int(m.group(2)))
+    return profile
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    p.add_argument("--module", default="main")
+    p.add_argument("--runs", type=int, default=5)
+    p.add_argument("--max-ms", type=float, default=1500.0,
+                   help="Fail if the median cumulative import time exceeds this")
+    p.add_argument("--top", type=int, default=10, help="Show the N heaviest modules")
+    args = p.parse_args()
+
+    profiles = [import_profile(args.module) for _ in range(args.runs)]
+    totals_ms = [prof[args.module][1] / 1000 for prof in profiles]
+    median_ms = statistics.median(totals_ms)
+
+    last = profiles[-1]
+    print(f"import {args.module}: median {median_ms:.1f} ms over {args.runs} runs "
+          f"(min {min(totals_ms):.1f}, max {max(totals_ms):.1f})")
+    print("\nHeaviest modules (self time, last run):")
+    for name, (self_us, cum_us) in sorted(last.items(), key=lambda kv: -kv[1][0])[:args.top]:
+        print(f"  {self_us / 1000:8.1f} ms self {cum_us / 1000:9.1f} ms cumulative  {name}")
+
+    failures = []
+    eager = [m for m in LAZY_MODULES if m in last]
+    if eager:
+        failures.append(f"modules imported eagerly: {', '.join(eager)}")
+    if median_ms > args.max_ms:
+        failures.append(f"median {median_ms:.1f} ms exceeds threshold {args.max_ms:.1f} ms")
+
+    if failures:
+        print("\nFAIL: " + "; ".join(failures))
+        sys.exit(1)
+    print(f"\nOK: under {args.max_ms:.0f} ms and no eager heavy imports")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Per-request logging overhead benchmark.
+
+Simulates the log traffic of one webhook request (about 25 INFO lines plus a
+DEBUG payload dump, DEBUG disabled) and measures the time spent on the
+request thread for:
+
+- legacy : StreamHandler writing synchronously, eager f-strings and json.dumps
+- queued : logging_setup (QueueHandler → listener thread), lazy %-args and lazy_json
+- sampled: as queued, with LOG_INFO_SAMPLE_RATE 0.1
+
+Output goes to a real temporary file so the synchronous case pays actual I/O.
+
+    python tools/bench_logging.py --requests 2000
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+
+FUNCTIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "functions")
+sys.path.insert(0, FUNCTIONS_DIR)
+
+import logging_setup  # noqa: E402
+from logging_setup import configure_logging, lazy_json, request_context  # noqa: E402
+
+PAYLOAD = {
+    "data": {
+        "id": "2a6b", "event_log_entry_id": 123456, "event_type": "Shotgun_Version_Change",
+        "entity": {"type": "Version", "id": 4242},
+        "meta": {"attribute_name": "sg_status_list", "old_value": "rev", "new_value": "apv",
+                 "entity_type": "Version", "field_data_type": "status_list"},
+        "project": {"type": "Project", "id": 7}, "user": {"type": "HumanUser", "id": 12},
+    },
+    "timestamp": "2026-01-01T00:00:00Z",
+}
+LINES = 25
+
+
+def legacy_request(logger, vid, task_id):
+    logger.info(f"Received webhook request to path '/version', dispatching as 'version'")
+    logger.debug(f"Version status payload: {json.dumps(PAYLOAD)}")
+    for i in range(LINES - 1):
+        logger.info(f"Version {vid} step {i}: Task {task_id} status from 'ip' to 'apv'")
+
+
+def lazy_request(logger, vid, task_id):
+    logger.info("Received webhook request to path '%s', dispatching as '%s'", "/version", "version")
+    logger.debug("Version status payload: %s", lazy_json(PAYLOAD))
+    for i in range(LINES - 1):
+        logger.info("Version %s step %s: Task %s status from '%s' to '%s'", vid, i, task_id, "ip", "apv")
+
+
+def run(label, logger, emit, requests, sample_rate=1.0):
+    started = time.perf_counter()
+    for n in range(requests):
+        with request_context(f"req-{n}", sample_rate):
+            emit(logger, n, n + 1)
+    request_s = time.perf_counter() - started
+    print(f"  {label:8s}: {request_s / requests * 1e6:8.1f} µs/request on the request thread")
+    return request_s
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    p.add_argument("--requests", type=int, default=2000)
+    args = p.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"{args.requests} requests × {LINES} INFO lines + 1 DEBUG payload dump (DEBUG off)")
+
+        # Synchronous handler, eager formatting (the previous main.py setup)
+        with open(os.path.join(tmp, "legacy.log"), "w") as stream:
+            legacy = logging.getLogger("bench-legacy")
+            legacy.propagate = False
+            handler = logging.StreamHandler(stream)
+            handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+            legacy.addHandler(handler)
+            legacy.setLevel(logging.INFO)
+            base = run("legacy", legacy, legacy_request, args.requests)
+
+        for label, rate in (("queued", 1.0), ("sampled", 0.1)):
+            with open(os.path.join(tmp, f"{label}.log"), "w") as stream:
+                listener = configure_logging({"LOG_LEVEL": "INFO"}, (f"bench-{label}",), stream=stream)
+                elapsed = run(label, logging.getLogger(f"bench-{label}"), lazy_request, args.requests, rate)
+                drain_started = time.perf_counter()
+                listener.stop()
+                drain_s = time.perf_counter() - drain_started
+                lines = sum(1 for _ in open(stream.name))
+            print(f"{'':12s}{base / elapsed:.1f}x faster; listener drained the backlog in "
+                  f"{drain_s * 1000:.0f} ms ({lines} lines written)")
+        logging_setup._LISTENER = None
+
+
+if __name__ == "__main__":
+    main()
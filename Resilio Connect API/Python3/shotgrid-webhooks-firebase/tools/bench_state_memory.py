@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Memory benchmark for the ShotGrid state held during a full Resilio sync.
+
+Builds a synthetic studio (N shots across P projects with A artists) twice –
+once in the legacy nested-dict layout, once with the `state_model` records –
+and reports the tracemalloc peak for each, both for holding the state and
+sync details and for then writing the details out as a JSON response body
+(records are converted one at a time by `state_model.json_default`, as in
+production).
+
+    python tools/bench_state_memory.py --shots 50000 --projects 40 --artists 300
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "functions"))
+
+from state_model import Shot, ShotGridState, StateInterner, SyncDetail, json_default  # noqa: E402
+
+
+def _fixture(shots: int, projects: int, artists: int, per_shot: int, seed: int):
+    rnd = random.Random(seed)
+    project_rows = [(f"Project {p:03d}", f"P{p:03d}") for p in range(projects)]
+    artist_names = [f"Artist_{a:04d}" for a in range(artists)]
+    for sid in range(shots):
+        name, tank = project_rows[sid % projects]
+        seq = sid // 100
+        # Simulate strings arriving fresh from JSON (no implicit sharing)
+        yield (sid, f"{tank}_{seq:03d}_{sid % 10000:04d}", "".join(name), "".join(tank),
+               ["".join(a) for a in rnd.sample(artist_names, per_shot)])
+
+
+def build_legacy(rows):
+    shots, artist_projects = [], {}
+    for sid, code, project_name, tank, artists in rows:
+        for artist in artists:
+            artist_projects.setdefault(artist, set()).add(tank)
+        shots.append({
+            'id': sid,
+            'code': code,
+            'project': {'name': project_name, 'tank_name': tank},
+            'sequence': "_".join(code.split("_")[:2]),
+            'assigned_artists': list(set(artists)),
+        })
+    # details list mirrors sync_resilio_to_shotgrid_state output
+    details = [
+        {'type': 'shot', 'artist': artist, 'project': s['project']['tank_name'], 'shot': s['code'],
+         'job_name': f"HybridWork_{artist}_{s['project']['tank_name']}_{s['code']}",
+         'path': f"/Volumes/Company/{s['project']['tank_name']}/{s['sequence']}/{s['code']}",
+         'action': 'updated', 'hydrated': True}
+        for s in shots for artist in s['assigned_artists']
+    ]
+    return {'shots': shots, 'artist_projects': {a: list(p) for a, p in artist_projects.items()}}, details
+
+
+def build_compact(rows):
+    interner = StateInterner()
+    shots, artist_projects = [], {}
+    for sid, code, project_name, tank, artists in rows:
+        project = interner.project(project_name, tank)
+        artists = tuple(sorted({interner.name(a) for a in artists}))
+        for artist in artists:
+            artist_projects.setdefault(artist, set()).add(project.tank_name)
+        shots.append(Shot(sid, code, project, interner.name("_".join(code.split("_")[:2])), artists))
+    state = ShotGridState(shots, {a: tuple(sorted(p)) for a, p in artist_projects.items()})
+    details = [
+        SyncDetail('shot', a.artist, a.project.tank_name,
+                   f"HybridWork_{a.artist}_{a.project.tank_name}_{a.shot.code}",
+                   f"/Volumes/Company/{a.project.tank_name}/{a.shot.sequence}/{a.shot.code}",
+                   'updated', True, a.shot.code)
+        for a in state.assignments()
+    ]
+    return state, details
+
+
+def measure(builder, args):
+    rows = list(_fixture(args.shots, args.projects, args.artists, args.per_shot, args.seed))
+    tracemalloc.start()
+    result = builder(iter(rows))
+    current, peak = tracemalloc.get_traced_memory()
+    # The details end up in the webhook response, serialised at the boundary
+    body = json.dumps(result[1], default=json_default)
+    _, response_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result, body
+    return current, max(peak, response_peak)
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    p.add_argument("--shots", type=int, default=20000)
+    p.add_argument("--projects", type=int, default=20)
+    p.add_argument("--artists", type=int, default=200)
+    p.add_argument("--per-shot", type=int, default=3, help="Artists assigned per shot")
+    p.add_argument("--seed", type=int, default=7)
+    args = p.parse_args()
+
+    legacy_cur, legacy_peak = measure(build_legacy, args)
+    compact_cur, compact_peak = measure(build_compact, args)
+
+    mib = 1024 * 1024
+    print(f"{args.shots} shots, {args.projects} projects, {args.artists} artists, {args.per_shot}/shot")
+    print(f"{'layout':<10}{'retained MiB':>14}{'peak MiB':>12}  (peak includes writing the response)")
+    print(f"{'legacy':<10}{legacy_cur / mib:>14.1f}{legacy_peak / mib:>12.1f}")
+    print(f"{'compact':<10}{compact_cur / mib:>14.1f}{compact_peak / mib:>12.1f}")
+    print(f"retained memory reduced by {100 * (1 - compact_cur / legacy_cur):.0f}%, "
+          f"peak by {100 * (1 - compact_peak / legacy_peak):.0f}%")
+
+
+if __name__ == "__main__":
+    main()
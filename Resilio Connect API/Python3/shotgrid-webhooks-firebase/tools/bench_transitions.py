@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Event-throughput benchmark for the compiled status-transition table.
+
+Replays random (version status, task status, shot status) events through
+`TransitionTable.version_writes` and through the previous approach (walking
+the raw version_to_task / task_to_shot dicts and scanning candidate lists),
+and reports events per second for each. Also times compiling the mapping.
+
+    python tools/bench_transitions.py --events 200000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+FUNCTIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "functions")
+sys.path.insert(0, FUNCTIONS_DIR)
+
+from transitions import compile_transitions, load_mapping  # noqa: E402
+
+
+def legacy_writes(v2t, t2s, version_status, task_status, shot_status):
+    """The dict walk main.py used before the table existed."""
+    task_statuses = v2t.get(version_status, [])
+    if not task_statuses or task_status is None or task_status in task_statuses:
+        return ()
+    writes = [("Task", task_statuses[0])]
+    shot_statuses = t2s.get(task_statuses[0], [])
+    if shot_statuses and shot_status is not None and shot_status not in shot_statuses:
+        writes.append(("Shot", shot_statuses[0]))
+    return tuple(writes)
+
+
+def _keys(mapping, section):
+    return [e["key"] if isinstance(e, dict) else e for e in mapping.get(section) or []]
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    p.add_argument("--mapping", default=os.path.join(FUNCTIONS_DIR, "status_mapping.yaml"))
+    p.add_argument("--events", type=int, default=200_000)
+    p.add_argument("--seed", type=int, default=1)
+    args = p.parse_args()
+
+    mapping = load_mapping(args.mapping)
+    started = time.perf_counter()
+    table = compile_transitions(mapping)
+    compile_ms = (time.perf_counter() - started) * 1000
+
+    rng = random.Random(args.seed)
+    versions, tasks, shots = (_keys(mapping, s) for s in ("version_statuses", "task_statuses", "shot_statuses"))
+    events = [(rng.choice(versions), rng.choice(tasks), rng.choice(shots)) for _ in range(args.events)]
+    v2t, t2s = mapping.get("version_to_task") or {}, mapping.get("task_to_shot") or {}
+
+    # Same answers before timing anything
+    for v, t, s in events[:1000]:
+        assert tuple(table.version_writes(v, t, s)) == legacy_writes(v2t, t2s, v, t, s), (v, t, s)
+
+    started = time.perf_counter()
+    writes = 0
+    for v, t, s in events:
+        writes += len(legacy_writes(v2t, t2s, v, t, s))
+    legacy_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    version_writes = table.version_writes
+    for v, t, s in events:
+        version_writes(v, t, s)
+    table_s = time.perf_counter() - started
+
+    print(f"Mapping: {args.mapping} ({len(table)} transitions, compiled in {compile_ms:.1f} ms)")
+    print(f"{args.events} events, {writes} writes caused")
+    print(f"  dict walk   : {args.events / legacy_s:12,.0f} events/s")
+    print(f"  table lookup: {args.events / table_s:12,.0f} events/s  ({legacy_s / table_s:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
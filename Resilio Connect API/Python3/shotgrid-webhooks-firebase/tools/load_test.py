@@ -0,0 +1,527 @@
+#!/usr/bin/env python3
+"""
+Local load test for the webhook functions.
+
+Serves `main._dispatch` from a local threaded Flask server and drives it with
+HMAC-signed (`X-SG-Signature`) webhook payloads for every handler type.
+Nothing leaves the machine:
+
+- ShotGrid is a Mockgun instance, seeded with projects, shots, tasks and
+  versions, behind `main._SG_CLIENT` (optionally with per-call latency)
+- the Management Console is a stub HTTP server behind `main.RESILIO_URL`
+  that keeps jobs in memory (optionally with per-request latency)
+
+Requests are sent open-loop at --rate per second (0 = as fast as possible)
+by --concurrency workers. The report gives per-handler throughput, error
+rate and p50/p95/p99 latency.
+
+    python tools/load_test.py --duration 30 --rate 200 --concurrency 16
+    python tools/load_test.py --mix version=5,task=3,shot_status=1 --sg-latency-ms 40 --json report.json
+
+Needs the function's dependencies installed (functions/requirements.txt).
+"""
+import argparse
+import hashlib
+import hmac
+import itertools
+import json
+import os
+import pickle
+import random
+import re
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+FUNCTIONS_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "functions"))
+
+HANDLERS = ("task", "version", "version_created", "assignment", "shot_status")
+DEFAULT_MIX = "version=4,task=3,version_created=2,assignment=1,shot_status=1"
+SECRET = b"load-test-secret"
+
+STEPS = ("Composite", "Rotoscoping", "Prep", "Paint")
+ARTISTS = ("Matthew", "Alex")  # mapped to agents in functions/artists.yaml
+TASK_STATUSES = ("ip", "rdy", "cnv", "stcomp", "rev", "apv", "adn")
+VERSION_STATUSES = ("rev", "stcomp", "note", "apv", "cnv", "qckbk", "sndcli")
+
+
+# ─────────────────────────────── Mock ShotGrid ──────────────────────────────
+
+def _field(data_type, valid_types=()):
+    return {
+        "data_type": {"value": data_type},
+        "properties": {"default_value": {"value": None}, "valid_types": {"value": list(valid_types)}},
+    }
+
+
+SCHEMA = {
+    "EventLogEntry": {"event_type": _field("text"), "description": _field("text")},
+    "Project": {"name": _field("text"), "tank_name": _field("text")},
+    "Step": {"code": _field("text")},
+    "HumanUser": {"name": _field("text"), "login": _field("text")},
+    "Shot": {"code": _field("text"), "sg_status_list": _field("status_list"),
+             "project": _field("entity", ["Project"]), "tasks": _field("multi_entity", ["Task"])},
+    "Task": {"content": _field("text"), "sg_status_list": _field("status_list"),
+             "step": _field("entity", ["Step"]), "entity": _field("entity", ["Shot"]),
+             "project": _field("entity", ["Project"]), "task_assignees": _field("multi_entity", ["HumanUser"])},
+    "Version": {"code": _field("text"), "sg_status_list": _field("status_list"),
+                "sg_task": _field("entity", ["Task"]), "entity": _field("entity", ["Shot"]),
+                "project": _field("entity", ["Project"])},
+}
+for _fields in SCHEMA.values():
+    _fields["id"] = _field("number")
+
+
+def make_mockgun(schema_dir):
+    from shotgun_api3.lib import mockgun
+
+    schema_path = os.path.join(schema_dir, "schema.pickle")
+    entity_path = os.path.join(schema_dir, "schema_entity.pickle")
+    with open(schema_path, "wb") as f:
+        pickle.dump(SCHEMA, f)
+    with open(entity_path, "wb") as f:
+        pickle.dump({name: {"name": {"value": name}} for name in SCHEMA}, f)
+    mockgun.Shotgun.set_schema_paths(schema_path, entity_path)
+    return mockgun.Shotgun("https://mockgun.local", script_name="load-test", api_key="x")
+
+
+def _link(entity, **display):
+    """Link dict as real ShotGrid returns it. Mockgun keeps only type/id, so names are added by hand."""
+    return dict({"type": entity["type"], "id": entity["id"]}, **display)
+
+
+def seed(sg, projects, shots_per_project, rng):
+    """Create the entity graph the handlers walk; returns ids by type."""
+    ids = defaultdict(list)
+    users = [sg.create("HumanUser", {"name": name, "login": name.lower()}) for name in ARTISTS]
+    steps = {code: sg.create("Step", {"code": code}) for code in STEPS}
+    for p in range(projects):
+        project = sg.create("Project", {"name": f"Project {p}", "tank_name": f"PRJ{p}"})
+        project_link = _link(project, name=project["name"], tank_name=project["tank_name"])
+        for s in range(shots_per_project):
+            shot = sg.create("Shot", {"code": f"PRJ{p}_{s // 10:03d}_{s:04d}", "sg_status_list": "active",
+                                      "project": project_link})
+            ids["Shot"].append(shot["id"])
+            for step_code, step in steps.items():
+                task = sg.create("Task", {"content": step_code, "sg_status_list": rng.choice(TASK_STATUSES),
+                                          "step": step, "entity": shot, "project": project,
+                                          "task_assignees": [rng.choice(users)]})
+                ids["Task"].append(task["id"])
+                version = sg.create("Version", {"code": f"{shot['code']}_{step_code}_v001",
+                                                "sg_status_list": "rev", "sg_task": task,
+                                                "entity": shot, "project": project})
+                ids["Version"].append(version["id"])
+
+    # Mockgun stores links as bare {type, id}; add the display fields real links carry.
+    db = sg._db
+    for row in db["Shot"].values():
+        row["project"] = _link(row["project"], **{k: db["Project"][row["project"]["id"]][k]
+                                                  for k in ("name", "tank_name")})
+    for row in db["Task"].values():
+        row["step"] = _link(row["step"], name=db["Step"][row["step"]["id"]]["code"])
+        row["task_assignees"] = [_link(u, name=db["HumanUser"][u["id"]]["name"]) for u in row["task_assignees"]]
+        row["project"] = _link(row["project"], name=db["Project"][row["project"]["id"]]["name"])
+    return ids
+
+
+class LatencyClient:
+    """Serializes access to Mockgun (not thread-safe) and adds per-call latency outside the lock."""
+
+    def __init__(self, sg, latency_s=0.0):
+        self._sg = sg
+        self._latency_s = latency_s
+        self._lock = threading.Lock()
+        self.calls = defaultdict(int)
+
+    def __getattr__(self, name):
+        target = getattr(self._sg, name)
+        if not callable(target):
+            return target
+
+        def call(*args, **kwargs):
+            if self._latency_s:
+                time.sleep(self._latency_s)
+            with self._lock:
+                self.calls[name] += 1
+                return target(*args, **kwargs)
+        return call
+
+
+# ─────────────────────────────── Stub Management Console ────────────────────
+
+class StubConsole(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, latency_s=0.0):
+        super().__init__(("127.0.0.1", 0), _ConsoleHandler)
+        self.latency_s = latency_s
+        self.lock = threading.Lock()
+        self.ids = itertools.count(1)
+        self.jobs = {}
+        self.agents = [{"id": i, "name": f"Linux_{i:02d}"} for i in range(1, 11)]
+        self.requests = 0
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class _ConsoleHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True  # headers and body go out in separate writes
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, body, status=200):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}") if length else {}
+
+    def _route(self):
+        server = self.server
+        with server.lock:
+            server.requests += 1
+        if server.latency_s:
+            time.sleep(server.latency_s)
+        return self.path.split("?", 1)[0].rstrip("/").split("/")[3:]  # drop "", "api", "v2"
+
+    def do_GET(self):
+        parts = self._route()
+        server = self.server
+        with server.lock:
+            if parts == ["jobs"]:
+                return self._reply(list(server.jobs.values()))
+            if len(parts) == 2 and parts[0] == "jobs":
+                job = server.jobs.get(int(parts[1]))
+                return self._reply(job) if job else self._reply({"message": "Not found"}, 404)
+            if parts == ["agents"]:
+                return self._reply(server.agents)
+            if parts == ["info"]:
+                return self._reply({"version": "stub"})
+        return self._reply([])
+
+    def do_POST(self):
+        parts = self._route()
+        body = self._body()
+        server = self.server
+        with server.lock:
+            new_id = next(server.ids)
+            if parts == ["jobs"]:
+                server.jobs[new_id] = dict(body, id=new_id)
+        return self._reply({"id": new_id})
+
+    def do_PUT(self):
+        parts = self._route()
+        body = self._body()
+        server = self.server
+        with server.lock:
+            if len(parts) == 2 and parts[0] == "jobs" and int(parts[1]) in server.jobs:
+                server.jobs[int(parts[1])].update(body)
+        return self._reply({})
+
+    def do_DELETE(self):
+        parts = self._route()
+        server = self.server
+        with server.lock:
+            if len(parts) == 2 and parts[0] == "jobs":
+                server.jobs.pop(int(parts[1]), None)
+        return self._reply({})
+
+
+# ─────────────────────────────── Payloads ───────────────────────────────────
+
+class PayloadFactory:
+    def __init__(self, ids, rng, duplicate_rate=0.0):
+        self.ids = ids
+        self.rng = rng
+        self.duplicate_rate = duplicate_rate
+        self.events = itertools.count(1_000_000)
+        self.recent = {}
+        self.lock = threading.Lock()
+
+    def _event(self, entity_type, eid, attribute, old, new):
+        return {
+            "data": {
+                "id": f"lt-{next(self.events)}",
+                "event_log_entry_id": next(self.events),
+                "event_type": f"Shotgun_{entity_type}_Change",
+                "entity": {"type": entity_type, "id": eid},
+                "meta": {"entity_type": entity_type, "entity_id": eid, "attribute_name": attribute,
+                         "old_value": old, "new_value": new},
+            },
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        }
+
+    def make(self, handler):
+        with self.lock:
+            if handler in self.recent and self.rng.random() < self.duplicate_rate:
+                return self.recent[handler]  # redelivery: same event ids
+            rng = self.rng
+            if handler == "task":
+                payload = self._event("Task", rng.choice(self.ids["Task"]), "sg_status_list",
+                                      rng.choice(TASK_STATUSES), rng.choice(TASK_STATUSES))
+            elif handler == "version":
+                payload = self._event("Version", rng.choice(self.ids["Version"]), "sg_status_list",
+                                      "rev", rng.choice(VERSION_STATUSES))
+            elif handler == "version_created":
+                payload = self._event("Version", rng.choice(self.ids["Version"]), "code", None, "v001")
+            elif handler == "assignment":
+                payload = self._event("Task", rng.choice(self.ids["Task"]), "task_assignees", [], [])
+            else:
+                payload = self._event("Shot", rng.choice(self.ids["Shot"]), "sg_status_list",
+                                      "awa", "active")
+            self.recent[handler] = payload
+            return payload
+
+    def make_batch(self, handler, size):
+        return {"data": {"deliveries": [self.make(handler)["data"] for _ in range(size)]},
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())}
+
+
+def sign(body: bytes) -> str:
+    return "sha1=" + hmac.new(SECRET, body, hashlib.sha1).hexdigest()
+
+
+# ─────────────────────────────── Driver ─────────────────────────────────────
+
+def start_app(main_module):
+    from flask import Flask, request
+    from werkzeug.serving import make_server
+
+    app = Flask("load-test")
+
+    # Like a deployed function: a fixed route per URL, plus <function url>/timings
+    @app.route("/<route>", methods=["POST"])
+    @app.route("/<route>/timings", methods=["POST"])
+    def webhook(route):
+        return main_module._dispatch(request, route)
+
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, name="webhook-app", daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in HANDLERS:
+            raise SystemExit(f"Unknown handler '{name}' in --mix (choose from {', '.join(HANDLERS)})")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * pct / 100
+    lo, hi = int(k), min(int(k) + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+def drive(base_url, factory, mix, duration_s, rate, concurrency, batch_size):
+    import requests
+
+    names, weights = zip(*mix.items())
+    local = threading.local()
+    results = defaultdict(list)  # handler -> [(latency_ms, ok)]
+    errors = defaultdict(lambda: defaultdict(int))
+    results_lock = threading.Lock()
+
+    def send(handler, scheduled):
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+        payload = factory.make_batch(handler, batch_size) if batch_size > 1 else factory.make(handler)
+        body = json.dumps(payload).encode()
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        started = time.perf_counter()
+        try:
+            response = session.post(f"{base_url}/{handler}", data=body, timeout=120, headers={
+                "Content-Type": "application/json", "X-SG-Signature": sign(body)})
+            ok = response.status_code < 400
+            if ok:
+                result = response.json()
+                items = result.get("results", [result]) if isinstance(result, dict) else []
+                failed = [r for r in items if isinstance(r, dict) and "error" in r]
+                if failed:
+                    ok = False
+                    reason = "handler error: " + re.sub(r"\d+", "N", str(failed[0]["error"]))[:60]
+            else:
+                reason = f"HTTP {response.status_code}"
+        except Exception as e:
+            ok, reason = False, type(e).__name__
+        latency_ms = (time.perf_counter() - started) * 1000
+        with results_lock:
+            results[handler].append((latency_ms, ok))
+            if not ok:
+                errors[handler][reason] += 1
+
+    rng = random.Random(7)
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        pending = []
+        n = 0
+        while True:
+            scheduled = started + (n / rate if rate else 0)
+            if scheduled - started >= duration_s or (not rate and time.perf_counter() - started >= duration_s):
+                break
+            handler = rng.choices(names, weights)[0]
+            pending.append(pool.submit(send, handler, scheduled))
+            n += 1
+            if not rate:
+                # closed loop: keep at most 2x concurrency requests queued
+                while len([f for f in pending[-concurrency * 2:] if not f.done()]) >= concurrency * 2:
+                    time.sleep(0.001)
+            elif scheduled - time.perf_counter() > 0.05:
+                time.sleep(min(scheduled - time.perf_counter() - 0.05, 0.05))
+        for future in pending:
+            future.result()
+    elapsed = time.perf_counter() - started
+    return results, errors, elapsed
+
+
+def report(results, errors, elapsed, batch_size):
+    rows = []
+    for handler in HANDLERS:
+        samples = results.get(handler)
+        if not samples:
+            continue
+        latencies = sorted(ms for ms, _ in samples)
+        failed = sum(1 for _, ok in samples if not ok)
+        rows.append({
+            "handler": handler,
+            "requests": len(samples),
+            "events": len(samples) * batch_size,
+            "throughput_rps": len(samples) / elapsed,
+            "error_rate": failed / len(samples),
+            "errors": dict(errors.get(handler, {})),
+            "p50_ms": percentile(latencies, 50),
+            "p95_ms": percentile(latencies, 95),
+            "p99_ms": percentile(latencies, 99),
+            "mean_ms": statistics.fmean(latencies),
+        })
+    all_samples = sorted(ms for samples in results.values() for ms, _ in samples)
+    total = sum(len(s) for s in results.values())
+    failed = sum(1 for s in results.values() for _, ok in s if not ok)
+    overall = {
+        "handler": "ALL", "requests": total, "events": total * batch_size,
+        "throughput_rps": total / elapsed if elapsed else 0.0,
+        "error_rate": failed / total if total else 0.0,
+        "p50_ms": percentile(all_samples, 50), "p95_ms": percentile(all_samples, 95),
+        "p99_ms": percentile(all_samples, 99),
+        "mean_ms": statistics.fmean(all_samples) if all_samples else 0.0,
+    }
+
+    print(f"\n{'handler':16s} {'requests':>9s} {'req/s':>8s} {'errors':>7s} "
+          f"{'p50 ms':>8s} {'p95 ms':>8s} {'p99 ms':>8s}")
+    for row in rows + [overall]:
+        print(f"{row['handler']:16s} {row['requests']:9d} {row['throughput_rps']:8.1f} "
+              f"{row['error_rate'] * 100:6.1f}% {row['p50_ms']:8.1f} {row['p95_ms']:8.1f} {row['p99_ms']:8.1f}")
+    for row in rows:
+        for reason, count in row["errors"].items():
+            print(f"  {row['handler']}: {count} × {reason}")
+    return {"elapsed_s": elapsed, "batch_size": batch_size, "handlers": rows, "overall": overall}
+
+
+def print_spans(base_url, top=15):
+    """Fetch the function's aggregated timing spans (signed POST to `<function url>/timings`)."""
+    import requests
+
+    response = requests.post(f"{base_url}/{HANDLERS[0]}/timings", data=b"", headers={"X-SG-Signature": sign(b"")}, timeout=30)
+    if response.status_code != 200:
+        print(f"\nNo span aggregate (HTTP {response.status_code})")
+        return {}
+    spans = response.json()
+    print(f"\n{'span':40s} {'count':>7s} {'total ms':>10s} {'mean ms':>8s} {'p95 ms':>8s}")
+    for name, stats in sorted(spans.items(), key=lambda kv: -kv[1]["total_ms"])[:top]:
+        print(f"{name:40s} {stats['count']:7d} {stats['total_ms']:10.1f} {stats['mean_ms']:8.2f} {stats['p95_ms']:8.2f}")
+    return spans
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    p.add_argument("--duration", type=float, default=15.0, help="Seconds to send requests for")
+    p.add_argument("--rate", type=float, default=100.0, help="Requests per second (0 = closed loop, max speed)")
+    p.add_argument("--concurrency", type=int, default=8, help="Concurrent client workers")
+    p.add_argument("--mix", default=DEFAULT_MIX, help=f"Handler weights (default {DEFAULT_MIX})")
+    p.add_argument("--batch-size", type=int, default=1, help="Events per request (>1 sends batched deliveries)")
+    p.add_argument("--duplicate-rate", type=float, default=0.0, help="Fraction of redelivered events")
+    p.add_argument("--projects", type=int, default=3)
+    p.add_argument("--shots", type=int, default=20, help="Shots per project")
+    p.add_argument("--sg-latency-ms", type=float, default=0.0, help="Added latency per ShotGrid call")
+    p.add_argument("--mc-latency-ms", type=float, default=0.0, help="Added latency per Management Console request")
+    p.add_argument("--coalesce-window", type=float, default=None, help="Override SYNC_COALESCE_WINDOW_S")
+    p.add_argument("--log-level", default="WARNING", help="Log level for the functions while testing")
+    p.add_argument("--json", help="Also write the report to this file")
+    p.add_argument("--seed", type=int, default=1)
+    args = p.parse_args()
+
+    os.chdir(FUNCTIONS_DIR)  # resilio_state_sync reads artists.yaml from the working directory
+    sys.path.insert(0, FUNCTIONS_DIR)
+    import logging
+    import main as functions
+
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    logging.getLogger("shotgrid-webhooks").setLevel(args.log_level.upper())
+    logging.getLogger("resilio-state-sync").setLevel(args.log_level.upper())
+
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as schema_dir:
+        mock = make_mockgun(schema_dir)
+    ids = seed(mock, args.projects, args.shots, rng)
+    client = LatencyClient(mock, args.sg_latency_ms / 1000)
+    functions._SG_CLIENT.set(client)
+
+    console = StubConsole(args.mc_latency_ms / 1000)
+    threading.Thread(target=console.serve_forever, name="stub-console", daemon=True).start()
+    functions.RESILIO_URL = console.url
+    functions.RESILIO_TOKEN = "load-test"
+    functions.SECRET_TOKEN = SECRET
+    if args.coalesce_window is not None:
+        functions.SYNC_COALESCE_WINDOW_S = args.coalesce_window
+
+    app_server, base_url = start_app(functions)
+    mix = parse_mix(args.mix)
+    print(f"Seeded {len(ids['Shot'])} shots, {len(ids['Task'])} tasks, {len(ids['Version'])} versions; "
+          f"app {base_url}, console {console.url}")
+    print(f"Driving {', '.join(f'{k}={v:g}' for k, v in mix.items())} for {args.duration:g}s at "
+          f"{'max' if not args.rate else f'{args.rate:g}/s'} with {args.concurrency} workers"
+          + (f", {args.batch_size} events per request" if args.batch_size > 1 else "")
+          + f"; sync coalesce window {functions.SYNC_COALESCE_WINDOW_S:g}s")
+
+    results, errors, elapsed = drive(base_url, PayloadFactory(ids, rng, args.duplicate_rate), mix,
+                                     args.duration, args.rate, args.concurrency, args.batch_size)
+    summary = report(results, errors, elapsed, args.batch_size)
+    summary["shotgrid_calls"] = dict(client.calls)
+    summary["console_requests"] = console.requests
+    print(f"\nShotGrid calls: {dict(client.calls)}; Management Console requests: {console.requests}")
+    summary["spans"] = print_spans(base_url)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf8") as f:
+            json.dump(summary, f, indent=2)
+        print(f"Report written to {args.json}")
+
+    app_server.shutdown()
+    console.shutdown()
+
+
+if __name__ == "__main__":
+    main()
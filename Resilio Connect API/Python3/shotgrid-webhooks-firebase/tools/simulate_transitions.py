@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Offline replay of a status-change log through the compiled status_mapping.yaml.
+
+Reads one event per line (JSONL, file or stdin) and prints the ShotGrid
+writes each event would cause, tracking statuses in memory so later events
+see earlier writes. Nothing talks to ShotGrid.
+
+Event lines are either ShotGrid webhook payloads (`{"data": {"entity": ...,
+"meta": {"new_value": ...}}}`) or the short form
+
+    {"entity_type": "Version", "id": 3, "new_status": "apv", "task": 5, "shot": 9}
+
+Links (Version → Task, Task → Shot) and starting statuses come from the
+event lines or from --state:
+
+    {"Version": {"3": {"status": "rev", "task": 5}},
+     "Task":    {"5": {"status": "ip", "shot": 9}},
+     "Shot":    {"9": {"status": "active"}}}
+
+    python tools/simulate_transitions.py events.jsonl --state state.json
+    python tools/simulate_transitions.py --check --mapping my_mapping.yaml
+"""
+import argparse
+import json
+import os
+import sys
+from collections import Counter
+
+FUNCTIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "functions")
+sys.path.insert(0, FUNCTIONS_DIR)
+
+from transitions import compile_transitions, load_mapping, validate_mapping  # noqa: E402
+
+
+def normalize(event):
+    """(entity_type, id, new_status, links) from either event format."""
+    if "data" in event:
+        data = event["data"]
+        entity = data.get("entity") or {}
+        meta = data.get("meta") or {}
+        entity_type = entity.get("type") or meta.get("entity_type")
+        eid = data.get("entity_id") or entity.get("id") or meta.get("entity_id")
+        return entity_type, eid, meta.get("new_value"), {}
+    links = {k: event[k] for k in ("task", "shot") if event.get(k)}
+    return event["entity_type"], event["id"], event["new_status"], links
+
+
+class Simulator:
+    def __init__(self, table, state=None):
+        self.table = table
+        self.entities = {
+            (entity_type, int(eid)): dict(record)
+            for entity_type, records in (state or {}).items()
+            for eid, record in records.items()
+        }
+        self.writes = Counter()
+
+    def _entity(self, entity_type, eid):
+        return self.entities.setdefault((entity_type, int(eid)), {})
+
+    def apply(self, entity_type, eid, new_status, links):
+        entity = self._entity(entity_type, eid)
+        entity.update(links)
+        entity["status"] = new_status
+
+        task_id = entity.get("task") if entity_type == "Version" else eid if entity_type == "Task" else None
+        task = self._entity("Task", task_id) if task_id else {}
+        shot_id = task.get("shot") or entity.get("shot")
+        shot = self._entity("Shot", shot_id) if shot_id else {}
+
+        if entity_type == "Version":
+            writes = self.table.version_writes(new_status, task.get("status"), shot.get("status"))
+        elif entity_type == "Task":
+            writes = self.table.task_writes(new_status, shot.get("status"))
+        else:
+            writes = ()
+
+        applied = []
+        for write in writes:
+            target_id = task_id if write.entity_type == "Task" else shot_id
+            self._entity(write.entity_type, target_id)["status"] = write.status
+            self.writes[write.entity_type] += 1
+            applied.append({"entity_type": write.entity_type, "id": target_id, "status": write.status})
+        return applied
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    p.add_argument("log", nargs="?", help="JSONL status-change log (default: stdin)")
+    p.add_argument("--mapping", default=os.path.join(FUNCTIONS_DIR, "status_mapping.yaml"))
+    p.add_argument("--state", help="JSON file with starting statuses and links")
+    p.add_argument("--check", action="store_true", help="Only validate the mapping")
+    p.add_argument("--quiet", action="store_true", help="Print the summary only")
+    args = p.parse_args()
+
+    mapping = load_mapping(args.mapping)
+    problems = validate_mapping(mapping)
+    if problems:
+        print("Invalid status mapping:")
+        for problem in problems:
+            print(f"  - {problem}")
+        sys.exit(1)
+    table = compile_transitions(mapping)
+    if args.check:
+        print(f"OK: {args.mapping} compiles to {len(table)} transitions")
+        return
+
+    state = None
+    if args.state:
+        with open(args.state, "rt", encoding="utf8") as f:
+            state = json.load(f)
+    sim = Simulator(table, state)
+
+    events = 0
+    with (open(args.log, "rt", encoding="utf8") if args.log else sys.stdin) as f:
+        for lineno, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entity_type, eid, new_status, links = normalize(json.loads(line))
+            except (ValueError, KeyError) as e:
+                print(f"[WARN] line {lineno}: skipped ({e})", file=sys.stderr)
+                continue
+            if eid is None or new_status is None:
+                print(f"[WARN] line {lineno}: no entity id or new status", file=sys.stderr)
+                continue
+            events += 1
+            applied = sim.apply(entity_type, eid, new_status, links)
+            if not args.quiet:
+                caused = ", ".join(f"{w['entity_type']} {w['id']} → {w['status']}" for w in applied) or "no writes"
+                print(f"{lineno:6d}  {entity_type} {eid} → {new_status}: {caused}")
+
+    total = sum(sim.writes.values())
+    detail = ", ".join(f"{n} {t}" for t, n in sorted(sim.writes.items()))
+    print(f"\n{events} events replayed, {total} writes" + (f" ({detail})" if detail else ""))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+A local stand-in for an agent's own API (the one on port 3840), for
+trying LocalAgentClient and the local-first status path without a
+workstation agent.
+
+It answers /api/v2/client with its peer id and /api/v2/folders with its
+folders. Given a StubConsole and an agent id, the folders are the runs of
+that agent on the stub console, so both sides report the same status. The
+folder fields are the ones LocalAgentClient assumes, not a recording of a
+real agent's response:
+
+    with StubConsole() as console, StubAgent(console=console, agent_id=2) as agent:
+        api = ConnectApiExample(console.url, "token", local_agent=LocalAgentClient(port=agent.port))
+
+    python3 stub_agent.py --port 3840 --peer-id PEER0002
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubAgent(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, port=0, peer_id="PEER0001", folders=None, console=None, agent_id=None, latency=0.0):
+        """
+        :param folders: static list of folder dicts, used without a console
+        :param console: StubConsole to mirror the runs of `agent_id` from
+        """
+        super().__init__(("127.0.0.1", port), _AgentHandler)
+        self.console = console
+        self.agent_id = agent_id
+        self.peer_id = console.agents[agent_id]["deviceid"] if console is not None else peer_id
+        self.static_folders = list(folders or [])
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.requests = 0
+        self._thread = None
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
+
+    def folders(self):
+        if self.console is None:
+            return self.static_folders
+        now = time.monotonic()
+        folders = []
+        with self.console.lock:
+            for run in self.console.runs.values():
+                if self.agent_id not in run["agents"]:
+                    continue
+                job = self.console.jobs.get(run["job_id"], {})
+                paths = [g.get("path", {}).get("linux") for g in job.get("groups", [])]
+                folders.append(dict(self.console.run_agent(run, self.agent_id, now),
+                                    id="folder-{}".format(run["id"]), name=job.get("name"),
+                                    path=next((p for p in paths if p), None),
+                                    job_id=run["job_id"], job_run_id=run["id"]))
+        return folders
+
+
+class _AgentHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True  # headers and body go out in separate writes
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, body, status=200):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests += 1
+        if server.latency:
+            time.sleep(server.latency)
+        path = self.path.split("?", 1)[0].rstrip("/")
+        if path == "/api/v2/client":
+            return self._reply({"data": {"peerid": server.peer_id}})
+        if path == "/api/v2/folders":
+            return self._reply({"data": server.folders()})
+        return self._reply({"message": "Not found"}, 404)
+
+
+def main():
+    import argparse
+
+    p = argparse.ArgumentParser(description="Serve a stub agent API on 127.0.0.1")
+    p.add_argument("--port", type=int, default=3840)
+    p.add_argument("--peer-id", default="PEER0001")
+    p.add_argument("--folders", help="JSON file with a list of folder dicts")
+    args = p.parse_args()
+
+    folders = None
+    if args.folders:
+        with open(args.folders) as f:
+            folders = json.load(f)
+    agent = StubAgent(args.port, args.peer_id, folders)
+    print("Stub agent {} on 127.0.0.1:{}".format(args.peer_id, agent.port), flush=True)
+    try:
+        agent.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+"""
+A local stand-in for the Management Console API, for trying the scripts
+in this folder without a real console.
+
+It keeps agents, groups, jobs and runs in memory. A run moves from
+"queued" to "working" to "finished" on its own: every agent of the job's
+non-source groups transfers `size` bytes at `rate` bytes/s (slightly
+different per agent), and the run reports size_total / size_completed
+for itself and per agent. Every request can be slowed down by `latency`.
+
+    python3 stub_console.py --port 8443 --latency 0.02
+    python3 distribution.py --address http://127.0.0.1:8443 --token x --src 1 --dst 2 3 4 --path /tmp/test
+
+Or in-process:
+
+    with StubConsole() as console:
+        api = ConnectApiExample(console.url, "token")
+"""
+import itertools
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+class StubConsole(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, port=0, latency=0.0, agents=40, groups=8, size=50 * 2 ** 20, rate=20 * 2 ** 20, seed=1):
+        """
+        :param latency: seconds added to every request
+        :param agents: agents 1..agents; group N holds agents N, N + groups, N + 2 * groups, ...
+        :param size: bytes each destination agent receives per run
+        :param rate: bytes/s each agent receives at (+/- 50% per agent)
+        """
+        super().__init__(("127.0.0.1", port), _ConsoleHandler)
+        self.latency = latency
+        self.size = size
+        self.rate = rate
+        self.lock = threading.Lock()
+        self.ids = itertools.count(1000)
+        self.requests = 0
+        self._rng = random.Random(seed)
+        self.agents = {i: {"id": i, "name": "agent-{}".format(i), "deviceid": "PEER{:04d}".format(i), "online": True}
+                       for i in range(1, agents + 1)}
+        self.groups = {g: {"id": g, "name": "Group {}".format(g), "description": "",
+                           "agents": [{"id": a} for a in range(g, agents + 1, groups)]}
+                       for g in range(1, groups + 1)}
+        self.jobs = {}
+        self.runs = {}
+        self.agent_rates = {a: rate * self._rng.uniform(0.5, 1.5) for a in self.agents}
+        self._thread = None
+
+    @property
+    def url(self):
+        return "http://127.0.0.1:{}".format(self.server_address[1])
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
+
+    # Simulated runs
+
+    def start_run(self, job_id):
+        job = self.jobs[job_id]
+        destinations = []
+        for group in job["groups"]:
+            if group.get("permission") in ("rw", "srw"):
+                continue
+            destinations.extend(a["id"] for a in self.groups.get(group["id"], {}).get("agents", []))
+        run_id = next(self.ids)
+        self.runs[run_id] = {"id": run_id, "job_id": job_id, "name": job["name"], "started": time.monotonic(),
+                             "agents": sorted(set(destinations))}
+        return run_id
+
+    def run_agent(self, run, agent_id, now):
+        elapsed = now - run["started"] - 0.2  # queued for a moment first
+        completed = int(min(self.size, max(0.0, elapsed) * self.agent_rates[agent_id]))
+        status = "queued" if elapsed < 0 else ("finished" if completed >= self.size else "working")
+        return {"agent_id": agent_id, "name": self.agents[agent_id]["name"], "status": status,
+                "size_total": self.size, "size_completed": completed,
+                "files_total": 100, "files_completed": completed * 100 // self.size}
+
+    def run_view(self, run, now):
+        agents = [self.run_agent(run, a, now) for a in run["agents"]]
+        statuses = {a["status"] for a in agents}
+        status = "finished" if statuses <= {"finished"} else ("queued" if statuses == {"queued"} else "working")
+        return {"id": run["id"], "job_id": run["job_id"], "name": run["name"], "status": status,
+                "size_total": sum(a["size_total"] for a in agents),
+                "size_completed": sum(a["size_completed"] for a in agents),
+                "files_total": sum(a["files_total"] for a in agents),
+                "files_completed": sum(a["files_completed"] for a in agents)}
+
+
+class _ConsoleHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True  # headers and body go out in separate writes
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, body, status=200):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _not_found(self):
+        self._reply({"message": "Not found"}, 404)
+
+    def _body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length)) if length else {}
+
+    def _route(self):
+        server = self.server
+        with server.lock:
+            server.requests += 1
+        if server.latency:
+            time.sleep(server.latency)
+        url = urlparse(self.path)
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        return url.path.rstrip("/").split("/")[3:], query  # drop "", "api", "v2"
+
+    def do_GET(self):
+        parts, query = self._route()
+        server = self.server
+        now = time.monotonic()
+        with server.lock:
+            if parts == ["info"]:
+                return self._reply({"version": "stub"})
+            if parts == ["agents"]:
+                return self._reply(list(server.agents.values()))
+            if parts == ["groups"]:
+                return self._reply(list(server.groups.values()))
+            if parts == ["jobs"]:
+                return self._reply(list(server.jobs.values()))
+            if parts == ["runs"]:
+                return self._reply({"data": [server.run_view(r, now) for r in server.runs.values()]})
+            if len(parts) == 2 and parts[1].isdigit():
+                collection = {"agents": server.agents, "groups": server.groups, "jobs": server.jobs}.get(parts[0])
+                if parts[0] == "runs" and int(parts[1]) in server.runs:
+                    return self._reply(server.run_view(server.runs[int(parts[1])], now))
+                if collection is not None and int(parts[1]) in collection:
+                    return self._reply(collection[int(parts[1])])
+                return self._not_found()
+            if len(parts) >= 3 and parts[0] == "runs" and parts[2] == "agents" and int(parts[1]) in server.runs:
+                run = server.runs[int(parts[1])]
+                if len(parts) == 4:
+                    if int(parts[3]) not in run["agents"]:
+                        return self._not_found()
+                    return self._reply(server.run_agent(run, int(parts[3]), now))
+                agents = [server.run_agent(run, a, now) for a in run["agents"]]
+                if "status" in query:
+                    agents = [a for a in agents if a["status"] == query["status"]]
+                offset, limit = int(query.get("offset", 0)), int(query.get("limit", len(agents) or 1))
+                return self._reply({"data": agents[offset:offset + limit]})
+        return self._not_found()
+
+    def do_POST(self):
+        parts, _ = self._route()
+        body = self._body()
+        server = self.server
+        with server.lock:
+            if parts == ["groups"]:
+                group_id = next(server.ids)
+                server.groups[group_id] = dict(body, id=group_id)
+                return self._reply({"id": group_id})
+            if parts == ["jobs"]:
+                if any(job["name"] == body.get("name") for job in server.jobs.values()):
+                    return self._reply({"message": "Job with this name already exists"}, 409)
+                job_id = next(server.ids)
+                server.jobs[job_id] = dict(body, id=job_id)
+                return self._reply({"id": job_id})
+            if parts == ["runs"]:
+                if body.get("job_id") not in server.jobs:
+                    return self._not_found()
+                return self._reply({"id": server.start_run(body["job_id"])})
+        return self._not_found()
+
+    def do_PUT(self):
+        parts, _ = self._route()
+        body = self._body()
+        server = self.server
+        with server.lock:
+            if len(parts) == 2 and parts[0] in ("groups", "jobs", "agents") and parts[1].isdigit():
+                collection = getattr(server, parts[0])
+                if int(parts[1]) not in collection:
+                    return self._not_found()
+                collection[int(parts[1])].update(body)
+                return self._reply({})
+        return self._not_found()
+
+    def do_DELETE(self):
+        parts, _ = self._route()
+        server = self.server
+        with server.lock:
+            if len(parts) == 2 and parts[0] in ("groups", "jobs", "agents") and parts[1].isdigit():
+                if getattr(server, parts[0]).pop(int(parts[1]), None) is None:
+                    return self._not_found()
+                return self._reply({})
+        return self._not_found()
+
+
+def main():
+    import argparse
+
+    p = argparse.ArgumentParser(description="Serve a stub Management Console API on 127.0.0.1")
+    p.add_argument("--port", type=int, default=8443)
+    p.add_argument("--latency", type=float, default=0.0, help="Seconds added to every request")
+    p.add_argument("--agents", type=int, default=40)
+    p.add_argument("--groups", type=int, default=8)
+    p.add_argument("--size-mb", type=float, default=50, help="MB each destination agent receives per run")
+    p.add_argument("--rate-mb", type=float, default=20, help="MB/s each agent receives at (+/- 50%%)")
+    args = p.parse_args()
+
+    console = StubConsole(args.port, args.latency, args.agents, args.groups,
+                          int(args.size_mb * 2 ** 20), args.rate_mb * 2 ** 20)
+    print("Stub console on {} ({} agents, {} groups)".format(console.url, args.agents, args.groups), flush=True)
+    try:
+        console.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
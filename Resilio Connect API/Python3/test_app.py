@@ -13,6 +13,10 @@ UX:
 Or non-interactive:
   $ python app.py --show TST --shot TST_010_0010 --artist Matthew
 
+Or many at once from a CSV (show,shot,artist columns) or YAML (list of
+{show, shot, artist}) manifest:
+  $ python app.py --manifest shots.csv --workers 8 --yes
+
 Configuration:
   - Environment:
       RESILIO_URL   = https://your-console.example.com   (no trailing slash)
@@ -22,11 +26,14 @@ Configuration:
 import os
 import sys
 import re
+import csv
 import json
 import argparse
-from typing import Dict, Any, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional
 
 import yaml
+from agent_groups import TEMP_GROUP_PREFIX, AgentGroupPool
 from api import ApiBaseCommands
 from errors import ApiError
 
@@ -53,6 +60,8 @@ def parse_args() -> argparse.Namespace:
     p.add_argument("--show", help="Show code (e.g., TST)")
     p.add_argument("--shot", help="Shot name (e.g., TST_010_0010)")
     p.add_argument("--artist", help="Artist name (must exist in YAML)")
+    p.add_argument("--manifest", help="CSV or YAML file of show/shot/artist rows to set up in one go")
+    p.add_argument("--workers", type=int, default=8, help="Jobs created/started in parallel with --manifest (default: 8)")
     p.add_argument("--dry-run", action="store_true", help="Print payload and exit without calling API")
     p.add_argument("--yes", "-y", action="store_true", help="Skip interactive confirmation")
     return p.parse_args()
@@ -124,6 +133,38 @@ def job_name(shot: str, artist: str, location_key: str) -> str:
     return f"SYNC:{shot}:{artist}:{location_key}"
 
 
+def load_manifest(path: str) -> List[Dict[str, str]]:
+    """
+    Rows of a manifest: a CSV with show,shot,artist columns, or YAML with
+    a list of {show, shot, artist} mappings (optionally under 'rows').
+    """
+    if not os.path.exists(path):
+        sys.exit(f"[ERROR] Manifest not found: {path}")
+    if path.lower().endswith((".yaml", ".yml")):
+        data = load_yaml(path)
+        rows = data.get("rows", []) if isinstance(data, dict) else data
+    else:
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            rows = list(csv.DictReader(f))
+    if not isinstance(rows, list) or not all(isinstance(r, dict) for r in rows):
+        sys.exit(f"[ERROR] Manifest {path} must be a list of show/shot/artist rows.")
+    return [{k: str(r.get(k) or "").strip() for k in ("show", "shot", "artist")} for r in rows]
+
+
+def plan_row(cfg: Dict[str, Any], local: Dict[str, Any], row: Dict[str, str]) -> Dict[str, Any]:
+    """Validate one manifest row and resolve its location, paths and job name (exits like the single-shot flow)."""
+    show = validate_show(row["show"])
+    shot = validate_shot(row["shot"])
+    artist = row["artist"]
+    location_key = choose_location(cfg, artist)
+    loc = get_location(cfg, location_key)
+    paths = build_paths(cfg=cfg, show=show, shot=shot, src_root=local["root"], dst_root=loc["root"])
+    return {
+        "show": show, "shot": shot, "artist": artist, "location_key": location_key,
+        "loc": loc, "paths": paths, "name": job_name(shot, artist, location_key),
+    }
+
+
 # ---------- Enhanced API class extending existing base ----------
 
 class ResilioSyncAPI(ApiBaseCommands):
@@ -132,8 +173,10 @@ class ResilioSyncAPI(ApiBaseCommands):
     Builds on the existing ApiBaseCommands structure.
     """
 
-    def __init__(self, base_url: str, token: str, verify: bool = False):
+    def __init__(self, base_url: str, token: str, verify: bool = False,
+                 group_pool: Optional[AgentGroupPool] = None):
         super().__init__(base_url, token, verify)
+        self.group_pool = group_pool if group_pool is not None else AgentGroupPool(self)
 
     def find_job_by_name(self, name: str) -> Optional[Dict[str, Any]]:
         """
@@ -149,6 +192,13 @@ class ResilioSyncAPI(ApiBaseCommands):
             print(f"[WARN] find_job_by_name failed ({e}); continuing as if not found.")
             return None
 
+    def job_index(self) -> Dict[str, Dict[str, Any]]:
+        """
+        All jobs by name, from one listing; use this instead of
+        find_job_by_name when looking up many names.
+        """
+        return {j.get("name"): j for j in self._get_jobs()}
+
     def create_sync_job(self,
                         name: str,
                         src_agent_id: str,
@@ -162,92 +212,62 @@ class ResilioSyncAPI(ApiBaseCommands):
                         ignore_patterns: Optional[list] = None) -> Dict[str, Any]:
         """
         Create a Sync Job using the existing API structure.
-        For sync jobs, we create groups for source and destination agents.
+        Source and destination are the agents' shared groups from the group pool.
         """
-
-        # Create temporary groups for the sync job
-        src_group_name = f"TEMP_SRC_{name}_{src_agent_id}"
-        dst_group_name = f"TEMP_DST_{name}_{dst_agent_id}"
-
-        try:
-            # Create source group
-            src_group_attrs = {
-                'name': src_group_name,
-                'description': f'Temporary source group for sync job {name}',
-                'agents': [{'id': int(src_agent_id)}]
-            }
-            src_group_id = self._create_group(src_group_attrs)
-
-            # Create destination group
-            dst_group_attrs = {
-                'name': dst_group_name,
-                'description': f'Temporary destination group for sync job {name}',
-                'agents': [{'id': int(dst_agent_id)}]
-            }
-            dst_group_id = self._create_group(dst_group_attrs)
-
-            # Determine permissions based on direction
-            if direction == "bidirectional":
-                src_permission = "rw"
-                dst_permission = "rw"
-            else:  # one_way (source to destination)
-                src_permission = "rw"
-                dst_permission = "rw"  # destination needs write to receive files
-
-            # Create the sync job with groups
-            groups_data = [
-                {
-                    'id': src_group_id,
-                    'path': {
-                        'linux': src_path,
-                        'win': src_path,
-                        'osx': src_path
-                    },
-                    'permission': src_permission
+        src_group_id = self.group_pool.group_id(src_agent_id)
+        dst_group_id = self.group_pool.group_id(dst_agent_id)
+
+        # Determine permissions based on direction
+        if direction == "bidirectional":
+            src_permission = "rw"
+            dst_permission = "rw"
+        else:  # one_way (source to destination)
+            src_permission = "rw"
+            dst_permission = "rw"  # destination needs write to receive files
+
+        # Create the sync job with groups
+        groups_data = [
+            {
+                'id': src_group_id,
+                'path': {
+                    'linux': src_path,
+                    'win': src_path,
+                    'osx': src_path
                 },
-                {
-                    'id': dst_group_id,
-                    'path': {
-                        'linux': dst_path,
-                        'win': dst_path,
-                        'osx': dst_path
-                    },
-                    'permission': dst_permission
-                }
-            ]
-
-            job_attrs = {
-                'name': name,
-                'type': 'sync',
-                'description': f'Sync job for {metadata.get("show", "")}/{metadata.get("shot", "")} - {metadata.get("artist", "")}',
-                'groups': groups_data
-            }
-
-            # Add optional attributes
-            if metadata:
-                job_attrs['metadata'] = metadata
-            if ignore_patterns:
-                job_attrs['ignore_patterns'] = ignore_patterns
-
-            job_id = self._create_job(job_attrs)
-
-            return {
-                'id': job_id,
-                'name': name,
-                'src_group_id': src_group_id,
-                'dst_group_id': dst_group_id
+                'permission': src_permission
+            },
+            {
+                'id': dst_group_id,
+                'path': {
+                    'linux': dst_path,
+                    'win': dst_path,
+                    'osx': dst_path
+                },
+                'permission': dst_permission
             }
-
-        except ApiError as e:
-            # Clean up any created groups on failure
-            try:
-                if 'src_group_id' in locals():
-                    self._delete_group(src_group_id)
-                if 'dst_group_id' in locals():
-                    self._delete_group(dst_group_id)
-            except ApiError:
-                pass  # Ignore cleanup errors
-            raise e
+        ]
+
+        job_attrs = {
+            'name': name,
+            'type': 'sync',
+            'description': f'Sync job for {metadata.get("show", "")}/{metadata.get("shot", "")} - {metadata.get("artist", "")}',
+            'groups': groups_data
+        }
+
+        # Add optional attributes
+        if metadata:
+            job_attrs['metadata'] = metadata
+        if ignore_patterns:
+            job_attrs['ignore_patterns'] = ignore_patterns
+
+        job_id = self._create_job(job_attrs)
+
+        return {
+            'id': job_id,
+            'name': name,
+            'src_group_id': src_group_id,
+            'dst_group_id': dst_group_id
+        }
 
     def start_job(self, job_id: str) -> int:
         """
@@ -264,23 +284,117 @@ class ResilioSyncAPI(ApiBaseCommands):
     def cleanup_temp_groups(self, job_info: Dict[str, Any]):
         """
         Clean up temporary groups created for a sync job.
-        Call this if you want to clean up after job completion.
+        Only TEMP_ groups are deleted; shared groups from the group pool are
+        left alone. To clean up all TEMP_ groups, see compact_temp_groups.py.
         """
         try:
-            if 'src_group_id' in job_info:
-                self._delete_group(job_info['src_group_id'])
-            if 'dst_group_id' in job_info:
-                self._delete_group(job_info['dst_group_id'])
+            for key in ('src_group_id', 'dst_group_id'):
+                if key in job_info and self._get_group(job_info[key]).get('name', '').startswith(TEMP_GROUP_PREFIX):
+                    self._delete_group(job_info[key])
         except ApiError as e:
             print(f"[WARN] Failed to clean up temporary groups: {e}")
 
 
+# ---------- Batch flow ----------
+
+def setup_row(api: ResilioSyncAPI, jobs: Dict[str, Dict[str, Any]], local: Dict[str, Any],
+              defaults: Dict[str, Any], plan: Dict[str, Any]) -> Dict[str, Any]:
+    """Create (or reuse) and start the job of one planned row; never raises."""
+    result = {"action": "", "job_id": "", "run_id": "", "error": ""}
+    try:
+        existing = jobs.get(plan["name"])
+        if existing:
+            result["action"], result["job_id"] = "reused", str(existing.get("id"))
+        else:
+            created = api.create_sync_job(
+                name=plan["name"],
+                src_agent_id=str(local["agent_id"]),
+                src_path=plan["paths"]["source"],
+                dst_agent_id=str(plan["loc"]["agent_id"]),
+                dst_path=plan["paths"]["destination"],
+                direction=defaults.get("sync_direction", "bidirectional"),
+                profile_id=defaults.get("profile_id"),
+                priority=defaults.get("priority"),
+                metadata={
+                    "artist": plan["artist"],
+                    "location_key": plan["location_key"],
+                    "show": plan["show"],
+                    "shot": plan["shot"],
+                    "rel": plan["paths"]["rel"]
+                },
+                ignore_patterns=defaults.get("ignore_patterns", None)
+            )
+            result["action"], result["job_id"] = "created", str(created.get("id", ""))
+        result["run_id"] = str(api.start_job(result["job_id"]))
+    except (ApiError, ValueError) as e:
+        result["error"] = str(e)
+    return result
+
+
+def run_manifest(args: argparse.Namespace, cfg: Dict[str, Any]) -> int:
+    rows = load_manifest(args.manifest)
+    local = get_local(cfg)
+    defaults = cfg.get("defaults", {}) or {}
+
+    # Resolve every row up front, so a typo fails the batch before any API call
+    plans, errors = [], []
+    for i, row in enumerate(rows, start=1):
+        try:
+            plans.append(plan_row(cfg, local, row))
+        except SystemExit as e:
+            errors.append(f"row {i} ({row['show']}/{row['shot']}/{row['artist']}): {e.code}")
+    if errors:
+        print("\n".join(errors))
+        sys.exit(f"[ERROR] {len(errors)} of {len(rows)} manifest rows are invalid; nothing was created.")
+
+    # Rows that map to the same job are set up once
+    unique = list({plan["name"]: plan for plan in plans}.values())
+    print(f"\n--- Manifest: {len(rows)} rows, {len(unique)} jobs ---")
+    for plan in unique:
+        print(f"{plan['name']:<50} {plan['paths']['source']} -> {plan['loc']['agent_id']}:{plan['paths']['destination']}")
+    print("---------------\n")
+
+    if args.dry_run:
+        print("[DRY-RUN] No API calls made.")
+        return 0
+
+    if not args.yes:
+        proceed = input(f"Proceed to create (or reuse) and start {len(unique)} jobs? [Y/n]: ").strip().lower()
+        if proceed and proceed not in ("y", "yes"):
+            print("Aborted.")
+            return 0
+
+    api = ResilioSyncAPI(env_or_die("RESILIO_URL"), env_or_die("RESILIO_TOKEN"), verify=False)
+
+    # One jobs listing for the whole batch instead of a find_job_by_name scan per row
+    try:
+        jobs = api.job_index()
+    except ApiError as e:
+        sys.exit(f"[ERROR] Listing jobs failed: {e}")
+
+    with ThreadPoolExecutor(max_workers=max(1, args.workers)) as pool:
+        results = list(pool.map(lambda plan: setup_row(api, jobs, local, defaults, plan), unique))
+
+    print(f"{'SHOT':<16} {'ARTIST':<12} {'LOCATION':<14} {'ACTION':<8} {'JOB':<8} {'RUN':<8} ERROR")
+    for plan, result in zip(unique, results):
+        print(f"{plan['shot']:<16} {plan['artist']:<12} {plan['location_key']:<14} {result['action'] or '-':<8} "
+              f"{result['job_id'] or '-':<8} {result['run_id'] or '-':<8} {result['error']}")
+    failed = sum(1 for r in results if r["error"])
+    created = sum(1 for r in results if r["action"] == "created" and not r["error"])
+    reused = sum(1 for r in results if r["action"] == "reused" and not r["error"])
+    print(f"\n[OK] {created} created, {reused} reused, {failed} failed.")
+    return 1 if failed else 0
+
+
 # ---------- Main flow ----------
 
 def main():
     args = parse_args()
     cfg = load_yaml(args.config)
 
+    if args.manifest:
+        sys.exit(run_manifest(args, cfg))
+
     show = validate_show(prompt_if_missing(args.show, "Show"))
     shot = validate_shot(prompt_if_missing(args.shot, "Shot"))
     artist = prompt_if_missing(args.artist, "Artist")
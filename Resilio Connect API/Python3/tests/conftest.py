@@ -0,0 +1,44 @@
+"""The example modules import each other by plain name, as when run from this folder."""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from examples import ConnectApiExample  # noqa: E402
+from local_agent import AgentIdCache  # noqa: E402
+from stub_console import StubConsole  # noqa: E402
+
+
+class CountingApi(ConnectApiExample):
+    """ConnectApiExample with an in-memory agent id cache, counting agent listings and group PUTs"""
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault("agent_id_cache", AgentIdCache(None))
+        super().__init__(*args, **kwargs)
+        self.listings = 0
+        self.puts = []  # size of each group membership written
+
+    def _get_agents(self):
+        self.listings += 1
+        return super()._get_agents()
+
+    def _update_group(self, group_id, attrs):
+        self.puts.append(len(attrs['agents']))
+        super()._update_group(group_id, attrs)
+
+
+@pytest.fixture
+def console():
+    """Stub console with 10 agents in 2 groups, and one run of a job to group 1 (agents 1, 3, 5, 7 and 9)"""
+    with StubConsole(agents=10, groups=2) as console:
+        console.jobs[1] = {"id": 1, "name": "job", "groups": [{"id": 1, "permission": "ro"}]}
+        console.run_id = console.start_run(1)
+        yield console
+
+
+@pytest.fixture
+def make_api(console):
+    """CountingApi for the stub console; keyword arguments go to ConnectApiExample"""
+    return lambda **kwargs: CountingApi(console.url, "token", **kwargs)
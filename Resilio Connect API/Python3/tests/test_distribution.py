@@ -0,0 +1,58 @@
+from distribution import DistributionOrchestrator
+from examples import ConnectApiExample
+from local_agent import AgentIdCache
+from stub_console import StubConsole
+
+PATH = {'linux': "/tmp/test", 'win': "/tmp/test", 'osx': "/tmp/test"}
+SRC = {'id': 1, 'path': PATH, 'permission': "rw"}
+DSTS = [{'id': group_id, 'path': PATH, 'permission': "ro"} for group_id in (2, 3, 4)]
+
+
+class HidingApi(ConnectApiExample):
+    """Leaves `hidden` runs out of every listing and records when they are fetched on their own"""
+
+    def __init__(self, *args, **kwargs):
+        super(HidingApi, self).__init__(*args, agent_id_cache=AgentIdCache(None), **kwargs)
+        self.hidden = set()
+        self.listings = 0
+        self.fetched_after = []  # listings made before each single-run GET
+
+    def _get_job_runs(self, attrs=None):
+        self.listings += 1
+        listing = super(HidingApi, self)._get_job_runs(attrs)
+        return {"data": [run for run in listing["data"] if run["id"] not in self.hidden]}
+
+    def _get_job_run(self, job_run_id):
+        self.fetched_after.append(self.listings)
+        return super(HidingApi, self)._get_job_run(job_run_id)
+
+
+def test_every_destination_finishes():
+    with StubConsole(agents=16, groups=4, size=2 ** 20, rate=10 * 2 ** 20) as console:
+        orchestrator = DistributionOrchestrator(HidingApi(console.url, "token"), poll_interval=0.5)
+        destinations = orchestrator.distribute("dist", SRC, DSTS)
+
+        assert orchestrator.track(destinations, timeout=10)
+    assert [d.status for d in destinations] == ["finished"] * 3
+    assert all(d.duration_s is not None and d.error is None for d in destinations)
+
+
+def test_run_missing_from_listing_is_fetched():
+    with StubConsole(agents=16, groups=4, size=2 ** 20, rate=10 * 2 ** 20) as console:
+        api = HidingApi(console.url, "token")
+        orchestrator = DistributionOrchestrator(api, poll_interval=0.5, missed_listings_before_get=3)
+        destinations = orchestrator.distribute("dist", SRC, DSTS)
+        api.hidden.add(destinations[0].job_run_id)
+
+        assert orchestrator.track(destinations, timeout=10)
+    assert destinations[0].status == "finished"
+    assert api.fetched_after[0] == 3
+
+
+def test_timeout_returns_false():
+    with StubConsole(agents=16, groups=4, size=2 ** 30, rate=2 ** 20) as console:
+        orchestrator = DistributionOrchestrator(HidingApi(console.url, "token"), poll_interval=0.5)
+        destinations = orchestrator.distribute("dist", SRC, DSTS)
+
+        assert orchestrator.track(destinations, timeout=0.5) is False
+    assert not any(d.done for d in destinations)
@@ -0,0 +1,39 @@
+"""GroupManager against the stub console: one PUT per edit, concurrent changes kept."""
+from group_manager import GroupEdit, GroupManager
+
+
+def test_large_add_is_one_put(make_api):
+    api = make_api()
+    result = GroupManager(api).apply(GroupEdit(1, add=range(1000, 3000)))
+
+    assert result["error"] is None and result["added"] == 2000
+    assert api.puts == [2005]  # the group's 5 agents plus the 2000 new ones, once
+
+
+def test_matching_group_costs_no_write(console, make_api):
+    api = make_api()
+    members = [a["id"] for a in console.groups[1]["agents"]]
+    result = GroupManager(api).apply(GroupEdit(1, add=members))
+
+    assert api.puts == [] and result["requests"] == 1
+
+
+def test_retry_reapplies_on_fresh_membership(console, make_api):
+    api = make_api()
+    manager = GroupManager(api)
+    read = manager.members
+    reads = []
+
+    def members(group_id):
+        if len(reads) == 1:
+            # After our write another editor adds agent 99 and puts agent 1 back
+            console.groups[1]["agents"] += [{'id': 99}, {'id': 1}]
+        reads.append(read(group_id))
+        return reads[-1]
+
+    manager.members = members
+    result = manager.apply(GroupEdit(1, remove=[1]))
+
+    final = {a["id"] for a in console.groups[1]["agents"]}
+    assert result["error"] is None and result["retries"] == 1
+    assert 1 not in final and 99 in final
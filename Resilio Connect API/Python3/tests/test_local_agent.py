@@ -0,0 +1,40 @@
+import threading
+import time
+
+from local_agent import LocalAgentClient
+from stub_agent import StubAgent
+
+
+def test_status_read_from_the_agent(console, make_api):
+    with StubAgent(console=console, agent_id=3) as agent:
+        api = make_api(local_agent=LocalAgentClient(port=agent.port))
+        before = console.requests
+        assert api.check_transfer_status_of_local_agent(console.run_id, local_first=True) in ("queued", "working")
+    assert console.requests == before
+
+
+def test_agent_without_the_run_falls_back_to_the_console(console, make_api):
+    with StubAgent(peer_id="PEER0003", folders=[]) as agent:
+        api = make_api(local_agent=LocalAgentClient(port=agent.port))
+        assert api.check_transfer_status_of_local_agent(console.run_id, local_first=True) in ("queued", "working")
+    assert agent.requests >= 2  # /folders, then /client for the agent id
+
+
+def test_slow_request_does_not_block_cached_lookups():
+    with StubAgent(peer_id="PEER0001", latency=0.5) as agent:
+        client = LocalAgentClient(port=agent.port, ttl=60)
+        assert client.peer_id() == "PEER0001"
+        slow = threading.Thread(target=client.folders)
+        slow.start()
+        time.sleep(0.1)
+        started = time.monotonic()
+        assert client.peer_id() == "PEER0001"
+        assert time.monotonic() - started < 0.2
+        slow.join()
+
+
+def test_console_is_asked_by_default(console, make_api):
+    with StubAgent(console=console, agent_id=3) as agent:
+        api = make_api(local_agent=LocalAgentClient(port=agent.port))
+        assert api.check_transfer_status_of_local_agent(console.run_id) in ("queued", "working")
+    assert agent.requests == 1  # /client for the agent id, no /folders
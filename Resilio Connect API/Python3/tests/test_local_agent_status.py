@@ -0,0 +1,29 @@
+from examples import NOT_IN_RUN
+from local_agent import LocalAgentClient
+from stub_agent import StubAgent
+
+
+def test_agent_not_in_run_lists_agents_once(console, make_api):
+    with StubAgent(console=console, agent_id=2) as agent:
+        api = make_api(local_agent=LocalAgentClient(port=agent.port, ttl=0))
+        assert api.check_transfer_status_of_local_agent(console.run_id, local_first=False) == NOT_IN_RUN
+        assert api.check_transfer_status_of_local_agent(console.run_id, local_first=False) == NOT_IN_RUN
+    assert api.listings == 1
+
+
+def test_stale_id_is_refreshed(console, make_api):
+    with StubAgent(console=console, agent_id=3) as agent:
+        api = make_api(local_agent=LocalAgentClient(port=agent.port, ttl=0))
+        api._agent_id_cache.put(console.url, "PEER0003", 99)
+        assert api.check_transfer_status_of_local_agent(console.run_id, local_first=False) in ("queued", "working")
+    assert api.listings == 1 and api._agent_id_cache.get(console.url, "PEER0003") == 3
+
+
+def test_stale_id_refreshed_once_per_ttl(console, make_api):
+    with StubAgent(console=console, agent_id=3) as agent:
+        api = make_api(local_agent=LocalAgentClient(port=agent.port, ttl=0))
+        api._agent_id_cache.put(console.url, "PEER0003", 99)
+        console.agents[3]["deviceid"] = "REINSTALLED"
+        for _ in range(3):
+            assert api.check_transfer_status_of_local_agent(console.run_id, local_first=False) is None
+    assert api.listings == 1
@@ -0,0 +1,30 @@
+import io
+import logging
+import os
+
+
+def test_logging_setup_matches_the_functions_copy():
+    here = os.path.dirname(os.path.abspath(__file__))
+    with open(os.path.join(here, os.pardir, "logging_setup.py")) as copy, \
+            open(os.path.join(here, os.pardir, "shotgrid-webhooks-firebase", "functions", "logging_setup.py")) as f:
+        assert copy.read() == f.read(), \
+            "copy shotgrid-webhooks-firebase/functions/logging_setup.py to Python3/logging_setup.py"
+
+
+def test_correlation_id_is_stamped():
+    from logger import Logger, logger
+
+    out = io.StringIO()
+    handler = logging.StreamHandler(out)
+    handler.setFormatter(Logger.FORMATTER)
+    target = logging.getLogger("test-logger")
+    target.setLevel(logging.INFO)
+    listener = Logger._attach_queue(target, handler)
+
+    with logger.correlation("run-42"):
+        target.info("Created job %s", 7)
+    target.info("Outside")
+    listener.stop()
+
+    lines = out.getvalue().splitlines()
+    assert lines[0].endswith("[ run-42 ] Created job 7") and lines[1].endswith("[ - ] Outside")
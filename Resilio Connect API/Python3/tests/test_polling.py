@@ -0,0 +1,41 @@
+import os
+import random
+
+from polling import AdaptivePollPolicy, FixedPollPolicy, _NoProgress, _simulate
+
+
+def durations(count=200, seed=1):
+    rng = random.Random(seed)
+    return [10 ** rng.uniform(1, 4.56) for _ in range(count)]
+
+
+def test_without_progress_never_slower_than_fixed():
+    policy = AdaptivePollPolicy.for_interval(5, jitter=0)
+    delays = [policy.next_delay("working") for _ in range(50)]
+
+    assert delays[0] == 1 and max(delays) == 5
+
+
+def test_without_progress_detects_like_fixed_polling():
+    runs = durations()
+    _, fixed = _simulate(lambda clock: FixedPollPolicy(5), runs)
+    _, blind = _simulate(lambda clock: _NoProgress(AdaptivePollPolicy.for_interval(
+        5, rng=random.Random(1), clock=clock)), runs)
+
+    assert blind < fixed * 1.1
+
+
+def test_progress_lets_it_back_off():
+    runs = durations()
+    fixed_calls, fixed = _simulate(lambda clock: FixedPollPolicy(5), runs)
+    calls, delay = _simulate(lambda clock: AdaptivePollPolicy.for_interval(
+        5, rng=random.Random(1), clock=clock), runs)
+
+    assert calls < fixed_calls / 3 and delay < fixed
+
+
+def test_legacy_copy_matches():
+    here = os.path.dirname(os.path.abspath(__file__))
+    with open(os.path.join(here, os.pardir, "polling.py")) as f, \
+            open(os.path.join(here, os.pardir, os.pardir, "Python", "polling.py")) as legacy:
+        assert legacy.read() == f.read(), "copy Python3/polling.py to Python/polling.py"
@@ -0,0 +1,23 @@
+from errors import ApiError
+
+
+def test_agents_outside_the_run_are_skipped(console, make_api):
+    api = make_api()
+    status = api.check_transfer_status(console.run_id, [1, 2, 3])
+
+    assert [item["agent_id"] for item in status] == [1, 3]
+    assert api.check_transfer_status(console.run_id, [2, 4]) == ()
+
+
+def test_missing_run_is_a_failure(make_api):
+    assert make_api().check_transfer_status(12345, [1, 3]) is None
+
+
+def test_other_errors_are_not_swallowed(console, make_api, monkeypatch):
+    def fail(job_run_id, agent_id):
+        raise ApiError("Internal server error")
+
+    api = make_api()
+    monkeypatch.setattr(api, "_get_job_run_agent", fail)
+
+    assert api.check_transfer_status(console.run_id, [1, 3]) is None